@@ -1,46 +1,87 @@
-import os
-from flask import Flask, jsonify
+import importlib
+import click
+from flask import Flask
 from flask_cors import CORS
 from dotenv import load_dotenv
 from .config import Config
-from .auth import bp as auth_bp
-from .extensions import db, migrate
-from .expenses import bp as expenses_bp
-from .clients import bp as clients_bp
-from .projects import bp as projects_bp
-from .catalog import bp as catalog_bp
-from .tasks import bp as tasks_bp
-from . import models
+from .extensions import db, init_migrate, init_sqlite
 
 load_dotenv()
 
+# imported by create_app(), not by importing this module
+BLUEPRINTS = (
+    "auth",
+    "clients",
+    "projects",
+    "catalog",
+    "expenses",
+    "tasks",
+    "forecast",
+    "changes",
+    "events",
+    "batch",
+    "archive",
+    "tenancy",
+    "reports",
+    "autocomplete",
+    "schedule",
+    "backfill",
+    "maintenance",
+    "jobs",
+    "dashboard",
+)
+
 
 # backend/app.py (excerpt)
-def create_app():
+def create_app(config_object=Config):
+    """Build the app. No I/O: the schema is created by `flask init-db`
+    (or migrations), never as a side effect of starting a worker."""
     app = Flask(__name__, instance_relative_config=True)
-    app.config.from_object(Config)
-    
+    app.config.from_object(config_object)
+
     db.init_app(app)
-    migrate.init_app(app, db)
+    init_sqlite(app)
+    # only `flask ...` commands need Alembic
+    if click.get_current_context(silent=True) is not None:
+        init_migrate(app)
+
+    for name in BLUEPRINTS:
+        module = importlib.import_module(f".{name}", __package__)
+        app.register_blueprint(module.bp)
 
-    app.register_blueprint(auth_bp)
-    app.register_blueprint(clients_bp)
-    app.register_blueprint(projects_bp)
-    app.register_blueprint(catalog_bp)
-    app.register_blueprint(expenses_bp)
-    app.register_blueprint(tasks_bp)
+    from .events import broker
+    broker.init_app(app)
+    from .tokens import init_tokens
+    init_tokens(app)
+    from .tenancy import init_tenancy
+    init_tenancy(app)
+    from .autocomplete import init_autocomplete
+    init_autocomplete(app)
+    from .jobs import init_jobs
+    init_jobs(app)
 
     @app.get("/api/health")
     def health():
         return {"ok": True, "service": "projectpeak-api"}
-    
-    with app.app_context():
+
+    @app.cli.command("init-db")
+    def init_db():
+        """Create any missing tables (safe to re-run)."""
         db.create_all()
+        click.echo(f"schema ready: {len(db.metadata.tables)} tables")
 
     return app
 
 
-app = create_app()
+def __getattr__(name):
+    # `from backend.app import app` and `flask --app backend.app` still work;
+    # the app is only built when something actually asks for it
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 if __name__ == "__main__":
-    app.run(host="127.0.0.1", port=5001, debug=True) # Set debug=False in production
+    create_app().run(host="127.0.0.1", port=5001, debug=True) # Set debug=False in production
@@ -0,0 +1,251 @@
+# backend/archive.py
+"""Move long soft-deleted rows out of the hot tables, and bring them back.
+
+A soft-deleted project, client or category older than the retention window
+is copied into archive_<table> together with its dependent rows, then
+deleted from the live tables. Each batch is a handful of INSERT ... SELECT /
+DELETE statements in one transaction, so the job can be killed and re-run
+at any point.
+
+  flask archive run [--days 90] [--batch 500] [--dry-run]
+  flask archive restore projects 12
+  flask archive status
+
+Schedule `run` from cron (or any job runner); it is idempotent.
+"""
+from __future__ import annotations
+import time
+from datetime import timedelta
+import click
+from flask import Blueprint, current_app
+from sqlalchemy import bindparam, delete, exists, func, insert, literal, select, update
+from sqlalchemy.exc import IntegrityError
+from .extensions import db
+from .models import (
+    ARCHIVE_TABLES, Category, Client, Component, Expense, ExpenseLine, Project,
+    ProjectCategory, ProjectComponent, Task, TaskComment, TaskDependency, Tombstone, utcnow,
+)
+
+bp = Blueprint("archive", __name__)
+
+DEFAULT_RETENTION_DAYS = 90
+DEFAULT_BATCH = 500
+
+# tables the change feed serves; archiving them leaves tombstones behind
+FEED_TABLES = {"projects", "tasks", "task_comments", "expenses", "expense_lines"}
+
+
+def _plan(root_table: str) -> list[tuple]:
+    """(live table, FROM clause, root id column) for one kind of root,
+    children before parents so deletes never orphan a row mid-batch."""
+    p, pc, pcomp = Project.__table__, ProjectCategory.__table__, ProjectComponent.__table__
+    t, td, tc = Task.__table__, TaskDependency.__table__, TaskComment.__table__
+    e, el = Expense.__table__, ExpenseLine.__table__
+    if root_table == "projects":
+        return [
+            (tc, tc.join(t, t.c.id == tc.c.task_id), t.c.project_id),
+            (el, el.join(e, e.c.id == el.c.expense_id), e.c.project_id),
+            (pc, pc, pc.c.project_id),
+            (pcomp, pcomp, pcomp.c.project_id),
+            (td, td, td.c.project_id),
+            (t, t, t.c.project_id),
+            (e, e, e.c.project_id),
+            (p, p, p.c.id),
+        ]
+    if root_table == "clients":
+        c = Client.__table__
+        return [(c, c, c.c.id)]
+    if root_table == "categories":
+        cat, comp = Category.__table__, Component.__table__
+        return [(comp, comp, comp.c.category_id), (cat, cat, cat.c.id)]
+    raise ValueError(f"cannot archive or restore {root_table!r}")
+
+
+def _eligible(root_table: str, cutoff, limit: int):
+    """Ids of soft-deleted roots past the cutoff that are safe to move.
+    Clients wait until none of their projects are live; categories until
+    nothing live refers to them or their components."""
+    if root_table == "projects":
+        q = select(Project.id).where(Project.deleted_at < cutoff)
+        order = Project.deleted_at
+    elif root_table == "clients":
+        q = select(Client.id).where(
+            Client.deleted_at < cutoff,
+            ~exists().where(Project.client_id == Client.id),
+        )
+        order = Client.deleted_at
+    else:
+        q = select(Category.id).where(
+            Category.deleted_at < cutoff,
+            ~exists().where(ProjectCategory.category_id == Category.id),
+            ~exists().where(ProjectComponent.category_id == Category.id),
+            ~exists().where(
+                ProjectComponent.component_id == Component.id,
+                Component.category_id == Category.id,
+            ),
+            ~exists().where(ExpenseLine.category_id == Category.id),
+        )
+        order = Category.deleted_at
+    return db.session.scalars(q.order_by(order).limit(limit)).all()
+
+
+def _archive_batch(root_table: str, ids: list[int]) -> dict[str, int]:
+    now = utcnow()
+    ids_param = bindparam("ids", expanding=True)
+    counts = {}
+    for live, src, root_col in _plan(root_table):
+        arch = ARCHIVE_TABLES[live.name]
+        cond = root_col.in_(ids_param)
+        names = [c.name for c in live.columns]
+        rows = select(
+            *live.columns,
+            literal(now).label("archived_at"),
+            literal(root_table).label("root_table"),
+            root_col.label("root_id"),
+        ).select_from(src).where(cond)
+        res = db.session.execute(
+            insert(arch).from_select(names + ["archived_at", "root_table", "root_id"], rows),
+            {"ids": ids},
+        )
+        counts[live.name] = res.rowcount
+        if live.name in FEED_TABLES:
+            db.session.execute(
+                insert(Tombstone.__table__).from_select(
+                    ["table_name", "row_id", "project_id", "deleted_at"],
+                    select(literal(live.name), live.c.id, root_col, literal(now))
+                    .select_from(src).where(cond),
+                ),
+                {"ids": ids},
+            )
+        db.session.execute(
+            delete(live).where(live.c.id.in_(select(live.c.id).select_from(src).where(cond))),
+            {"ids": ids},
+        )
+    return counts
+
+
+def archive_deleted(retention_days: int, batch_size: int, dry_run: bool = False, pause: float = 0.0) -> dict:
+    """Archive every eligible root, batch_size roots per transaction.
+    Returns {root_table: {"roots": n, table: rows, ...}}."""
+    cutoff = utcnow() - timedelta(days=retention_days)
+    summary = {}
+    # projects first, so clients whose last projects just went become eligible
+    for root_table in ("projects", "clients", "categories"):
+        totals = {"roots": 0}
+        if dry_run:
+            totals["roots"] = len(_eligible(root_table, cutoff, 10**9))
+            summary[root_table] = totals
+            continue
+        while True:
+            ids = _eligible(root_table, cutoff, batch_size)
+            if not ids:
+                break
+            try:
+                counts = _archive_batch(root_table, ids)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            totals["roots"] += len(ids)
+            for k, v in counts.items():
+                totals[k] = totals.get(k, 0) + v
+            if pause:
+                time.sleep(pause)  # let foreground writers in between batches
+        summary[root_table] = totals
+    return summary
+
+
+def _missing_refs(root_id: int) -> list[str]:
+    """Live rows an archived project still points at that are gone."""
+    missing = []
+    arch = ARCHIVE_TABLES
+    in_root = lambda a: (a.c.root_table == "projects") & (a.c.root_id == root_id)  # noqa: E731
+    checks = [
+        ("client", select(arch["projects"].c.client_id).where(in_root(arch["projects"])), Client.__table__),
+        ("category", select(arch["project_categories"].c.category_id).where(in_root(arch["project_categories"])), Category.__table__),
+        ("category", select(arch["project_components"].c.category_id).where(in_root(arch["project_components"])), Category.__table__),
+        ("component", select(arch["project_components"].c.component_id).where(in_root(arch["project_components"])), Component.__table__),
+        ("category", select(arch["expense_lines"].c.category_id).where(in_root(arch["expense_lines"])), Category.__table__),
+    ]
+    for label, ref_ids, live in checks:
+        gone = db.session.scalars(
+            ref_ids.distinct().where(~exists().where(live.c.id == ref_ids.selected_columns[0]))
+        ).all()
+        missing += [f"{label} {i}" for i in gone]
+    return sorted(set(missing))
+
+
+def restore(root_table: str, root_id: int) -> dict[str, int]:
+    """Move one archived root and its dependents back into the live tables.
+    The root comes back un-deleted; every restored row gets a fresh
+    updated_at so change-feed clients pick it up again."""
+    plan = _plan(root_table)
+    root_arch = ARCHIVE_TABLES[root_table]
+    if db.session.scalar(select(func.count()).select_from(root_arch).where(root_arch.c.id == root_id)) == 0:
+        raise LookupError(f"{root_table} {root_id} is not in the archive")
+    if root_table == "projects":
+        missing = _missing_refs(root_id)
+        if missing:
+            raise ValueError("restore these first: " + ", ".join(missing))
+
+    now = utcnow()
+    counts = {}
+    try:
+        for live, _src, _root_col in reversed(plan):
+            arch = ARCHIVE_TABLES[live.name]
+            cond = (arch.c.root_table == root_table) & (arch.c.root_id == root_id)
+            cols = [
+                literal(now).label("updated_at") if c.name == "updated_at" else arch.c[c.name]
+                for c in live.columns
+            ]
+            res = db.session.execute(
+                insert(live).from_select([c.name for c in live.columns], select(*cols).where(cond))
+            )
+            counts[live.name] = res.rowcount
+            db.session.execute(delete(arch).where(cond))
+        root = plan[-1][0]
+        db.session.execute(update(root).where(root.c.id == root_id).values(deleted_at=None))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return counts
+
+
+# --- CLI ---
+@bp.cli.command("run")
+@click.option("--days", type=int, default=None, help="Retention window (default ARCHIVE_RETENTION_DAYS).")
+@click.option("--batch", type=int, default=None, help="Roots per transaction (default ARCHIVE_BATCH_SIZE).")
+@click.option("--pause", type=float, default=0.0, help="Seconds to sleep between batches.")
+@click.option("--dry-run", is_flag=True, help="Only count what would be archived.")
+def run_archive(days, batch, pause, dry_run):
+    """Archive soft-deleted projects, clients and categories past retention."""
+    days = days if days is not None else current_app.config.get("ARCHIVE_RETENTION_DAYS", DEFAULT_RETENTION_DAYS)
+    batch = batch or current_app.config.get("ARCHIVE_BATCH_SIZE", DEFAULT_BATCH)
+    summary = archive_deleted(days, batch, dry_run=dry_run, pause=pause)
+    for root_table, totals in summary.items():
+        rows = ", ".join(f"{k}={v}" for k, v in totals.items() if k != "roots")
+        verb = "would archive" if dry_run else "archived"
+        click.echo(f"{root_table}: {verb} {totals['roots']}" + (f" ({rows})" if rows else ""))
+
+
+@bp.cli.command("restore")
+@click.argument("root_table", type=click.Choice(["projects", "clients", "categories"]))
+@click.argument("root_id", type=int)
+def restore_archived(root_table, root_id):
+    """Restore one archived project, client or category."""
+    try:
+        counts = restore(root_table, root_id)
+    except (LookupError, ValueError) as e:
+        raise click.ClickException(str(e))
+    except IntegrityError:
+        raise click.ClickException(f"{root_table} {root_id} clashes with a live row (duplicate name or code?)")
+    click.echo(", ".join(f"{k}={v}" for k, v in counts.items()))
+
+
+@bp.cli.command("status")
+def archive_status():
+    """Row counts per archive table."""
+    for name, arch in ARCHIVE_TABLES.items():
+        n = db.session.scalar(select(func.count()).select_from(arch))
+        click.echo(f"{arch.name}: {n}")
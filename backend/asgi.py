@@ -0,0 +1,297 @@
+# backend/asgi.py
+"""ASGI entry point.
+
+    uvicorn backend.asgi:app --workers 4
+
+The read-heavy routes the dashboard polls are served natively on async
+SQLAlchemy (aiosqlite for SQLite), so a slow query or a slow client parks a
+coroutine instead of holding a worker thread:
+
+    GET /api/projects                       (without ?include=)
+    GET /api/projects/<id>/summary
+    GET /api/projects/<id>/tasks/progress
+    GET /api/projects/<id>/expenses
+
+They run the same statements and payload builders as the Flask views and
+serialize through the app's JSON provider, so the bodies are byte-identical.
+
+    GET /api/projects/<id>/events
+
+is served natively too, tenant routing or not: each stream is a coroutine
+woken by the event broker, where the Flask view would hold one of the
+ASGI_WSGI_THREADS for as long as the client stays connected.
+
+Everything else -- writes, the other routes, and the error cases of the five
+above (401, 404, bad ?fields=, too many streams) -- goes to the Flask app on
+a thread pool.
+"""
+from __future__ import annotations
+import asyncio
+import queue
+import re
+from urllib.parse import parse_qsl
+from a2wsgi import WSGIMiddleware
+from flask import g
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from werkzeug.datastructures import MultiDict
+from werkzeug.http import parse_cookie
+from .app import create_app
+from .auth import access_claims
+from .config import ProductionConfig
+from .events import HEARTBEAT_SEC, _sse, broker
+from .expenses import _expense_list, _expense_list_stmts
+from .extensions import db, init_sqlite
+from .models import Project
+from .projects import _ACTUAL_SQL, _PLANNED_SQL, _build_summaries, _category_names_stmt, _project_list_query
+from .tasks import compute_progress, progress_stmt
+
+# backend name of the app's engine -> async driver for the same database
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def create_async_db(app):
+    """(engine, session factory) on the database the Flask app uses."""
+    with app.app_context():
+        # taken from the engine, so instance-relative SQLite paths are resolved
+        url = db.engine.url
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f"no async driver configured for {backend!r}")
+    engine = create_async_engine(
+        url.set(drivername=ASYNC_DRIVERS[backend]),
+        pool_size=app.config["ASYNC_DB_POOL_SIZE"],
+        max_overflow=0,
+        # with thousands of open requests the queue forms here instead of in
+        # the listen backlog; wait for a connection like a queued WSGI
+        # request waits for a thread, rather than failing after 30 s
+        pool_timeout=None,
+    )
+    init_sqlite(app, engine.sync_engine)
+    return engine, async_sessionmaker(engine, expire_on_commit=False)
+
+
+# --- native routes: return the payload, or None to let Flask answer ---
+async def _project_exists(session, pid: int, live: bool) -> bool:
+    row = (await session.execute(select(Project.deleted_at).where(Project.id == pid))).first()
+    return row is not None and not (live and row.deleted_at is not None)
+
+
+async def list_projects(session, args):
+    try:
+        ser, stmt, includes = _project_list_query(args)
+    except ValueError:
+        return None
+    if includes:
+        # the per-relation loaders in projects._attach_includes are sync-only
+        return None
+    rows = await session.execute(stmt)
+    return {"projects": [ser.to_dict(r) for r in rows]}
+
+
+async def project_summary(session, args, pid: int):
+    if not await _project_exists(session, pid, live=True):
+        return None
+    planned = (await session.execute(_PLANNED_SQL, {"pids": [pid]})).mappings().all()
+    actual = (await session.execute(_ACTUAL_SQL, {"pids": [pid]})).mappings().all()
+    names_stmt = _category_names_stmt(planned, actual)
+    names = dict((await session.execute(names_stmt)).all()) if names_stmt is not None else {}
+    return _build_summaries([pid], planned, actual, names)[pid]
+
+
+async def task_progress(session, args, pid: int):
+    # tasks._project_or_404 only checks existence, not deleted_at
+    if not await _project_exists(session, pid, live=False):
+        return None
+    return compute_progress((await session.execute(progress_stmt(pid))).all())
+
+
+async def list_expenses(session, args, pid: int):
+    if not await _project_exists(session, pid, live=True):
+        return None
+    expenses, lines = _expense_list_stmts(pid)
+    expense_rows = (await session.execute(expenses)).all()
+    line_rows = (await session.execute(lines)).all()
+    return {"expenses": _expense_list(expense_rows, line_rows)}
+
+
+EVENTS_ROUTE = re.compile(r"/api/projects/(\d+)/events")
+
+ROUTES = (
+    (re.compile(r"/api/projects"), list_projects),
+    (re.compile(r"/api/projects/(\d+)/summary"), project_summary),
+    (re.compile(r"/api/projects/(\d+)/tasks/progress"), task_progress),
+    (re.compile(r"/api/projects/(\d+)/expenses"), list_expenses),
+)
+
+
+class AsyncReadApp:
+    """Native async handlers for ROUTES in front of the Flask app."""
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.engine, self.session = create_async_db(flask_app)
+        self.wsgi = WSGIMiddleware(flask_app, workers=flask_app.config["ASGI_WSGI_THREADS"])
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        if scope["type"] == "http" and scope["method"] == "GET":
+            m = EVENTS_ROUTE.fullmatch(scope["path"])
+            if m and await self._events(scope, receive, send, int(m.group(1))):
+                return
+            for pattern, handler in ROUTES:
+                m = pattern.fullmatch(scope["path"])
+                if m:
+                    payload = await self._dispatch(scope, handler, m.groups())
+                    if payload is not None:
+                        return await self._send_json(send, payload)
+                    break
+        await self.wsgi(scope, receive, send)
+
+    async def _dispatch(self, scope, handler, groups):
+        if self.flask_app.config["TENANT_ROUTING"]:
+            # one async engine cannot follow the per-request tenant database
+            return None
+        if self._user_id(scope) is None:
+            return None
+        args = MultiDict(parse_qsl(scope["query_string"].decode("latin-1"), keep_blank_values=True))
+        async with self.session() as session:
+            return await handler(session, args, *(int(g) for g in groups))
+
+    async def _events(self, scope, receive, send, pid: int) -> bool:
+        """Stream events.project_events; False (nothing sent) lets Flask answer."""
+        claims = self._claims(scope)
+        if _subject(claims) is None:
+            return False
+        if self.flask_app.config["TENANT_ROUTING"]:
+            tenant = claims.get("tid")
+            live = tenant is not None and await asyncio.to_thread(self._tenant_project_exists, tenant, pid)
+        else:
+            tenant = None
+            async with self.session() as session:
+                live = await _project_exists(session, pid, live=True)
+        if not live:
+            return False
+        last_id = dict(scope["headers"]).get(b"last-event-id", b"").decode("latin-1")
+        sub = broker.subscribe(pid, int(last_id) if last_id.isdigit() else None, tenant)
+        if sub is None:
+            return False
+
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+        sub.wake = lambda: loop.call_soon_threadsafe(ready.set)
+        gone = asyncio.ensure_future(_disconnect(receive))
+        try:
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream; charset=utf-8"),
+                    (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no"),
+                ],
+            })
+            await _send_chunk(send, "retry: 3000\n\n")
+            while not sub.closed and not gone.done():
+                # clear before draining: a put after the drain sets it again
+                ready.clear()
+                while True:
+                    try:
+                        event = sub.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    await _send_chunk(send, _sse(event))
+                woken = asyncio.ensure_future(ready.wait())
+                done, _ = await asyncio.wait({woken, gone}, timeout=HEARTBEAT_SEC, return_when=asyncio.FIRST_COMPLETED)
+                woken.cancel()
+                if not done:
+                    await _send_chunk(send, ": keep-alive\n\n")
+            if not gone.done():
+                await send({"type": "http.response.body", "body": b""})
+        except OSError:
+            # the client went away mid-send
+            pass
+        finally:
+            gone.cancel()
+            sub.wake = None
+            broker.unsubscribe(pid, sub, tenant)
+        return True
+
+    def _tenant_project_exists(self, tenant: str, pid: int) -> bool:
+        """tenancy._route_to_tenant + the Flask view's 404 check, on a worker thread."""
+        with self.flask_app.app_context():
+            try:
+                self.flask_app.extensions["tenancy"].get(tenant)
+            except (KeyError, LookupError):
+                return False
+            g.tenant = tenant
+            try:
+                row = db.session.execute(select(Project.deleted_at).where(Project.id == pid)).first()
+            finally:
+                db.session.remove()
+        return row is not None and row.deleted_at is None
+
+    def _claims(self, scope) -> dict:
+        """Same rules as auth._get_token_from_request + _token_claims (no
+        database read); {} without a valid access token."""
+        headers = dict(scope["headers"])
+        config = self.flask_app.config
+        token = parse_cookie(headers.get(b"cookie", b"").decode("latin-1")).get(config["COOKIE_NAME"])
+        if not token:
+            authz = headers.get(b"authorization", b"").decode("latin-1")
+            token = authz.split(" ", 1)[1].strip() if authz.startswith("Bearer ") else None
+        if not token:
+            return {}
+        return access_claims(token, config["JWT_SECRET"]) or {}
+
+    def _user_id(self, scope) -> int | None:
+        return _subject(self._claims(scope))
+
+    async def _send_json(self, send, payload) -> None:
+        # what jsonify() would produce, byte for byte
+        provider = self.flask_app.json
+        if (provider.compact is None and self.flask_app.debug) or provider.compact is False:
+            dump_args = {"indent": 2}
+        else:
+            dump_args = {"separators": (",", ":")}
+        body = f"{provider.dumps(payload, **dump_args)}\n".encode()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", provider.mimetype.encode()),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.engine.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+def _subject(claims: dict) -> int | None:
+    """Same rules as auth._verify_token."""
+    try:
+        return int(claims["sub"]) or None
+    except Exception:
+        return None
+
+
+async def _disconnect(receive) -> None:
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def _send_chunk(send, text: str) -> None:
+    await send({"type": "http.response.body", "body": text.encode(), "more_body": True})
+
+
+app = AsyncReadApp(create_app(ProductionConfig))
@@ -1,32 +1,106 @@
 from __future__ import annotations
 import time
+import uuid
 from datetime import datetime, timedelta
+from functools import wraps
 from typing import Optional, Tuple
+import click
 import jwt
-from flask import Blueprint, current_app, jsonify, request, make_response
+from flask import Blueprint, current_app, jsonify, request, make_response, g
 from werkzeug.security import generate_password_hash, check_password_hash
 from .extensions import db
 from .models import User
+from .tokens import revocations
 
 bp = Blueprint("auth", __name__, url_prefix="/api/auth")
 
 
-def _issue_token(user_id: int) -> str:
+def _issue_token(user_id: int, tenant: str | None = None, family: str | None = None) -> str:
     exp = datetime.utcnow() + timedelta(minutes=current_app.config["JWT_EXPIRES_MIN"])
     payload = {
         "sub": str(user_id),
         "iat": int(time.time()),
         "exp": int(exp.timestamp()),
+        "jti": uuid.uuid4().hex,
     }
+    if family is not None:
+        # the refresh family (login session) it was minted from; a logout revokes it whole
+        payload["fam"] = family
+    if tenant is not None:
+        # organization slug; backend/tenancy.py routes the request by it
+        payload["tid"] = tenant
     return jwt.encode(payload, current_app.config["JWT_SECRET"], algorithm="HS256")
 
 
+def _issue_refresh(user_id: int, tenant: str | None, family: str) -> str:
+    """A single-use refresh token, recorded in AUTH_DB (backend/tokens.py)."""
+    jti = uuid.uuid4().hex
+    exp = int(time.time()) + current_app.config["JWT_REFRESH_EXPIRES_DAYS"] * 86400
+    current_app.extensions["tokens"].add_refresh(jti, family, tenant or "", user_id, exp)
+    payload = {"sub": str(user_id), "iat": int(time.time()), "exp": exp, "jti": jti, "fam": family, "typ": "refresh"}
+    if tenant is not None:
+        payload["tid"] = tenant
+    return jwt.encode(payload, current_app.config["JWT_SECRET"], algorithm="HS256")
+
+
+def _token_claims(token: str) -> dict | None:
+    # memoized per request (tenant routing and require_auth both ask)
+    cached = g.get("_token_claims")
+    if cached is not None and cached[0] == token:
+        return cached[1]
+    claims = access_claims(token, current_app.config["JWT_SECRET"])
+    g._token_claims = (token, claims)
+    return claims
+
+
+def access_claims(token: str, secret: str) -> dict | None:
+    """Claims of a valid, unrevoked access token; no database access
+    (also used by backend/asgi.py, outside any app context)."""
+    try:
+        claims = jwt.decode(token, secret, algorithms=["HS256"])
+    except Exception:
+        return None
+    if claims.get("typ", "access") != "access" or revocations.is_revoked(claims):
+        return None
+    return claims
+
+
 def _verify_token(token: str) -> tuple[bool, int | None]:
+    claims = _token_claims(token)
     try:
-        data = jwt.decode(token, current_app.config["JWT_SECRET"], algorithms=["HS256"])
-        return True, int(data["sub"])
+        return (True, int(claims["sub"]))
     except Exception:
-        return False, None
+        return (False, None)
+
+
+def _revoke(keys: list[str], families: list[str] = ()) -> None:
+    """Revoke access-token jtis and refresh families, here and (within
+    AUTH_REVOCATION_SYNC_SECONDS) in every other worker."""
+    keys = [k for k in [*keys, *families] if k]
+    if not keys:
+        return
+    # nothing minted before now outlives this
+    expires_at = time.time() + current_app.config["JWT_EXPIRES_MIN"] * 60
+    current_app.extensions["tokens"].revoke(keys, expires_at, families=[f for f in families if f])
+    revocations.add(keys, expires_at)
+
+
+def _set_cookie(resp, name: str, value: str, max_age: int, path: str = "/") -> None:
+    resp.set_cookie(name, value, max_age=max_age, httponly=True, samesite="Lax", secure=False, path=path)
+
+
+def _session_tokens(user_id: int, family: str | None = None) -> tuple[str, str]:
+    """(access, refresh) for a new session, or the next pair of `family`."""
+    family = family or uuid.uuid4().hex
+    tenant = g.get("tenant")
+    return _issue_token(user_id, tenant, family), _issue_refresh(user_id, tenant, family)
+
+
+def _set_session_cookies(resp, access: str, refresh: str) -> None:
+    cfg = current_app.config
+    _set_cookie(resp, cfg["COOKIE_NAME"], access, cfg["JWT_EXPIRES_MIN"] * 60)
+    # only the auth endpoints ever see the refresh token
+    _set_cookie(resp, cfg["REFRESH_COOKIE_NAME"], refresh, cfg["JWT_REFRESH_EXPIRES_DAYS"] * 86400, "/api/auth")
 
 
 def _get_token_from_request() -> Optional[str]:
@@ -39,6 +113,21 @@ def _get_token_from_request() -> Optional[str]:
     return None
 
 
+def require_auth(fn):
+    """401 without a valid, unrevoked access token; sets g.user_id."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        token = _get_token_from_request()
+        if not token:
+            return jsonify(error="authentication required"), 401
+        ok, user_id = _verify_token(token)
+        if not ok or not user_id:
+            return jsonify(error="invalid token"), 401
+        g.user_id = user_id
+        return fn(*args, **kwargs)
+    return wrapper
+
+
 @bp.post("/register")
 def register():
     data = request.get_json(silent=True) or {}
@@ -49,6 +138,14 @@ def register():
         return jsonify(error="name, email, and password are required"), 400
     if len(password) < 8:
         return jsonify(error="password must be at least 8 characters"), 400
+    if current_app.config["TENANT_ROUTING"]:
+        from .tenancy import signup_tenant
+        try:
+            signup_tenant(data.get("organization"), email)
+        except LookupError as e:
+            return jsonify(error=str(e)), 400
+        except ValueError as e:
+            return jsonify(error=str(e)), 409
     if User.query.filter_by(email=email).first():
         return jsonify(error="email already registered"), 409
     user = User(
@@ -60,17 +157,8 @@ def register():
     )
     db.session.add(user)
     db.session.commit()
-    token = _issue_token(user.id)
     resp = make_response(jsonify(id=user.id, name=user.name, email=user.email))
-    resp.set_cookie(
-        current_app.config["COOKIE_NAME"],
-        token,
-        max_age=current_app.config["JWT_EXPIRES_MIN"] * 60,
-        httponly=True,
-        samesite="Lax",
-        secure=False,
-        path="/",
-    )
+    _set_session_cookies(resp, *_session_tokens(user.id))
     return resp, 201
 
 
@@ -79,35 +167,89 @@ def login():
     data = request.get_json(silent=True) or {}
     email = (data.get("email") or "").strip().lower()
     password = data.get("password") or ""
+    if current_app.config["TENANT_ROUTING"]:
+        from .tenancy import enter_tenant_of
+        if not enter_tenant_of(email):
+            return jsonify(error="invalid credentials"), 401
     user = User.query.filter_by(email=email).first()
     if not user or not check_password_hash(user.password_hash, password):
         return jsonify(error="invalid credentials"), 401
-    token = _issue_token(user.id)
     resp = make_response(jsonify(id=user.id, name=user.name, email=user.email))
-    resp.set_cookie(
-        current_app.config["COOKIE_NAME"],
-        token,
-        max_age=current_app.config["JWT_EXPIRES_MIN"] * 60,
-        httponly=True,
-        samesite="Lax",
-        secure=False,
-        path="/",
-    )
+    _set_session_cookies(resp, *_session_tokens(user.id))
+    return resp
+
+
+@bp.post("/refresh")
+def refresh():
+    """Trade a refresh token (cookie, or `refresh_token` in the body) for a
+    new access token and the next refresh token of the same session."""
+    data = request.get_json(silent=True) or {}
+    in_body = bool(data.get("refresh_token"))
+    token = data.get("refresh_token") or request.cookies.get(current_app.config["REFRESH_COOKIE_NAME"])
+    if not token:
+        return jsonify(error="refresh token required"), 401
+    try:
+        claims = jwt.decode(token, current_app.config["JWT_SECRET"], algorithms=["HS256"])
+    except Exception:
+        return jsonify(error="invalid refresh token"), 401
+    if claims.get("typ") != "refresh":
+        return jsonify(error="invalid refresh token"), 401
+    outcome, row = current_app.extensions["tokens"].use_refresh(claims["jti"])
+    if outcome == "reused":
+        if time.time() - row["used_at"] > current_app.config["JWT_REFRESH_REUSE_GRACE_SECONDS"]:
+            # a used token came back: someone kept a copy, end the session everywhere
+            _revoke([], families=[row["family"]])
+            current_app.logger.warning("refresh token reuse; revoked session of user %s", row["user_id"])
+            return jsonify(error="refresh token reused; signed out"), 401
+        # two tabs refreshed at once: the other one's cookies are already set
+        return jsonify(error="refresh token already used; retry with the new cookies"), 409
+    if outcome != "ok":
+        return jsonify(error=f"refresh token {outcome}"), 401
+    if claims.get("tid") is not None:
+        try:
+            current_app.extensions["tenancy"].get(claims["tid"])
+        except (KeyError, LookupError):
+            return jsonify(error="token is not bound to a known organization"), 401
+        g.tenant = claims["tid"]
+    user = db.session.get(User, int(claims["sub"]))
+    if not user or user.deleted_at is not None:
+        _revoke([], families=[row["family"]])
+        return jsonify(error="invalid refresh token"), 401
+    access, new_refresh = _session_tokens(user.id, row["family"])
+    body = {"id": user.id, "name": user.name, "email": user.email}
+    if in_body:
+        # API clients without a cookie jar
+        body.update(access_token=access, refresh_token=new_refresh,
+                    expires_in=current_app.config["JWT_EXPIRES_MIN"] * 60)
+    resp = make_response(jsonify(body))
+    _set_session_cookies(resp, access, new_refresh)
     return resp
 
 
 @bp.post("/logout")
 def logout():
+    """End this session (`?all=1`: every session of the user). The access
+    token stops working at once in this worker and within
+    AUTH_REVOCATION_SYNC_SECONDS in the others."""
+    cfg = current_app.config
+    keys, families = [], []
+    access = _get_token_from_request()
+    claims = access_claims(access, cfg["JWT_SECRET"]) if access else None
+    if claims:
+        keys.append(claims.get("jti"))
+        families.append(claims.get("fam"))
+    refresh_token = request.cookies.get(cfg["REFRESH_COOKIE_NAME"])
+    if refresh_token:
+        try:
+            families.append(jwt.decode(refresh_token, cfg["JWT_SECRET"], algorithms=["HS256"]).get("fam"))
+        except Exception:
+            pass
+    if claims and request.args.get("all") in ("1", "true"):
+        families += current_app.extensions["tokens"].families(claims.get("tid") or "", int(claims["sub"]))
+    _revoke(keys, families=sorted({f for f in families if f}))
     resp = make_response(jsonify(ok=True))
-    resp.set_cookie(
-        current_app.config["COOKIE_NAME"],
-        "",
-        max_age=0,
-        httponly=True,
-        samesite="Lax",
-        secure=False,
-        path="/",
-    )
+    _set_cookie(resp, cfg["COOKIE_NAME"], "", 0)
+    _set_cookie(resp, cfg["REFRESH_COOKIE_NAME"], "", 0, "/api/auth")
     return resp
 
 
@@ -137,3 +279,13 @@ def debug_verify():
         return jsonify(valid=False, error="expired"), 401
     except InvalidTokenError as e:
         return jsonify(valid=False, error=str(e)), 400
+
+
+@bp.cli.command("revoke")
+@click.argument("user_id", type=int)
+@click.option("--tenant", default="", help="Organization slug (with TENANT_ROUTING).")
+def revoke_cmd(user_id, tenant):
+    """Sign a user out everywhere: revoke all their refresh sessions."""
+    families = current_app.extensions["tokens"].families(tenant, user_id)
+    _revoke([], families=families)
+    click.echo(f"revoked {len(families)} session(s) of user {user_id}")
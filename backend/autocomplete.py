@@ -0,0 +1,388 @@
+# backend/autocomplete.py
+"""Type-ahead for component names and expense vendors.
+
+    GET /api/autocomplete/components?q=cop&category_id=3&limit=10
+    GET /api/autocomplete/vendors?q=home&limit=10
+
+Answers come from an in-process PrefixIndex instead of an `ilike '%q%'`
+scan. Every word of every label is a key, so "pipe" finds "Copper pipe
+1/2in", and results are ranked by usage: BOM rows per component, live
+expenses per vendor. Lookups cost a few bisects plus about `limit` steps,
+not a pass over every match; prefixes of up to two characters, which span
+the most distinct words, are cached until the next change.
+
+Each worker builds its index on first use. Commits in this worker are
+applied as deltas by session hooks; writes from other workers, and
+Core-level bulk changes (archive, imports), show up once the index is
+older than AUTOCOMPLETE_MAX_AGE seconds and a background thread has rebuilt
+it. With tenant routing every tenant has its own index.
+"""
+from __future__ import annotations
+import heapq
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from flask import Blueprint, current_app, g, has_app_context, jsonify, request
+from sqlalchemy import event, func, inspect, select
+from .auth import require_auth
+from .extensions import RoutingSession, db
+from .models import Component, Expense, ProjectComponent
+from .tenancy import current_tenant
+
+bp = Blueprint("autocomplete", __name__, url_prefix="/api/autocomplete")
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+CACHED_PREFIX_LEN = 2
+
+
+_TOKEN = re.compile(r"[^\W_]+")
+
+
+def _words(label: str) -> set[str]:
+    return set(_TOKEN.findall(label.lower()))
+
+
+def _phrase_at_word(label: str, phrase: str) -> bool:
+    """Whether `phrase` starts at the beginning of some word of `label`."""
+    low = label.lower()
+    return any(low.startswith(phrase, m.start()) for m in _TOKEN.finditer(low))
+
+
+class PrefixIndex:
+    """Labels by prefix of any of their words, most used first.
+
+    _keys holds (word, -uses, ident) sorted, so every word is a run already
+    in ranking order. A prefix covers a range of distinct words (_words);
+    merging the heads of their runs yields the top `limit` after reading
+    about `limit` keys, however many labels match.
+    """
+
+    def __init__(self, rows=()):
+        """rows: (ident, label, extra, uses); sorted once instead of insort per row."""
+        self.labels: dict = {}
+        self.extra: dict = {}
+        self.usage: dict = {}
+        self._top: dict[tuple, list] = {}
+        keys = []
+        for ident, label, extra, uses in rows:
+            self.labels[ident], self.extra[ident], self.usage[ident] = label, extra, uses
+            keys.extend((word, -uses, ident) for word in _words(label))
+        keys.sort()
+        self._keys: list[tuple] = keys
+        self._runs: dict[str, int] = {}
+        for word, _, _ in keys:
+            self._runs[word] = self._runs.get(word, 0) + 1
+        self._words: list[str] = sorted(self._runs)
+
+    def _insert(self, ident) -> None:
+        for word in _words(self.labels[ident]):
+            insort(self._keys, (word, -self.usage[ident], ident))
+            if word not in self._runs:
+                insort(self._words, word)
+                self._runs[word] = 0
+            self._runs[word] += 1
+
+    def _delete(self, ident) -> None:
+        for word in _words(self.labels[ident]):
+            key = (word, -self.usage[ident], ident)
+            i = bisect_left(self._keys, key)
+            if i < len(self._keys) and self._keys[i] == key:
+                del self._keys[i]
+                self._runs[word] -= 1
+                if not self._runs[word]:
+                    del self._runs[word]
+                    del self._words[bisect_left(self._words, word)]
+
+    def put(self, ident, label: str, extra=None) -> None:
+        if self.labels.get(ident) != label:
+            if ident in self.labels:
+                self._delete(ident)
+            self.labels[ident] = label
+            self.usage.setdefault(ident, 0)
+            self._insert(ident)
+        self.extra[ident] = extra
+        self._top.clear()
+
+    def remove(self, ident) -> None:
+        if ident in self.labels:
+            self._delete(ident)
+            del self.labels[ident], self.extra[ident], self.usage[ident]
+        self._top.clear()
+
+    def bump(self, ident, n: int) -> None:
+        if ident in self.labels:
+            self._delete(ident)
+            self.usage[ident] += n
+            self._insert(ident)
+        self._top.clear()
+
+    def search(self, prefix: str, limit: int, where=None) -> list:
+        """Up to `limit` idents with a word starting with `prefix`, by usage;
+        ties in alphabetical order of the word. "copper pi" is looked up by
+        its first word and checked as a phrase."""
+        prefix = " ".join(prefix.lower().split())
+        cache_key = (prefix, limit) if where is None and len(prefix) <= CACHED_PREFIX_LEN else None
+        if cache_key in self._top:
+            return self._top[cache_key]
+        tokens = _TOKEN.findall(prefix)
+        first = tokens[0] if tokens else ""
+        if prefix != first:
+            phrase, test = prefix, where
+            where = lambda ident: _phrase_at_word(self.labels[ident], phrase) and (  # noqa: E731
+                test is None or test(self.extra[ident])
+            )
+        elif where is not None:
+            test = where
+            where = lambda ident: test(self.extra[ident])  # noqa: E731
+        heads = []
+        i = bisect_left(self._keys, (first,))
+        for w in range(bisect_left(self._words, first), len(self._words)):
+            word = self._words[w]
+            if not word.startswith(first):
+                break
+            heads.append((self._keys[i][1], word, i))
+            i += self._runs[word]  # runs sit in _keys in _words order
+        heapq.heapify(heads)
+        out, seen = [], set()
+        while heads and len(out) < limit:
+            _, word, i = heads[0]
+            ident = self._keys[i][2]
+            if ident not in seen:
+                seen.add(ident)
+                if where is None or where(ident):
+                    out.append(ident)
+            if i + 1 < len(self._keys) and self._keys[i + 1][0] == word:
+                heapq.heapreplace(heads, (self._keys[i + 1][1], word, i + 1))
+            else:
+                heapq.heappop(heads)
+        if cache_key is not None:
+            self._top[cache_key] = out
+        return out
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+
+# --- loading ---
+def _component_extra(c) -> dict:
+    return {
+        "id": c.id,
+        "name": c.name,
+        "category_id": c.category_id,
+        "uom": c.uom,
+        "default_unit_price_usd": c.default_unit_price_usd,
+    }
+
+
+def _build() -> dict[str, PrefixIndex]:
+    uses = (
+        select(ProjectComponent.component_id, func.count().label("n"))
+        .group_by(ProjectComponent.component_id)
+        .subquery()
+    )
+    components = db.session.execute(
+        select(
+            Component.id, Component.name, Component.category_id, Component.uom,
+            Component.default_unit_price_usd.label("default_unit_price_usd"),
+            func.coalesce(uses.c.n, 0).label("uses"),
+        )
+        .outerjoin(uses, uses.c.component_id == Component.id)
+        .where(Component.deleted_at.is_(None))
+    )
+    vendors = db.session.execute(
+        select(Expense.vendor, func.count())
+        .where(Expense.vendor.is_not(None), Expense.deleted_at.is_(None))
+        .group_by(Expense.vendor)
+    )
+    return {
+        "components": PrefixIndex((c.id, c.name, _component_extra(c), c.uses) for c in components),
+        "vendors": PrefixIndex((v, v, None, n) for v, n in vendors if v.strip()),
+    }
+
+
+class Autocomplete:
+    """Per-tenant indexes for one app; None is the untenanted database."""
+
+    def __init__(self, app):
+        self.app = app
+        self.max_age = app.config["AUTOCOMPLETE_MAX_AGE"]
+        self._indexes: dict = {}
+        self._built: dict = {}
+        # tenant -> change lists committed while its index is being built
+        self._pending: dict = {}
+        self._lock = threading.Lock()
+        self._rebuilding = threading.Lock()
+
+    def _load(self, tenant) -> None:
+        """Build the tenant's indexes and install them. Commits applied
+        while _build() reads would otherwise land in the index it replaces,
+        so they are buffered and replayed onto the new one. A commit that
+        finishes just as the reads start can be counted twice; that only
+        nudges a usage rank until the next rebuild."""
+        with self._lock:
+            self._pending[tenant] = []
+        try:
+            indexes = _build()
+        except BaseException:
+            with self._lock:
+                del self._pending[tenant]
+            raise
+        with self._lock:
+            self._indexes[tenant] = indexes
+            self._built[tenant] = time.monotonic()
+            for changes in self._pending.pop(tenant):
+                _apply_changes(indexes, changes)
+
+    def _fresh(self, tenant) -> None:
+        built = self._built.get(tenant)
+        if built is None:
+            with self._rebuilding:  # the first build: every caller waits for it
+                if tenant not in self._built:
+                    self._load(tenant)
+        elif self.max_age and time.monotonic() - built > self.max_age:
+            # later ones happen off the request path; until then the old index answers
+            if self._rebuilding.acquire(blocking=False):
+                threading.Thread(target=self._rebuild, args=(tenant,), daemon=True).start()
+
+    def _rebuild(self, tenant) -> None:
+        try:
+            with self.app.app_context():
+                if tenant is not None:
+                    g.tenant = tenant
+                try:
+                    self._load(tenant)
+                finally:
+                    db.session.remove()
+        except Exception:
+            self.app.logger.exception("autocomplete rebuild failed")
+            with self._lock:  # retry on a later request, not on every one
+                self._built[tenant] = time.monotonic()
+        finally:
+            self._rebuilding.release()
+
+    def search(self, kind: str, prefix: str, limit: int, where=None) -> list[tuple]:
+        """[(label, extra, uses)] for the current tenant."""
+        tenant = current_tenant()
+        self._fresh(tenant)
+        with self._lock:
+            index = self._indexes[tenant][kind]
+            return [(index.labels[i], index.extra[i], index.usage[i]) for i in index.search(prefix, limit, where)]
+
+    def apply(self, tenant, changes: list) -> None:
+        with self._lock:
+            if tenant in self._pending:
+                self._pending[tenant].append(changes)
+            indexes = self._indexes.get(tenant)
+            if indexes is not None:  # else the first build reads the committed rows
+                _apply_changes(indexes, changes)
+
+
+def _apply_changes(indexes: dict, changes: list) -> None:
+    components, vendors = indexes["components"], indexes["vendors"]
+    for kind, ident, value in changes:
+        if kind == "component":
+            if value is None:
+                components.remove(ident)
+            else:
+                components.put(ident, value["name"], value)
+        elif kind == "component_uses":
+            if ident in components.labels:
+                components.bump(ident, value)
+        elif kind == "vendor_uses":
+            if ident not in vendors.labels:
+                vendors.put(ident, ident)
+            vendors.bump(ident, value)
+            if vendors.usage[ident] <= 0:
+                vendors.remove(ident)
+
+
+def init_autocomplete(app) -> None:
+    app.extensions["autocomplete"] = Autocomplete(app)
+
+
+# --- incremental refresh: collect changes at flush, apply them at commit ---
+def _old(obj, attr: str):
+    hist = inspect(obj).attrs[attr].history
+    if hist.deleted:
+        return hist.deleted[0]
+    return hist.unchanged[0] if hist.unchanged else None
+
+
+def _vendor(vendor, deleted_at):
+    return vendor if vendor and vendor.strip() and deleted_at is None else None
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _collect(session, _ctx):
+    changes = []
+    for obj in session.new:
+        if isinstance(obj, Component):
+            changes.append(("component", obj.id, _component_extra(obj) if obj.deleted_at is None else None))
+        elif isinstance(obj, ProjectComponent):
+            changes.append(("component_uses", obj.component_id, 1))
+        elif isinstance(obj, Expense) and _vendor(obj.vendor, obj.deleted_at):
+            changes.append(("vendor_uses", obj.vendor, 1))
+    for obj in session.dirty:
+        state = inspect(obj)
+        if isinstance(obj, Component) and session.is_modified(obj):
+            changes.append(("component", obj.id, _component_extra(obj) if obj.deleted_at is None else None))
+        elif isinstance(obj, ProjectComponent) and state.attrs.component_id.history.has_changes():
+            changes.append(("component_uses", _old(obj, "component_id"), -1))
+            changes.append(("component_uses", obj.component_id, 1))
+        elif isinstance(obj, Expense) and (
+            state.attrs.vendor.history.has_changes() or state.attrs.deleted_at.history.has_changes()
+        ):
+            before = _vendor(_old(obj, "vendor"), _old(obj, "deleted_at"))
+            after = _vendor(obj.vendor, obj.deleted_at)
+            if before != after:
+                if before:
+                    changes.append(("vendor_uses", before, -1))
+                if after:
+                    changes.append(("vendor_uses", after, 1))
+    for obj in session.deleted:
+        if isinstance(obj, Component):
+            changes.append(("component", obj.id, None))
+        elif isinstance(obj, ProjectComponent):
+            changes.append(("component_uses", _old(obj, "component_id"), -1))
+        elif isinstance(obj, Expense) and _vendor(_old(obj, "vendor"), _old(obj, "deleted_at")):
+            changes.append(("vendor_uses", _old(obj, "vendor"), -1))
+    if changes:
+        session.info.setdefault("autocomplete", []).extend(changes)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _apply(session):
+    changes = session.info.pop("autocomplete", None)
+    if changes and has_app_context() and "autocomplete" in current_app.extensions:
+        current_app.extensions["autocomplete"].apply(current_tenant(), changes)
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _discard(session):
+    session.info.pop("autocomplete", None)
+
+
+# --- routes ---
+def _limit() -> int:
+    n = request.args.get("limit", DEFAULT_LIMIT, type=int)
+    return max(1, min(n, MAX_LIMIT))
+
+
+@bp.get("/components")
+@require_auth
+def complete_components():
+    cid = request.args.get("category_id", type=int)
+    where = (lambda extra: extra["category_id"] == cid) if cid else None
+    hits = current_app.extensions["autocomplete"].search(
+        "components", request.args.get("q", ""), _limit(), where
+    )
+    return jsonify(components=[{**extra, "uses": uses} for _, extra, uses in hits])
+
+
+@bp.get("/vendors")
+@require_auth
+def complete_vendors():
+    hits = current_app.extensions["autocomplete"].search("vendors", request.args.get("q", ""), _limit())
+    return jsonify(vendors=[{"vendor": label, "uses": uses} for label, _, uses in hits])
@@ -0,0 +1,281 @@
+# backend/backfill.py
+"""Online, resumable backfills for large tables.
+
+`batch_alter_table` on SQLite rebuilds the whole table inside one
+transaction, and an UPDATE over every row of expense_lines holds the write
+lock just as long: the API stalls until the migration is done. Split such
+changes in two instead:
+
+  1. the Alembic migration does only what is cheap: `op.add_column` for a
+     nullable column (an O(1) ALTER TABLE on SQLite, no batch copy), new
+     tables;
+  2. the rows are filled in afterwards, with the API up, by a backfill
+     registered here:
+
+       flask backfill list
+       flask backfill run expense-line-totals [--chunk 2000] [--pause 0.05] [--duty 0.5]
+       flask backfill run expense-line-totals --dry-run    # estimate only
+       flask backfill status
+
+A backfill walks its table in primary-key ranges of `--chunk` rows. Each
+range is processed and committed together with the job's row in
+backfill_checkpoints, so a run can be interrupted at any point and picks up
+after the last committed chunk (`--restart` starts over). Between chunks the
+runner sleeps so that writers get the lock back: at least `--pause` seconds,
+and long enough that the job holds the database at most `--duty` of the
+time. A chunk that finds the database locked is rolled back and retried
+with backoff.
+
+Register one with the decorator; the step gets a half-open id range and
+runs inside the chunk's transaction:
+
+    @backfill("expense-line-totals", ExpenseLine.__table__)
+    def expense_line_totals(lo, hi) -> int:
+        ...update rows with lo < id <= hi through db.session...
+        return rows_changed
+"""
+from __future__ import annotations
+import math
+import time
+import click
+from flask import Blueprint, current_app
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.exc import OperationalError
+from .extensions import db
+from .models import BackfillCheckpoint, ExpenseLine, utcnow
+from .money import from_cents, line_total_cents
+
+bp = Blueprint("backfill", __name__)
+
+DEFAULT_CHUNK = 2000
+LOCK_RETRIES = 8
+
+
+class Backfill:
+    def __init__(self, name: str, table, step):
+        self.name = name
+        self.table = table
+        self.step = step
+        self.description = (step.__doc__ or "").strip().split("\n")[0]
+
+
+BACKFILLS: dict[str, Backfill] = {}
+
+
+def backfill(name: str, table):
+    """Register `step(lo, hi) -> rows changed` as backfill `name` over `table`."""
+    def register(step):
+        BACKFILLS[name] = Backfill(name, table, step)
+        return step
+    return register
+
+
+def get_backfill(name: str) -> Backfill:
+    try:
+        return BACKFILLS[name]
+    except KeyError:
+        raise LookupError(f"unknown backfill {name!r} (flask backfill list)") from None
+
+
+# --- runner ---
+def _checkpoint(name: str, restart: bool = False) -> BackfillCheckpoint:
+    cp = BackfillCheckpoint.query.filter_by(name=name).first()
+    if cp is None:
+        cp = BackfillCheckpoint(name=name)
+        db.session.add(cp)
+    if restart or cp.last_id is None:
+        cp.last_id, cp.rows_changed, cp.finished_at = 0, 0, None
+        cp.started_at = utcnow()
+    db.session.commit()
+    return cp
+
+
+def _next_bound(table, after: int, chunk: int) -> int | None:
+    """Upper id of the next chunk: the chunk-th id after `after`, or the
+    last one when fewer remain. None when the table is done."""
+    pk = table.c.id
+    hi = db.session.scalar(select(pk).where(pk > after).order_by(pk).offset(chunk - 1).limit(1))
+    if hi is None:
+        hi = db.session.scalar(select(func.max(pk)).where(pk > after))
+    return hi
+
+
+def _is_locked(e: OperationalError) -> bool:
+    return "locked" in str(e.orig).lower() or "busy" in str(e.orig).lower()
+
+
+def _run_chunk(job: Backfill, cp: BackfillCheckpoint, hi: int) -> int:
+    """One chunk and its checkpoint in one transaction, retried while locked."""
+    lo = cp.last_id
+    for attempt in range(LOCK_RETRIES + 1):
+        try:
+            changed = job.step(lo, hi)
+            cp.last_id = hi
+            cp.rows_changed += changed
+            db.session.commit()
+            return changed
+        except OperationalError as e:
+            db.session.rollback()
+            if not _is_locked(e) or attempt == LOCK_RETRIES:
+                raise
+            time.sleep(min(5.0, 0.1 * 2 ** attempt))
+    raise AssertionError("unreachable")
+
+
+def _throttle(busy: float, pause: float, duty: float) -> float:
+    """Seconds to sleep after `busy` seconds of work."""
+    return max(pause, busy * (1 / duty - 1)) if duty < 1 else pause
+
+
+def run_backfill(job: Backfill, chunk: int, pause: float = 0.0, duty: float = 1.0,
+                 restart: bool = False, max_chunks: int | None = None, progress=None) -> BackfillCheckpoint:
+    """Process `job` from its checkpoint to the end of the table (or for
+    `max_chunks` chunks). `progress(cp, chunk_seconds)` is called after each commit."""
+    cp = _checkpoint(job.name, restart)
+    done = 0
+    while max_chunks is None or done < max_chunks:
+        t0 = time.perf_counter()
+        hi = _next_bound(job.table, cp.last_id, chunk)
+        if hi is None:
+            cp.finished_at = utcnow()
+            db.session.commit()
+            break
+        _run_chunk(job, cp, hi)
+        done += 1
+        busy = time.perf_counter() - t0
+        if progress:
+            progress(cp, busy)
+        time.sleep(_throttle(busy, pause, duty))
+    return cp
+
+
+def estimate(job: Backfill, chunk: int, pause: float = 0.0, duty: float = 1.0,
+             restart: bool = False, samples: int = 3) -> dict:
+    """Time `samples` chunks from where a run would start, roll them back,
+    and extrapolate to the rows still ahead."""
+    cp = BackfillCheckpoint.query.filter_by(name=job.name).first()
+    after = 0 if restart or cp is None or cp.last_id is None else cp.last_id
+    pk = job.table.c.id
+    remaining = db.session.scalar(select(func.count()).select_from(job.table).where(pk > after))
+    timings, changed, lo = [], 0, after
+    try:
+        for _ in range(samples):
+            t0 = time.perf_counter()
+            hi = _next_bound(job.table, lo, chunk)
+            if hi is None:
+                break
+            changed += job.step(lo, hi)
+            timings.append(time.perf_counter() - t0)
+            lo = hi
+    finally:
+        db.session.rollback()
+    chunks = math.ceil(remaining / chunk)
+    per_chunk = sum(timings) / len(timings) if timings else 0.0
+    return {
+        "from_id": after,
+        "remaining_rows": remaining,
+        "chunks": chunks,
+        "seconds_per_chunk": per_chunk,
+        "sampled_changed": changed,
+        "sampled_rows": min(remaining, chunk * len(timings)),
+        "busy_seconds": chunks * per_chunk,
+        "total_seconds": chunks * (per_chunk + _throttle(per_chunk, pause, duty)),
+    }
+
+
+# --- backfills ---
+@backfill("expense-line-totals", ExpenseLine.__table__)
+def expense_line_totals(lo: int, hi: int) -> int:
+    """Recompute expense_lines.line_total_cents from qty x unit price."""
+    el = ExpenseLine.__table__
+    # Money columns: the table holds cents, Python sees dollars
+    rows = db.session.execute(
+        select(
+            el.c.id, el.c.qty,
+            el.c.unit_price_cents.label("unit_price_usd"), el.c.line_total_cents.label("line_total_usd"),
+        ).where(el.c.id > lo, el.c.id <= hi)
+    ).all()
+    stale = []
+    for r in rows:
+        total = from_cents(line_total_cents(r.qty, r.unit_price_usd))
+        if total != r.line_total_usd:
+            stale.append({"lid": r.id, "total": total})
+    if stale:
+        db.session.execute(
+            update(el).where(el.c.id == bindparam("lid")).values(line_total_cents=bindparam("total")),
+            stale,
+        )
+    return len(stale)
+
+
+# --- CLI ---
+def _duration(seconds: float) -> str:
+    if seconds < 60:
+        return f"{seconds:.1f}s"
+    m, s = divmod(int(round(seconds)), 60)
+    h, m = divmod(m, 60)
+    return f"{h}h{m:02d}m{s:02d}s" if h else f"{m}m{s:02d}s"
+
+
+@bp.cli.command("list")
+def list_backfills():
+    """Registered backfills."""
+    for name, job in sorted(BACKFILLS.items()):
+        click.echo(f"{name:24} {job.table.name:20} {job.description}")
+
+
+@bp.cli.command("run")
+@click.argument("name")
+@click.option("--chunk", type=int, default=None, help="Rows per transaction (default BACKFILL_CHUNK_SIZE).")
+@click.option("--pause", type=float, default=None, help="Minimum seconds between chunks (default BACKFILL_PAUSE).")
+@click.option("--duty", type=float, default=None, help="Max fraction of time spent writing, 0-1 (default BACKFILL_DUTY).")
+@click.option("--restart", is_flag=True, help="Ignore the checkpoint and start from the first row.")
+@click.option("--dry-run", is_flag=True, help="Time a few chunks, roll them back and estimate the run.")
+def run(name, chunk, pause, duty, restart, dry_run):
+    """Run (or resume) one backfill."""
+    try:
+        job = get_backfill(name)
+    except LookupError as e:
+        raise click.ClickException(str(e))
+    cfg = current_app.config
+    chunk = chunk or cfg.get("BACKFILL_CHUNK_SIZE", DEFAULT_CHUNK)
+    pause = cfg.get("BACKFILL_PAUSE", 0.0) if pause is None else pause
+    duty = cfg.get("BACKFILL_DUTY", 1.0) if duty is None else duty
+    if chunk < 1 or not 0 < duty <= 1:
+        raise click.ClickException("--chunk must be >= 1 and --duty in (0, 1]")
+
+    if dry_run:
+        est = estimate(job, chunk, pause, duty, restart=restart)
+        click.echo(
+            f"{name}: {est['remaining_rows']} rows after id {est['from_id']} in {est['chunks']} chunks of {chunk}; "
+            f"{est['seconds_per_chunk'] * 1000:.1f} ms per chunk "
+            f"({est['sampled_changed']} of {est['sampled_rows']} sampled rows would change)"
+        )
+        click.echo(f"estimated {_duration(est['total_seconds'])} ({_duration(est['busy_seconds'])} writing)")
+        return
+
+    started = time.perf_counter()
+    last_echo = [0.0]
+
+    def progress(cp, busy):
+        now = time.perf_counter()
+        if now - last_echo[0] >= 5:
+            last_echo[0] = now
+            click.echo(f"{name}: through id {cp.last_id}, {cp.rows_changed} changed ({busy * 1000:.0f} ms/chunk)")
+
+    cp = run_backfill(job, chunk, pause, duty, restart=restart, progress=progress)
+    click.echo(f"{name}: done through id {cp.last_id}, {cp.rows_changed} rows changed "
+               f"in {_duration(time.perf_counter() - started)}")
+
+
+@bp.cli.command("status")
+def status():
+    """Checkpoint of every backfill that has run."""
+    seen = {cp.name: cp for cp in BackfillCheckpoint.query.order_by(BackfillCheckpoint.name)}
+    for name in sorted(set(seen) | set(BACKFILLS)):
+        cp = seen.get(name)
+        if cp is None:
+            click.echo(f"{name}: not started")
+            continue
+        state = f"finished {cp.finished_at:%Y-%m-%d %H:%M}" if cp.finished_at else f"at id {cp.last_id}"
+        click.echo(f"{name}: {state}, {cp.rows_changed} rows changed, started {cp.started_at:%Y-%m-%d %H:%M}")
@@ -0,0 +1,128 @@
+# backend/batch.py
+from __future__ import annotations
+from contextlib import contextmanager
+from flask import Blueprint, current_app, jsonify, request, g
+from werkzeug.exceptions import HTTPException
+from werkzeug.test import EnvironBuilder
+from .extensions import db
+from .auth import require_auth
+from .events import broker
+
+bp = Blueprint("batch", __name__, url_prefix="/api")
+
+MAX_BATCH = 25
+# streaming or recursive endpoints make no sense inside a batch
+DENIED_ENDPOINTS = {"batch.run_batch", "events.project_events"}
+# sign-in/out endpoints answer with cookies, which a batch drops, and change
+# which token the rest of the batch runs under
+DENIED_PREFIXES = ("auth.",)
+ALLOWED_METHODS = {"GET", "POST", "PATCH", "PUT", "DELETE"}
+
+
+@contextmanager
+def _deferred_commit(session):
+    """Turn the views' own commit() calls into flushes so the batch can
+    commit or roll back everything at the end."""
+    session.commit = session.flush
+    try:
+        yield
+    finally:
+        del session.commit
+
+
+def _dispatch(item: dict) -> tuple[int, object]:
+    """Run one sub-request in the current app context (same DB session),
+    with the app's before/after request hooks as a real request would.
+    Returns (status, body)."""
+    method = str(item.get("method") or "GET").upper()
+    path = item.get("path") or ""
+    if method not in ALLOWED_METHODS or not path.startswith("/api/"):
+        return 400, {"error": "method and an /api/... path are required"}
+
+    builder = EnvironBuilder(
+        path=path,
+        method=method,
+        json=item.get("body") if method != "GET" else None,
+        headers={k: v for k, v in request.headers.items() if k in ("Authorization", "Cookie")},
+        environ_base={"REMOTE_ADDR": request.remote_addr},
+    )
+    try:
+        environ = builder.get_environ()
+    finally:
+        builder.close()
+
+    with current_app.request_context(environ):
+        try:
+            rule = request.url_rule
+            if rule is not None and (rule.endpoint in DENIED_ENDPOINTS or rule.endpoint.startswith(DENIED_PREFIXES)):
+                return 400, {"error": "endpoint not allowed in a batch"}
+            rv = current_app.preprocess_request()
+            if rv is None:
+                rv = current_app.dispatch_request()
+            resp = current_app.process_response(current_app.make_response(rv))
+        except HTTPException as e:
+            return e.code or 500, {"error": e.description}
+        except Exception:
+            current_app.logger.exception("batch sub-request failed: %s %s", method, path)
+            db.session.rollback()
+            return 500, {"error": "internal error"}
+        finally:
+            # g outlives the sub-request: the next one checks its token afresh
+            g.pop("_token_claims", None)
+        body = resp.get_json(silent=True) if resp.is_json else resp.get_data(as_text=True)
+        return resp.status_code, body
+
+
+@bp.post("/batch")
+@require_auth
+def run_batch():
+    """Run several API calls in one round trip.
+    Body:
+      {"requests": [{"id": "opt-key", "method": "GET", "path": "/api/projects/1", "body": {...}}],
+       "atomic": false}
+    Sub-requests run in order under one auth check and one DB session.
+    With atomic=true the batch stops at the first 4xx/5xx, rolls back every
+    write and reports committed=false; live events are only sent on commit.
+    Jobs a sub-request queued (backend/jobs.py, a separate database) are not
+    rolled back. /api/auth/* calls are refused.
+    """
+    data = request.get_json(silent=True) or {}
+    items = data.get("requests")
+    if not isinstance(items, list) or not items:
+        return jsonify(error="requests must be a non-empty list"), 400
+    if len(items) > MAX_BATCH:
+        return jsonify(error=f"at most {MAX_BATCH} requests per batch"), 400
+    atomic = bool(data.get("atomic"))
+
+    responses = []
+    if not atomic:
+        for item in items:
+            item = item if isinstance(item, dict) else {}
+            status, body = _dispatch(item)
+            responses.append({"id": item.get("id"), "status": status, "body": body})
+        return jsonify(responses=responses)
+
+    session = db.session()
+    failed_index = None
+    with broker.hold() as held, _deferred_commit(session):
+        for i, item in enumerate(items):
+            item = item if isinstance(item, dict) else {}
+            if failed_index is not None:
+                responses.append({"id": item.get("id"), "status": 424, "body": {"error": "not run"}})
+                continue
+            status, body = _dispatch(item)
+            responses.append({"id": item.get("id"), "status": status, "body": body})
+            if status >= 400:
+                failed_index = i
+
+    if failed_index is None:
+        db.session.commit()
+        broker.publish_all(held)
+    else:
+        db.session.rollback()
+    return jsonify(
+        responses=responses,
+        atomic=True,
+        committed=failed_index is None,
+        failed_index=failed_index,
+    )
@@ -0,0 +1,50 @@
+"""Benchmarks: `python -m backend.benchmarks.<name> --help`.
+
+Every benchmark runs against throwaway databases, never the app's own:
+in-process ones build the app with `make_app(tmp)`, ones that configure
+through the environment (subprocesses, module-level setup) use
+`db_env(db_path)` and clean up with `remove_db(db_path)`. Both redirect the
+side files too (event log, job queue, auth store): commits fire hooks that
+write to them.
+"""
+import os
+
+# config key -> suffix of its file next to the main database
+SIDE_DBS = {"EVENTS_DB": ".events", "JOBS_DB": ".jobs", "AUTH_DB": ".auth"}
+
+
+def pct(samples: list[float], digits: int = 1, width: int = 9) -> str:
+    """p50, p99 and max of `samples` (seconds) in ms, as three columns."""
+    if not samples:
+        return " ".join([f"{0:{width}.{digits}f}"] * 3)
+    s = sorted(samples)
+    at = lambda q: s[min(len(s) - 1, int(q * len(s)))] * 1000  # noqa: E731
+    return " ".join(f"{v:{width}.{digits}f}" for v in (at(0.5), at(0.99), s[-1] * 1000))
+
+
+def make_app(tmp: str, **config):
+    """create_app() with every database in the directory `tmp`; keyword
+    arguments are extra config values."""
+    from backend.app import create_app
+    from backend.config import Config
+
+    BenchConfig = type("BenchConfig", (Config,), {
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp}/main.db",
+        **{key: f"{tmp}/{suffix[1:]}.db" for key, suffix in SIDE_DBS.items()},
+        **config,
+    })
+    return create_app(BenchConfig)
+
+
+def db_env(db_path: str) -> dict:
+    """Environment variables pointing the app at `db_path` and side files
+    next to it."""
+    return {"DATABASE_URL": f"sqlite:///{db_path}", **{key: db_path + suffix for key, suffix in SIDE_DBS.items()}}
+
+
+def remove_db(db_path: str) -> None:
+    """Delete `db_path`, its side files and their WAL files."""
+    for name in ("", *SIDE_DBS.values()):
+        for wal in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + name + wal):
+                os.unlink(db_path + name + wal)
@@ -0,0 +1,120 @@
+"""WSGI vs ASGI under 1k concurrent clients.
+
+    python -m backend.benchmarks.asgi [--clients 1000] [--duration 15]
+                                      [--workers 4] [--threads 4]
+                                      [--modes gthread,uvicorn]
+
+Same seeded database and request mixes as backend.benchmarks.load, but
+the clients are asyncio connections instead of threads, so a thousand of
+them cost the load generator little. Every client holds a keep-alive
+connection and issues its next request as soon as the previous one is
+answered; connections the server refuses or drops count as errors and are
+reopened.
+"""
+import argparse
+import asyncio
+import importlib.util
+import os
+import random
+import sys
+import tempfile
+import time
+from . import remove_db
+from .load import NEEDS, _free_port, _mixes, _seed, _start_server
+
+
+async def _client(port: int, token: str, paths_for, stop: float, seed: int, out: dict) -> None:
+    rng = random.Random(seed)
+    request = "GET {} HTTP/1.1\r\nHost: 127.0.0.1\r\nAuthorization: Bearer " + token + "\r\n\r\n"
+    conn = None
+    while time.perf_counter() < stop:
+        for path in paths_for(rng):
+            t0 = time.perf_counter()
+            try:
+                if conn is None:
+                    conn = await asyncio.open_connection("127.0.0.1", port)
+                reader, writer = conn
+                writer.write(request.format(path).encode())
+                status = int((await reader.readline()).split()[1])
+                length, close = 0, False
+                while (line := await reader.readline()) not in (b"\r\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    name = name.strip().lower()
+                    if name == "content-length":
+                        length = int(value)
+                    elif name == "connection" and value.strip().lower() == "close":
+                        close = True
+                await reader.readexactly(length)
+                if status != 200:
+                    out["errors"] += 1
+                if close:
+                    writer.close()
+                    conn = None
+            except (OSError, ValueError, IndexError, asyncio.IncompleteReadError):
+                out["errors"] += 1
+                if conn is not None:
+                    conn[1].close()
+                conn = None
+                await asyncio.sleep(0.05)
+                continue
+            out["latencies"].append(time.perf_counter() - t0)
+    if conn is not None:
+        conn[1].close()
+
+
+async def _run(port: int, token: str, paths_for, clients: int, duration: float) -> dict:
+    out = {"latencies": [], "errors": 0}
+    t0 = time.perf_counter()
+    stop = t0 + duration
+    await asyncio.gather(*(_client(port, token, paths_for, stop, i, out) for i in range(clients)))
+    elapsed = time.perf_counter() - t0
+    lat = sorted(out["latencies"])
+    pct = lambda q: lat[min(len(lat) - 1, int(q * len(lat)))] * 1000 if lat else 0.0  # noqa: E731
+    return {
+        "rps": len(lat) / elapsed,
+        "p50": pct(0.50),
+        "p95": pct(0.95),
+        "p99": pct(0.99),
+        "errors": out["errors"],
+    }
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--modes", default="gthread,uvicorn")
+    ap.add_argument("--clients", type=int, default=1000)
+    ap.add_argument("--duration", type=float, default=15.0)
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--threads", type=int, default=4)
+    ap.add_argument("--projects", type=int, default=20)
+    ap.add_argument("--mixes", default="dashboard,expenses")
+    args = ap.parse_args(argv)
+
+    fd, db_path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        token, pids = _seed(db_path, args.projects)
+        mixes = _mixes(pids)
+        print(f"{args.clients} clients, {args.workers} workers, {args.duration:.0f}s per run")
+        print(f"{'server':10} {'mix':10} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        for kind in [k.strip() for k in args.modes.split(",") if k.strip()]:
+            missing = [m for m in NEEDS.get(kind, ["gunicorn"]) if importlib.util.find_spec(m) is None]
+            if missing:
+                print(f"{kind:10} skipped: {', '.join(missing)} not installed")
+                continue
+            port = _free_port()
+            proc = _start_server(kind, port, db_path, args)
+            try:
+                for mix in [m.strip() for m in args.mixes.split(",") if m.strip()]:
+                    r = asyncio.run(_run(port, token, mixes[mix], args.clients, args.duration))
+                    print(f"{kind:10} {mix:10} {r['rps']:8.0f} {r['p50']:8.1f} {r['p95']:8.1f} {r['p99']:8.1f} {r['errors']:7d}")
+            finally:
+                proc.terminate()
+                proc.wait(timeout=30)
+    finally:
+        remove_db(db_path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
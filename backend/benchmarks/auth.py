@@ -0,0 +1,126 @@
+"""Cost of authenticating a request with the in-memory revocation set, and
+how fast a logout reaches another worker.
+
+    python -m backend.benchmarks.auth [--calls 20000] [--revoked 0,10000,100000]
+
+  verify        auth.access_claims() (decode + revocation lookup) per call,
+                with --revoked entries in the set
+  verify + db   the same plus one indexed SELECT on the revocations table:
+                what checking revocation in the database would add
+  refresh       POST /api/auth/refresh (rotation: one AUTH_DB transaction
+                and one insert)
+  propagation   logout in this process until a forked worker rejects the
+                token (AUTH_REVOCATION_SYNC_SECONDS apart)
+"""
+import argparse
+import multiprocessing
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from . import make_app, pct
+
+
+def _cookie(resp, name: str) -> str:
+    for header in resp.headers.getlist("Set-Cookie"):
+        key, value = header.split(";", 1)[0].split("=", 1)
+        if key == name:
+            return value
+    raise KeyError(name)
+
+
+def _watch(app, token, go, out) -> None:
+    from backend.auth import access_claims
+
+    secret = app.config["JWT_SECRET"]
+    access_claims(token, secret)  # starts this worker's poller
+    go.wait()
+    t0 = time.perf_counter()
+    while access_claims(token, secret) is not None:
+        time.sleep(0.001)
+    out.put(time.perf_counter() - t0)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--calls", type=int, default=20_000)
+    ap.add_argument("--revoked", default="0,10000,100000")
+    ap.add_argument("--logouts", type=int, default=10)
+    args = ap.parse_args(argv)
+
+    from backend.auth import access_claims
+    from backend.extensions import db
+    from backend.tokens import revocations
+
+    ctx = multiprocessing.get_context("fork")
+    tmp = tempfile.mkdtemp()
+    rows = []
+    try:
+        app = make_app(tmp)
+        with app.app_context():
+            db.create_all()
+        c = app.test_client()
+        r = c.post("/api/auth/register", json={"name": "b", "email": "b@example.com", "password": "benchmark1"})
+        token = _cookie(r, app.config["COOKIE_NAME"])
+        secret = app.config["JWT_SECRET"]
+        store = app.extensions["tokens"]
+        conn = store._conn()
+        # what a database check would need; the in-memory set does not
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_bench_revocations_key ON revocations (key)")
+        claims = access_claims(token, secret)
+
+        for n in [int(x) for x in args.revoked.split(",")]:
+            have = conn.execute("SELECT count(*) FROM revocations").fetchone()[0]
+            if n > have:
+                store.revoke([uuid.uuid4().hex for _ in range(n - have)], time.time() + 3600)
+                time.sleep(2 * app.config["AUTH_REVOCATION_SYNC_SECONDS"])
+            lat, db_lat = [], []
+            for _ in range(args.calls):
+                t0 = time.perf_counter()
+                access_claims(token, secret)
+                lat.append(time.perf_counter() - t0)
+            for _ in range(args.calls):
+                t0 = time.perf_counter()
+                access_claims(token, secret)
+                conn.execute(
+                    "SELECT 1 FROM revocations WHERE key IN (?, ?) LIMIT 1", (claims["jti"], claims["fam"])
+                ).fetchone()
+                db_lat.append(time.perf_counter() - t0)
+            rows.append((f"verify ({len(revocations)})", pct(lat, 3)))
+            rows.append(("verify + db", pct(db_lat, 3)))
+
+        lat = []
+        for _ in range(200):
+            t0 = time.perf_counter()
+            r = c.post("/api/auth/refresh")
+            lat.append(time.perf_counter() - t0)
+            assert r.status_code == 200, r.json
+        rows.append(("refresh", pct(lat, 3)))
+
+        lags = []
+        for _ in range(args.logouts):
+            s = app.test_client()
+            r = s.post("/api/auth/login", json={"email": "b@example.com", "password": "benchmark1"})
+            victim = _cookie(r, app.config["COOKIE_NAME"])
+            go, out = ctx.Event(), ctx.Queue()
+            proc = ctx.Process(target=_watch, args=(app, victim, go, out))
+            proc.start()
+            time.sleep(0.3)
+            go.set()
+            s.post("/api/auth/logout")
+            lags.append(out.get())
+            proc.join()
+        rows.append(("propagation", pct(lags, 3)))
+
+        print(f"{args.calls} calls; sync every {app.config['AUTH_REVOCATION_SYNC_SECONDS']}s")
+        print(f"{'step':20} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+        for label, numbers in rows:
+            print(f"{label:20} {numbers}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""Autocomplete latency: prefix index vs the `ilike` component search.
+
+    python -m backend.benchmarks.autocomplete [--components 50000]
+                                              [--vendors 20000] [--queries 2000]
+
+Seeds a throwaway database with components (spread over BOM rows with a
+skewed usage) and expenses from a skewed set of vendors, then times random
+1-4 character prefixes of real names:
+
+  index      PrefixIndex.search alone (what the budget is about)
+  endpoint   GET /api/autocomplete/components through the Flask test client
+  ilike      GET /api/components?q= (the existing full-list search)
+
+plus the initial build and the cost of one committed change.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date
+from . import db_env, pct, remove_db
+
+WORDS = (
+    "copper steel pvc brass cable pipe elbow valve bracket anchor bolt screw "
+    "panel breaker conduit fitting flange gasket hinge joist lumber mortar "
+    "nail plate rebar sealant tile washer wire"
+).split()
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--components", type=int, default=50_000)
+    ap.add_argument("--vendors", type=int, default=20_000)
+    ap.add_argument("--queries", type=int, default=2000)
+    args = ap.parse_args(argv)
+
+    fd, db_path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    os.environ.update(db_env(db_path))
+    from sqlalchemy import insert
+    from backend.app import create_app
+    from backend.extensions import db
+    from backend.models import Category, Client, Component, Expense, Project, ProjectComponent
+
+    rng = random.Random(7)
+    app = create_app()
+    try:
+        with app.app_context():
+            db.create_all()
+            db.session.execute(insert(Category), [{"name": f"Cat {i}"} for i in range(20)])
+            db.session.execute(insert(Client), [{"name": "Bench"}])
+            db.session.execute(insert(Project), [{"client_id": 1, "name": f"P{i}", "code": f"B-{i}"} for i in range(200)])
+            names = [
+                f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {i}mm"
+                for i in range(args.components)
+            ]
+            db.session.execute(insert(Component), [
+                {"category_id": 1 + i % 20, "name": n} for i, n in enumerate(names)
+            ])
+            bom = {(1 + int(rng.paretovariate(1.2)) % args.components, 1 + p) for p in range(200) for _ in range(200)}
+            db.session.execute(insert(ProjectComponent), [
+                {"project_id": pid, "category_id": 1 + (cid - 1) % 20, "component_id": cid, "quantity": 1}
+                for cid, pid in bom
+            ])
+            vendors = [f"{rng.choice(WORDS).title()} {rng.choice(('Supply', 'Depot', 'Traders', 'Co'))} {i}" for i in range(args.vendors)]
+            db.session.execute(insert(Expense), [
+                {"project_id": 1 + i % 200, "expense_date": date(2026, 1, 1),
+                 "vendor": vendors[int(rng.paretovariate(1.1)) % len(vendors)]}
+                for i in range(args.vendors * 3)
+            ])
+            db.session.commit()
+
+        c = app.test_client()
+        c.post("/api/auth/register", json={"name": "b", "email": "b@example.com", "password": "benchmark1"})
+        prefixes = [n.split()[rng.randrange(2)][: rng.randint(1, 4)] for n in rng.sample(names, args.queries)]
+
+        ac = app.extensions["autocomplete"]
+        with app.test_request_context():
+            t0 = time.perf_counter()
+            ac.search("components", "", 10)
+            build = time.perf_counter() - t0
+            index = ac._indexes[None]["components"]
+            direct = []
+            for q in prefixes:
+                index._top.clear()  # time the scan, not the short-prefix cache
+                t0 = time.perf_counter()
+                index.search(q, 10)
+                direct.append(time.perf_counter() - t0)
+            cached = []
+            for q in prefixes:
+                t0 = time.perf_counter()
+                index.search(q, 10)
+                cached.append(time.perf_counter() - t0)
+
+        def timed(path_for):
+            out = []
+            for q in prefixes[: min(len(prefixes), 300)]:
+                t0 = time.perf_counter()
+                r = c.get(path_for(q))
+                out.append(time.perf_counter() - t0)
+                assert r.status_code == 200
+            return out
+
+        endpoint = timed(lambda q: f"/api/autocomplete/components?q={q}")
+        ilike = timed(lambda q: f"/api/components?q={q}")
+
+        t0 = time.perf_counter()
+        c.post("/api/components", json={"category_id": 1, "name": "Bench widget"})
+        write = time.perf_counter() - t0
+
+        print(f"{args.components} components ({len(index._keys)} keys), {args.vendors} vendors; "
+              f"initial build {build * 1000:.0f} ms")
+        print(f"{'path':22} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+        print(f"{'index (no cache)':22} {pct(direct, 3, 8)}")
+        print(f"{'index (warm)':22} {pct(cached, 3, 8)}")
+        print(f"{'endpoint':22} {pct(endpoint, 3, 8)}")
+        print(f"{'ilike /components?q=':22} {pct(ilike, 3, 8)}")
+        print(f"component create incl. index delta: {write * 1000:.1f} ms")
+    finally:
+        remove_db(db_path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
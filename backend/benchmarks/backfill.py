@@ -0,0 +1,153 @@
+"""Writer latency during a table-wide backfill: one UPDATE vs chunked.
+
+    python -m backend.benchmarks.backfill [--lines 1000000] [--chunk 2000]
+                                          [--pause 0.05] [--duty 0.5] [--wal]
+
+Seeds `--lines` expense lines whose stored totals are a third wrong, then
+for each mode rewrites them while a writer process keeps creating tasks
+(as in backend.benchmarks.reports):
+
+  idle      no backfill: the writer's baseline
+  update    one UPDATE over the whole table in one transaction, what an
+            Alembic migration would run
+  chunked   flask backfill run expense-line-totals, unthrottled
+  throttled the same with --pause / --duty
+
+Before the throttled run its --dry-run estimate is printed, to compare
+with the time the run actually took.
+"""
+import argparse
+import multiprocessing
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date
+from . import make_app, pct
+
+
+def _seed(app, n_lines: int) -> tuple[dict, int]:
+    from sqlalchemy import insert
+    from backend.extensions import db
+    from backend.models import Expense, ExpenseLine
+
+    with app.app_context():
+        db.create_all()
+    c = app.test_client()
+    r = c.post("/api/auth/register", json={"name": "bench", "email": "bench@example.com", "password": "benchmark1"})
+    token = r.headers["Set-Cookie"].split("=", 1)[1].split(";", 1)[0]
+    c.delete_cookie(app.config["COOKIE_NAME"])
+    h = {"Authorization": f"Bearer {token}"}
+    client = c.post("/api/clients", json={"name": "bench"}, headers=h).json
+    cat = c.post("/api/categories", json={"name": "Cat"}, headers=h).json["id"]
+    pid = c.post("/api/projects", json={"client_id": client["id"], "name": "P"}, headers=h).json["id"]
+    rng = random.Random(3)
+    with app.app_context():
+        n_expenses = max(1, n_lines // 5)
+        db.session.execute(insert(Expense), [
+            {"project_id": pid, "expense_date": date(2026, 1, 1)} for _ in range(n_expenses)
+        ])
+        for start in range(0, n_lines, 100_000):
+            db.session.execute(insert(ExpenseLine), [
+                {"expense_id": 1 + i // 5, "category_id": cat, "qty": 2, "unit_price_usd": 12.5,
+                 "line_total_usd": 25.0 if rng.random() > 0.33 else 0.0}
+                for i in range(start, min(start + 100_000, n_lines))
+            ])
+        db.session.commit()
+    return h, pid
+
+
+def _writer(app, headers, pid, stop, out) -> None:
+    from backend.extensions import dispose_engines
+
+    dispose_engines(app)
+    c = app.test_client()
+    latencies, errors = [], 0
+    while time.time() < stop.value:
+        t0 = time.perf_counter()
+        r = c.post(f"/api/projects/{pid}/tasks", json={"title": "bench"}, headers=headers)
+        latencies.append(time.perf_counter() - t0)
+        if r.status_code != 201:
+            errors += 1
+    out.put((latencies, errors))
+
+
+def _corrupt(app) -> None:
+    from sqlalchemy import text
+    from backend.extensions import db
+
+    with app.app_context():
+        db.session.execute(text("UPDATE expense_lines SET line_total_cents = 0 WHERE id % 3 = 0"))
+        db.session.execute(text("DELETE FROM backfill_checkpoints"))
+        db.session.commit()
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--lines", type=int, default=1_000_000)
+    ap.add_argument("--chunk", type=int, default=2000)
+    ap.add_argument("--pause", type=float, default=0.05)
+    ap.add_argument("--duty", type=float, default=0.5)
+    ap.add_argument("--idle", type=float, default=5.0, help="seconds of writer baseline")
+    ap.add_argument("--wal", action="store_true", help="WAL + synchronous=NORMAL (ProductionConfig default)")
+    args = ap.parse_args(argv)
+
+    ctx = multiprocessing.get_context("fork")
+    tmp = tempfile.mkdtemp()
+    try:
+        app = make_app(tmp, SQLITE_WAL=args.wal)
+        headers, pid = _seed(app, args.lines)
+        print(f"{args.lines} expense lines, chunk {args.chunk}, journal={'WAL' if args.wal else 'rollback'}")
+        print(f"{'mode':10} {'seconds':>8} {'writes':>7} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7}")
+
+        def update_all():
+            from sqlalchemy import text
+            from backend.extensions import db
+            with app.app_context():
+                db.session.execute(text(
+                    "UPDATE expense_lines SET line_total_cents = CAST(ROUND(qty * unit_price_cents) AS INTEGER)"
+                ))
+                db.session.commit()
+
+        def chunked(pause, duty):
+            def go():
+                from backend.backfill import get_backfill, run_backfill
+                with app.app_context():
+                    run_backfill(get_backfill("expense-line-totals"), args.chunk, pause, duty)
+            return go
+
+        modes = [
+            ("idle", lambda: time.sleep(args.idle)),
+            ("update", update_all),
+            ("chunked", chunked(0.0, 1.0)),
+            ("throttled", chunked(args.pause, args.duty)),
+        ]
+        for mode, job in modes:
+            _corrupt(app)
+            if mode == "throttled":
+                from backend.backfill import estimate, get_backfill
+                with app.app_context():
+                    est = estimate(get_backfill("expense-line-totals"), args.chunk, args.pause, args.duty)
+                print(f"  dry-run estimate for throttled: {est['total_seconds']:.1f}s "
+                      f"({est['busy_seconds']:.1f}s writing)")
+            out = ctx.Queue()
+            # the writer runs for as long as the job does
+            stop = ctx.Value("d", time.time() + 3600)
+            proc = ctx.Process(target=_writer, args=(app, headers, pid, stop, out))
+            proc.start()
+            time.sleep(0.5)
+            t0 = time.perf_counter()
+            job()
+            took = time.perf_counter() - t0
+            stop.value = time.time()
+            lat, errors = out.get()
+            proc.join()
+            print(f"{mode:10} {took:8.1f} {len(lat):7d} {pct(lat, 1, 8)} {errors:7d}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
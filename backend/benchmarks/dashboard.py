@@ -0,0 +1,132 @@
+"""Home dashboard load time as the portfolio grows: per-project requests vs
+the KPI snapshot.
+
+    python -m backend.benchmarks.dashboard [--projects 50,500,2000] [--requests 200]
+
+For each portfolio size (every project with 5 budget categories, 40
+expense lines and 30 tasks) it times:
+
+  per-project   what the dashboard did before: GET /projects, then
+                /tasks/progress, /expenses and /summary for every project
+                (one client, serially: the server work a page load causes)
+  kpis          GET /api/dashboard/kpis
+  kpis 304      the same with If-None-Match
+  refresh       flask dashboard refresh (the background work)
+  write burst   100 task creations: refresh jobs they queued (0 when they
+                land in the debounce window the seeding already queued)
+"""
+import argparse
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from . import make_app, pct
+
+
+def _seed(app, n_projects: int) -> list[int]:
+    from sqlalchemy import insert, select
+    from backend.extensions import db
+    from backend.models import Category, Client, Expense, ExpenseLine, Project, ProjectCategory, Task
+
+    rng = random.Random(5)
+    today = date.today()
+    with app.app_context():
+        db.session.execute(insert(Client), [{"name": "bench"}])
+        db.session.execute(insert(Category), [{"name": f"Cat {i}"} for i in range(10)])
+        db.session.execute(insert(Project), [
+            {"client_id": 1, "code": f"PB-{i:06d}", "name": f"P{i}",
+             "status": rng.choice(("planned", "active", "active", "completed")),
+             "budget_amount_usd": rng.choice((None, 50_000.0, 120_000.0))}
+            for i in range(n_projects)
+        ])
+        pids = db.session.scalars(select(Project.id).order_by(Project.id)).all()
+        db.session.execute(insert(ProjectCategory), [
+            {"project_id": pid, "category_id": 1 + c, "base_cost_usd": rng.randrange(5_000, 30_000)}
+            for pid in pids for c in range(5)
+        ])
+        db.session.execute(insert(Expense), [
+            {"project_id": pid, "expense_date": today - timedelta(days=rng.randrange(300))}
+            for pid in pids for _ in range(20)
+        ])
+        db.session.execute(insert(ExpenseLine), [
+            {"expense_id": eid, "category_id": 1 + rng.randrange(5), "qty": 1,
+             "unit_price_usd": (price := rng.randrange(100, 2500)), "line_total_usd": price}
+            for eid in range(1, 20 * len(pids) + 1) for _ in range(2)
+        ])
+        db.session.execute(insert(Task), [
+            {"project_id": pid, "title": "t", "status": rng.choice(("todo", "doing", "done", "done")),
+             "due_date": today + timedelta(days=rng.randrange(-60, 120))}
+            for pid in pids for _ in range(30)
+        ])
+        db.session.commit()
+    return pids
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--projects", default="50,500,2000")
+    ap.add_argument("--requests", type=int, default=200)
+    args = ap.parse_args(argv)
+
+    rows = []
+    for n in [int(p) for p in args.projects.split(",")]:
+        tmp = tempfile.mkdtemp()
+        try:
+            from backend.extensions import db
+            from backend.jobs import _queue
+
+            app = make_app(tmp)
+            with app.app_context():
+                db.create_all()
+            pids = _seed(app, n)
+            c = app.test_client()
+            c.post("/api/auth/register", json={"name": "b", "email": "b@example.com", "password": "benchmark1"})
+
+            t0 = time.perf_counter()
+            c.get("/api/projects")
+            for pid in pids:
+                c.get(f"/api/projects/{pid}/tasks/progress")
+                c.get(f"/api/projects/{pid}/expenses")
+                c.get(f"/api/projects/{pid}/summary")
+            rows.append((n, "per-project", f"{(time.perf_counter() - t0) * 1000:9.0f}", f"{3 * n + 1} requests"))
+
+            cli = app.test_cli_runner()
+            t0 = time.perf_counter()
+            r = cli.invoke(args=["dashboard", "refresh"])
+            assert r.exit_code == 0, r.output
+            rows.append((n, "refresh", f"{(time.perf_counter() - t0) * 1000:9.1f}", "background"))
+
+            lat, cond = [], []
+            etag = None
+            for _ in range(args.requests):
+                t0 = time.perf_counter()
+                r = c.get("/api/dashboard/kpis")
+                lat.append(time.perf_counter() - t0)
+                etag = r.headers["ETag"]
+                t0 = time.perf_counter()
+                r = c.get("/api/dashboard/kpis", headers={"If-None-Match": etag})
+                cond.append(time.perf_counter() - t0)
+                assert r.status_code == 304
+            rows.append((n, "kpis", pct(lat, 2), ""))
+            rows.append((n, "kpis 304", pct(cond, 2), ""))
+
+            with app.app_context():
+                before = sum(k == "dashboard.refresh" and m for k, _s, m in _queue().counts())
+            for i in range(100):
+                c.post(f"/api/projects/{pids[i % n]}/tasks", json={"title": "burst"})
+            with app.app_context():
+                after = sum(k == "dashboard.refresh" and m for k, _s, m in _queue().counts())
+            rows.append((n, "write burst", f"{after - before:9d}", "refresh job(s) for 100 writes"))
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"{'projects':>8} {'step':12} {'ms (p50 p99 max) / n':>29}")
+    for n, label, numbers, note in rows:
+        print(f"{n:8d} {label:12} {numbers}  {note}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""Background job queue: enqueue cost, worker throughput, and a forecast
+moved out of the request.
+
+    python -m backend.benchmarks.jobs [--jobs 5000] [--workers 1,2,4] [--simulations 100000]
+                                      [--categories 20]
+
+  enqueue       jobs.enqueue() in a loop (what an endpoint adds to its request)
+  drain xN      N `flask jobs work --burst` processes emptying a queue of
+                --jobs no-op jobs: jobs per second
+  forecast      GET /forecast (inline) vs POST /forecast (202 + job id), and
+                POST until a running worker has finished the job
+"""
+import argparse
+import multiprocessing
+import shutil
+import sys
+import tempfile
+import time
+from . import make_app, pct
+
+
+def _work(app, burst: bool) -> None:
+    from backend.extensions import dispose_engines
+    from backend.jobs import work
+
+    dispose_engines(app)
+    with app.app_context():
+        work(app, burst=burst)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--jobs", type=int, default=5000)
+    ap.add_argument("--workers", default="1,2,4")
+    ap.add_argument("--simulations", type=int, default=100_000)
+    ap.add_argument("--categories", type=int, default=20)
+    args = ap.parse_args(argv)
+
+    from backend.extensions import db
+    from backend.jobs import enqueue, job
+
+    @job("bench.noop")
+    def _noop(payload):
+        return None
+
+    ctx = multiprocessing.get_context("fork")
+    tmp = tempfile.mkdtemp()
+    try:
+        app = make_app(tmp, JOBS_POLL_SECONDS=0.05)
+        with app.app_context():
+            db.create_all()
+        rows = []
+
+        with app.app_context():
+            lat = []
+            for i in range(args.jobs):
+                t0 = time.perf_counter()
+                enqueue("bench.noop", {"i": i})
+                lat.append(time.perf_counter() - t0)
+        rows.append(("enqueue", pct(lat, 2), ""))
+        # the first pass drains what `enqueue` queued
+        for n in [int(w) for w in args.workers.split(",")]:
+            with app.app_context():
+                if rows[-1][0] != "enqueue":
+                    for i in range(args.jobs):
+                        enqueue("bench.noop", {"i": i})
+            t0 = time.perf_counter()
+            procs = [ctx.Process(target=_work, args=(app, True)) for _ in range(n)]
+            for p in procs:
+                p.start()
+            for p in procs:
+                p.join()
+            took = time.perf_counter() - t0
+            rows.append((f"drain x{n}", f"{args.jobs / took:9.0f} jobs/s", f"({took:.2f}s for {args.jobs})"))
+
+        c = app.test_client()
+        c.post("/api/auth/register", json={"name": "b", "email": "b@example.com", "password": "benchmark1"})
+        cl = c.post("/api/clients", json={"name": "bench"}).json
+        pid = c.post("/api/projects", json={"client_id": cl["id"], "name": "P"}).json["id"]
+        for i in range(args.categories):
+            cat = c.post("/api/categories", json={"name": f"Cat {i}"}).json["id"]
+            c.post(f"/api/projects/{pid}/categories", json={"category_id": cat, "base_cost_usd": 1000})
+
+        inline, queued, finished = [], [], []
+        worker = ctx.Process(target=_work, args=(app, False))
+        worker.start()
+        try:
+            for seed in range(10):
+                t0 = time.perf_counter()
+                c.get(f"/api/projects/{pid}/forecast", query_string={"n": args.simulations, "seed": seed})
+                inline.append(time.perf_counter() - t0)
+                t0 = time.perf_counter()
+                r = c.post(f"/api/projects/{pid}/forecast", json={"n": args.simulations, "seed": 100 + seed})
+                queued.append(time.perf_counter() - t0)
+                jid = r.json["job"]["id"]
+                while c.get(f"/api/jobs/{jid}").json["state"] in ("queued", "running"):
+                    time.sleep(0.005)
+                finished.append(time.perf_counter() - t0)
+        finally:
+            worker.terminate()
+            worker.join()
+        rows.append(("forecast GET", pct(inline, 2), "inline"))
+        rows.append(("forecast POST", pct(queued, 2), "202"))
+        rows.append(("  until done", pct(finished, 2), f"worker polls every {app.config['JOBS_POLL_SECONDS']}s"))
+
+        print(f"{args.jobs} jobs, forecasts of {args.simulations} simulations x {args.categories} categories")
+        print(f"{'operation':16} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+        for label, numbers, note in rows:
+            print(f"{label:16} {numbers}  {note}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""Load test: gunicorn worker classes on the expense and dashboard endpoints.
+
+    python -m backend.benchmarks.load [--classes sync,gthread,gevent]
+                                      [--workers 4] [--threads 4]
+                                      [--clients 32] [--duration 10]
+
+Each worker class gets a fresh gunicorn (backend/gunicorn.conf.py, preloaded
+backend.wsgi:app) on a throwaway SQLite database seeded with projects,
+BOM rows and expenses. Keep-alive client threads then replay two mixes:
+
+  expenses   GET /api/projects/<id>/expenses
+  dashboard  GET /api/projects, /api/clients, /api/projects/<id>/summary,
+             /api/projects/<id>/tasks/progress   (what HomeView loads)
+
+Classes whose packages are missing are skipped. `werkzeug` (flask run
+--with-threads) is accepted as a reference point, `uvicorn` runs the ASGI
+mode (backend/asgi.py); see backend/benchmarks/asgi.py for 1k clients.
+"""
+import argparse
+import http.client
+import importlib.util
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from . import db_env, remove_db
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+# packages each server kind needs; anything else is a gunicorn worker class
+NEEDS = {
+    "werkzeug": [],
+    "gevent": ["gunicorn", "gevent"],
+    "uvicorn": ["uvicorn", "aiosqlite", "greenlet", "a2wsgi"],
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _seed(db_path: str, n_projects: int) -> tuple[str, list[int]]:
+    """Build the schema and demo data in-process; returns (token, project ids)."""
+    os.environ.update(db_env(db_path))
+    from backend.app import create_app
+    from backend.auth import _issue_token
+    from backend.extensions import db
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    c = app.test_client()
+    c.post("/api/auth/register", json={"name": "Load", "email": "load@example.com", "password": "loadtest1"})
+    with app.app_context():
+        from backend.models import User
+        token = _issue_token(User.query.filter_by(email="load@example.com").one().id)
+    h = {"Authorization": f"Bearer {token}"}
+    client = c.post("/api/clients", json={"name": "Load client"}, headers=h).json
+    cats = [c.post("/api/categories", json={"name": f"Cat {i}"}, headers=h).json for i in range(6)]
+    comps = [
+        c.post("/api/components", json={"category_id": cat["id"], "name": f"Part {cat['id']}", "default_unit_price_usd": 12.5}, headers=h).json
+        for cat in cats
+    ]
+    rng = random.Random(1)
+    pids = []
+    for i in range(n_projects):
+        p = c.post("/api/projects", json={"client_id": client["id"], "name": f"Project {i}", "budget_amount_usd": 50000}, headers=h).json
+        pids.append(p["id"])
+        base = f"/api/projects/{p['id']}"
+        for cat, comp in zip(cats, comps):
+            c.post(base + "/categories", json={"category_id": cat["id"], "base_cost_usd": 1000}, headers=h)
+            c.post(base + "/components", json={"category_id": cat["id"], "component_id": comp["id"], "quantity": 4}, headers=h)
+        for t in range(10):
+            c.post(base + "/tasks", json={"title": f"Task {t}", "status": rng.choice(["todo", "doing", "done"])}, headers=h)
+        for e in range(15):
+            lines = [
+                {"category_id": rng.choice(cats)["id"], "qty": rng.randint(1, 5), "unit_price_usd": rng.randint(100, 9999) / 100}
+                for _ in range(4)
+            ]
+            c.post(base + "/expenses", json={"expense_date": "2026-01-15", "lines": lines}, headers=h)
+    return token, pids
+
+
+def _start_server(kind: str, port: int, db_path: str, args) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update(db_env(db_path))
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    if kind == "werkzeug":
+        cmd = [sys.executable, "-m", "flask", "--app", "backend.wsgi:app", "run",
+               "--port", str(port), "--with-threads", "--no-reload"]
+    elif kind == "uvicorn":
+        cmd = [sys.executable, "-m", "uvicorn", "backend.asgi:app", "--port", str(port),
+               "--workers", str(args.workers), "--no-access-log", "--log-level", "warning"]
+    else:
+        env.update({
+            "GUNICORN_BIND": f"127.0.0.1:{port}",
+            "GUNICORN_WORKER_CLASS": kind,
+            "GUNICORN_WORKERS": str(args.workers),
+            "GUNICORN_THREADS": str(args.threads),
+            "GUNICORN_ACCESSLOG": "",  # logging every request skews the numbers
+        })
+        cmd = [sys.executable, "-m", "gunicorn", "-c", os.path.join(ROOT, "backend", "gunicorn.conf.py"),
+               "backend.wsgi:app"]
+    proc = subprocess.Popen(cmd, env=env, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/api/health")
+            if conn.getresponse().status == 200:
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f"{kind} server did not come up")
+
+
+def _mixes(pids: list[int]) -> dict:
+    """mix name -> fn(rng) giving the paths one client fetches per round."""
+    return {
+        "expenses": lambda rng: [f"/api/projects/{rng.choice(pids)}/expenses"],
+        "dashboard": lambda rng: [
+            "/api/projects",
+            "/api/clients",
+            *(f"/api/projects/{pid}/summary" for pid in rng.sample(pids, 5)),
+            *(f"/api/projects/{pid}/tasks/progress" for pid in rng.sample(pids, 5)),
+        ],
+    }
+
+
+def _run_mix(port: int, token: str, paths_for, clients: int, duration: float) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    lock = threading.Lock()
+    stop = time.perf_counter() + duration
+    headers = {"Authorization": f"Bearer {token}"}
+
+    def client(seed: int):
+        nonlocal errors
+        rng = random.Random(seed)
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        mine, bad = [], 0
+        while time.perf_counter() < stop:
+            for path in paths_for(rng):
+                t0 = time.perf_counter()
+                try:
+                    conn.request("GET", path, headers=headers)
+                    resp = conn.getresponse()
+                    resp.read()
+                    if resp.status != 200:
+                        bad += 1
+                except (OSError, http.client.HTTPException):
+                    bad += 1
+                    conn.close()
+                    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+                mine.append(time.perf_counter() - t0)
+        conn.close()
+        with lock:
+            latencies.extend(mine)
+            errors += bad
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    pct = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else 0.0  # noqa: E731
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": pct(0.50),
+        "p95": pct(0.95),
+        "p99": pct(0.99),
+        "errors": errors,
+        "n": len(latencies),
+    }
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--classes", default="sync,gthread,gevent")
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--threads", type=int, default=4)
+    ap.add_argument("--clients", type=int, default=32)
+    ap.add_argument("--duration", type=float, default=10.0)
+    ap.add_argument("--projects", type=int, default=20)
+    args = ap.parse_args(argv)
+
+    fd, db_path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        token, pids = _seed(db_path, args.projects)
+        mixes = _mixes(pids)
+
+        print(f"{'class':10} {'mix':10} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        for kind in [k.strip() for k in args.classes.split(",") if k.strip()]:
+            needs = NEEDS.get(kind, ["gunicorn"])
+            missing = [m for m in needs if importlib.util.find_spec(m) is None]
+            if missing:
+                print(f"{kind:10} skipped: {', '.join(missing)} not installed")
+                continue
+            port = _free_port()
+            proc = _start_server(kind, port, db_path, args)
+            try:
+                for mix, paths_for in mixes.items():
+                    r = _run_mix(port, token, paths_for, args.clients, args.duration)
+                    print(f"{kind:10} {mix:10} {r['rps']:8.0f} {r['p50']:8.1f} {r['p95']:8.1f} {r['p99']:8.1f} {r['errors']:7d}")
+            finally:
+                proc.terminate()
+                proc.wait(timeout=30)
+    finally:
+        remove_db(db_path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""Cost of the maintenance commands, and what their advice buys.
+
+    python -m backend.benchmarks.maintenance [--expenses 500000] [--projects 200]
+
+Seeds `--expenses` expenses over `--projects` projects, with query capture
+on, and times:
+
+  list before     GET /projects/<id>/expenses (sorted by date, no index for it)
+  stats           flask maintenance stats
+  integrity       quick_check, then integrity_check (--full)
+  analyze         flask maintenance analyze (full) and --limit 1000
+  indexes         flask maintenance indexes, then the suggested index is created
+  list after      the same GET with it
+  vacuum          full VACUUM --enable-incremental after deleting the oldest third
+  run             flask maintenance run after deleting the newest third
+
+While `run` and the full VACUUM execute, a writer process keeps creating
+tasks (as in backend.benchmarks.backfill); its latencies are the cost to
+the live API.
+"""
+import argparse
+import multiprocessing
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from . import make_app, pct
+
+
+def _writer(app, headers, pid, stop, out) -> None:
+    from backend.extensions import dispose_engines
+
+    dispose_engines(app)
+    c = app.test_client()
+    latencies, errors = [], 0
+    while time.time() < stop.value:
+        t0 = time.perf_counter()
+        r = c.post(f"/api/projects/{pid}/tasks", json={"title": "bench"}, headers=headers)
+        latencies.append(time.perf_counter() - t0)
+        if r.status_code != 201:
+            errors += 1
+    out.put((latencies, errors))
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--expenses", type=int, default=500_000)
+    ap.add_argument("--projects", type=int, default=200)
+    ap.add_argument("--requests", type=int, default=30)
+    args = ap.parse_args(argv)
+
+    from sqlalchemy import insert, text
+    from backend.extensions import db
+    from backend.models import Expense
+
+    ctx = multiprocessing.get_context("fork")
+    tmp = tempfile.mkdtemp()
+    rng = random.Random(7)
+    try:
+        app = make_app(tmp, QUERY_PLAN_CAPTURE=True, QUERY_PLAN_DB=f"{tmp}/query_plans.db")
+        with app.app_context():
+            db.create_all()
+        c = app.test_client()
+        r = c.post("/api/auth/register", json={"name": "bench", "email": "bench@example.com", "password": "benchmark1"})
+        token = r.headers["Set-Cookie"].split("=", 1)[1].split(";", 1)[0]
+        c.delete_cookie(app.config["COOKIE_NAME"])
+        headers = {"Authorization": f"Bearer {token}"}
+        client = c.post("/api/clients", json={"name": "bench"}, headers=headers).json
+        pids = [
+            c.post("/api/projects", json={"client_id": client["id"], "name": f"P{i}"}, headers=headers).json["id"]
+            for i in range(args.projects)
+        ]
+        with app.app_context():
+            for start in range(0, args.expenses, 100_000):
+                db.session.execute(insert(Expense), [
+                    {"project_id": rng.choice(pids), "expense_date": date(2025, 1, 1) + timedelta(days=rng.randrange(600)),
+                     "vendor": f"Vendor {i % 500}"}
+                    for i in range(start, min(start + 100_000, args.expenses))
+                ])
+            db.session.commit()
+        cli = app.test_cli_runner()
+        results = []
+
+        def timed(label, fn):
+            t0 = time.perf_counter()
+            out = fn()
+            results.append((label, [time.perf_counter() - t0]))
+            return out
+
+        def invoke(*cmd):
+            r = cli.invoke(args=["maintenance", *cmd])
+            assert r.exit_code == 0, r.output
+            return r.output
+
+        def list_expenses():
+            out = []
+            for _ in range(args.requests):
+                t0 = time.perf_counter()
+                c.get(f"/api/projects/{rng.choice(pids)}/expenses", headers=headers)
+                out.append(time.perf_counter() - t0)
+            return out
+
+        def with_writer(label, fn):
+            out = ctx.Queue()
+            stop = ctx.Value("d", time.time() + 3600)
+            proc = ctx.Process(target=_writer, args=(app, headers, pids[0], stop, out))
+            proc.start()
+            time.sleep(0.5)
+            timed(label, fn)
+            time.sleep(0.2)
+            stop.value = time.time()
+            lat, errors = out.get()
+            proc.join()
+            results.append((f"  writer", lat))
+            if errors:
+                results.append((f"  writer errors: {errors}", []))
+
+        results.append(("list before", list_expenses()))
+        timed("stats", lambda: invoke("stats"))
+        timed("integrity", lambda: invoke("integrity"))
+        timed("integrity --full", lambda: invoke("integrity", "--full"))
+        timed("analyze (full)", lambda: invoke("analyze"))
+        timed("analyze --limit", lambda: invoke("analyze", "--limit", "1000"))
+        advice = timed("indexes", lambda: invoke("indexes"))
+        m = re.search(r"^  (\w+)\(([\w, ]+)\).*create$", advice, re.M)
+        if m:
+            with app.app_context():
+                db.session.execute(text(
+                    f"CREATE INDEX ix_bench_suggested ON {m.group(1)} ({m.group(2)})"
+                ))
+                db.session.commit()
+        results.append(("list after", list_expenses()))
+
+        with app.app_context():
+            db.session.execute(text("DELETE FROM expenses WHERE id <= :n"), {"n": args.expenses // 3})
+            db.session.commit()
+        with_writer("vacuum (full)", lambda: invoke("vacuum", "--enable-incremental", "--yes"))
+        with app.app_context():
+            db.session.execute(text("DELETE FROM expenses WHERE id > :n"), {"n": 2 * args.expenses // 3})
+            db.session.commit()
+        run_out = []
+        with_writer("run", lambda: run_out.append(invoke("run", "--vacuum-pages", "1000000")))
+
+        print(f"{args.expenses} expenses over {args.projects} projects")
+        print(f"suggested: {m.group(1)}({m.group(2)})" if m else "suggested: none")
+        print(f"{'step':20} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+        for label, samples in results:
+            print(f"{label:20} {pct(samples)}" + (f"  ({len(samples)} writes)" if label == "  writer" else ""))
+        print("run: " + "; ".join(run_out[0].strip().splitlines()))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""Integer-cents vs float/Decimal money aggregation, plus an exactness check.
+
+    python -m backend.benchmarks.money [--lines 200000] [--projects 50]
+
+Runs against a throwaway SQLite file, never the app database. Exits non-zero
+if the cents aggregation disagrees with an exact Decimal reference.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from decimal import Decimal
+from . import db_env, remove_db
+
+_tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+os.environ.update(db_env(_tmp.name))
+
+from datetime import date, datetime  # noqa: E402
+from sqlalchemy import Numeric, bindparam, text  # noqa: E402
+from backend.app import create_app  # noqa: E402
+from backend.extensions import db  # noqa: E402
+from backend.models import Category, Client, Expense, ExpenseLine, Project  # noqa: E402
+from backend.money import from_cents  # noqa: E402
+from backend.projects import _ACTUAL_SQL, _summaries  # noqa: E402
+
+# the pre-cents shape of the same aggregate over a REAL copy of the lines
+_LEGACY_SQL = """
+    SELECT e.project_id, l.category_id, COALESCE(SUM(l.line_total_usd), 0) AS actual_usd
+    FROM expenses e JOIN legacy_lines l ON l.expense_id = e.id
+    WHERE e.project_id IN :pids
+    GROUP BY e.project_id, l.category_id
+"""
+_FLOAT_SQL = text(_LEGACY_SQL).bindparams(bindparam("pids", expanding=True))
+# Numeric(12, 2) columns: every SUM comes back through Decimal
+_DECIMAL_SQL = _FLOAT_SQL.columns(actual_usd=Numeric(12, 2))
+
+
+def _seed(n_lines: int, n_projects: int, rng: random.Random) -> dict:
+    now = datetime.utcnow()
+    client = Client(name="Benchmark client")
+    cats = [Category(name=f"Cat {i}") for i in range(8)]
+    db.session.add_all([client, *cats])
+    db.session.flush()
+    projects = [Project(client_id=client.id, name=f"P{i}", code=f"B{i:05d}") for i in range(n_projects)]
+    db.session.add_all(projects)
+    db.session.flush()
+    expenses = [Expense(project_id=p.id, expense_date=date(2026, 1, 1)) for p in projects for _ in range(20)]
+    db.session.add_all(expenses)
+    db.session.flush()
+
+    reference: dict[tuple, Decimal] = {}
+    project_of = {e.id: e.project_id for e in expenses}
+    rows = []
+    for _ in range(n_lines):
+        eid = rng.choice(expenses).id
+        cid = rng.choice(cats).id
+        amount = f"{rng.randint(1, 500_000) / 100:.2f}"  # e.g. "1234.07"
+        rows.append({
+            "expense_id": eid, "category_id": cid, "qty": 1,
+            "unit_price_cents": amount, "line_total_cents": amount,
+            "created_at": now, "updated_at": now,
+        })
+        key = (project_of[eid], cid)
+        reference[key] = reference.get(key, Decimal(0)) + Decimal(amount)
+    db.session.execute(ExpenseLine.__table__.insert(), rows)
+    # same rows and indexes, money as REAL dollars like before the migration
+    db.session.execute(text(
+        "CREATE TABLE legacy_lines AS SELECT *, line_total_cents / 100.0 AS line_total_usd FROM expense_lines"
+    ))
+    db.session.execute(text("CREATE INDEX ix_legacy_lines_expense_id ON legacy_lines (expense_id)"))
+    db.session.commit()
+    return {"pids": [p.id for p in projects], "reference": reference}
+
+
+def _best_of(fn, repeat: int = 5):
+    best, out = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best, out
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--lines", type=int, default=200_000)
+    ap.add_argument("--projects", type=int, default=50)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args(argv)
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        data = _seed(args.lines, args.projects, random.Random(args.seed))
+        pids, reference = data["pids"], data["reference"]
+
+        def run(stmt, col, convert):
+            def fn():
+                return {
+                    (r["project_id"], r["category_id"]): convert(r[col])
+                    for r in db.session.execute(stmt, {"pids": pids}).mappings()
+                }
+            return fn
+
+        cases = [
+            ("REAL -> float", run(_FLOAT_SQL, "actual_usd", float)),
+            ("REAL -> Numeric(12,2)", run(_DECIMAL_SQL, "actual_usd", float)),
+            ("INTEGER cents", run(_ACTUAL_SQL, "actual_cents", from_cents)),
+        ]
+        exact = lambda got: sum(Decimal(repr(v)) == reference[k] for k, v in got.items())  # noqa: E731
+        print(f"{'actual per category':24} {'best s':>8} {'exact groups':>14}")
+        for name, fn in cases:
+            t, got = _best_of(fn)
+            print(f"{name:24} {t:8.3f} {exact(got):>7}/{len(reference)}")
+        got_cents = got
+
+        ok = got_cents.keys() == reference.keys() and exact(got_cents) == len(reference)
+        totals = _summaries(pids)
+        for pid in pids:
+            want = sum((v for (p, _), v in reference.items() if p == pid), Decimal(0))
+            ok = ok and Decimal(str(totals[pid]["totals"]["actual_total_usd"])) == want
+    remove_db(_tmp.name)
+    print("exactness:", "OK" if ok else "MISMATCH")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
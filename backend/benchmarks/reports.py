@@ -0,0 +1,165 @@
+"""Writer latency while a heavy export runs, with and without the report snapshot.
+
+    python -m backend.benchmarks.reports [--lines 200000] [--duration 10]
+                                         [--client-delay 0.01] [--refresh 2]
+                                         [--wal]
+
+Seeds one database with `--lines` expense lines, then for each mode runs a
+writer process (task creates, as in backend.benchmarks.tenants) next to a
+reporter process that keeps downloading /api/reports/expenses.csv, sleeping
+`--client-delay` per chunk like a client on a slow link:
+
+  idle      no reporter: the writer's baseline
+  live      REPORT_SNAPSHOT off, the export reads the live database
+  snapshot  REPORT_SNAPSHOT on, the export reads the replica while a third
+            process refreshes it every `--refresh` seconds
+"""
+import argparse
+import multiprocessing
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from . import make_app
+
+
+def _app(tmp: str, wal: bool, snapshot: bool):
+    return make_app(tmp, SQLITE_WAL=wal, REPORT_SNAPSHOT=snapshot, REPORT_SNAPSHOT_PATH=f"{tmp}/report.db")
+
+
+def _seed(app, n_lines: int) -> tuple[dict, int]:
+    from sqlalchemy import insert
+    from backend.extensions import db
+    from backend.models import Expense, ExpenseLine
+
+    with app.app_context():
+        db.create_all()
+    c = app.test_client()
+    r = c.post("/api/auth/register", json={"name": "bench", "email": "bench@example.com", "password": "benchmark1"})
+    token = r.headers["Set-Cookie"].split("=", 1)[1].split(";", 1)[0]
+    c.delete_cookie(app.config["COOKIE_NAME"])
+    h = {"Authorization": f"Bearer {token}"}
+    client = c.post("/api/clients", json={"name": "bench"}, headers=h).json
+    cats = [c.post("/api/categories", json={"name": f"Cat {i}"}, headers=h).json["id"] for i in range(8)]
+    pids = [
+        c.post("/api/projects", json={"client_id": client["id"], "name": f"P{i}"}, headers=h).json["id"]
+        for i in range(50)
+    ]
+    rng = random.Random(1)
+    with app.app_context():
+        n_expenses = max(1, n_lines // 5)
+        db.session.execute(insert(Expense), [
+            {"project_id": rng.choice(pids), "expense_date": date(2026, 1, 1) + timedelta(days=i % 300),
+             "vendor": f"Vendor {i % 97}", "reference_no": f"R-{i}"}
+            for i in range(n_expenses)
+        ])
+        db.session.execute(insert(ExpenseLine), [
+            {"expense_id": 1 + i // 5, "category_id": rng.choice(cats), "qty": 2,
+             "unit_price_usd": 12.5, "line_total_usd": 25.0}
+            for i in range(n_lines)
+        ])
+        db.session.commit()
+    return h, pids[0]
+
+
+def _writer(app, headers, pid, stop: float, out) -> None:
+    from backend.extensions import dispose_engines
+
+    dispose_engines(app)
+    c = app.test_client()
+    latencies, errors = [], 0
+    while time.time() < stop:
+        t0 = time.perf_counter()
+        r = c.post(f"/api/projects/{pid}/tasks", json={"title": "bench"}, headers=headers)
+        latencies.append(time.perf_counter() - t0)
+        if r.status_code != 201:
+            errors += 1
+    out.put(("writer", latencies, errors))
+
+
+def _reporter(app, headers, stop: float, delay: float, out) -> None:
+    from backend.extensions import dispose_engines
+
+    dispose_engines(app)
+    c = app.test_client()
+    exports = errors = 0
+    while time.time() < stop:
+        resp = c.get("/api/reports/expenses.csv", headers=headers, buffered=False)
+        if resp.status_code != 200:
+            errors += 1
+        for _ in resp.response:
+            time.sleep(delay)
+        resp.close()
+        exports += 1
+    out.put(("reporter", exports, errors))
+
+
+def _refresher(app, stop: float, every: float, out) -> None:
+    from backend.extensions import db, dispose_engines
+    from backend.reports import take_snapshot
+
+    dispose_engines(app)
+    took = []
+    with app.app_context():
+        while time.time() < stop:
+            t0 = time.perf_counter()
+            take_snapshot(db.engine, app.config["REPORT_SNAPSHOT_PATH"])
+            took.append(time.perf_counter() - t0)
+            time.sleep(max(0.0, every - took[-1]))
+    out.put(("refresher", took, 0))
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--lines", type=int, default=200_000)
+    ap.add_argument("--duration", type=float, default=10.0)
+    ap.add_argument("--client-delay", type=float, default=0.01, help="seconds the reporter sleeps per CSV chunk")
+    ap.add_argument("--refresh", type=float, default=2.0, help="snapshot refresh interval (snapshot mode)")
+    ap.add_argument("--modes", default="idle,live,snapshot")
+    ap.add_argument("--wal", action="store_true", help="WAL + synchronous=NORMAL (ProductionConfig default)")
+    args = ap.parse_args(argv)
+
+    from backend.reports import take_snapshot
+    from backend.extensions import db
+
+    ctx = multiprocessing.get_context("fork")
+    tmp = tempfile.mkdtemp()
+    try:
+        headers, pid = _seed(_app(tmp, args.wal, False), args.lines)
+        print(f"{args.lines} expense lines, {args.duration:.0f}s per mode, journal={'WAL' if args.wal else 'rollback'}")
+        print(f"{'mode':9} {'writes':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7} {'exports':>8}  snapshot")
+        for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+            app = _app(tmp, args.wal, mode == "snapshot")
+            if mode == "snapshot":
+                with app.app_context():
+                    take_snapshot(db.engine, app.config["REPORT_SNAPSHOT_PATH"])
+            out = ctx.Queue()
+            stop = time.time() + args.duration
+            procs = [ctx.Process(target=_writer, args=(app, headers, pid, stop, out))]
+            if mode != "idle":
+                procs.append(ctx.Process(target=_reporter, args=(app, headers, stop, args.client_delay, out)))
+            if mode == "snapshot":
+                procs.append(ctx.Process(target=_refresher, args=(app, stop, args.refresh, out)))
+            for p in procs:
+                p.start()
+            results = {kind: (a, b) for kind, a, b in (out.get() for _ in procs)}
+            for p in procs:
+                p.join()
+
+            lat, errors = results["writer"]
+            lat = sorted(lat)
+            pct = lambda q: lat[min(len(lat) - 1, int(q * len(lat)))] * 1000 if lat else 0.0  # noqa: E731
+            exports = results.get("reporter", (0, 0))[0]
+            took = results.get("refresher", ([], 0))[0]
+            snap = f"{len(took)} refreshes, {max(took) * 1000:.0f} ms max" if took else "-"
+            print(f"{mode:9} {len(lat):7d} {pct(0.5):8.1f} {pct(0.95):8.1f} {pct(0.99):8.1f} {lat[-1] * 1000:8.1f} "
+                  f"{errors:7d} {exports:8d}  {snap}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
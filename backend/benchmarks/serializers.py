@@ -0,0 +1,96 @@
+"""ORM vs column-projected serializers on large lists.
+
+    python -m backend.benchmarks.serializers [--rows 50000]
+
+Runs against a throwaway SQLite file, never the app database.
+"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from . import db_env, remove_db
+
+_tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+os.environ.update(db_env(_tmp.name))
+
+from datetime import date, datetime  # noqa: E402
+from backend.app import create_app  # noqa: E402
+from backend.extensions import db  # noqa: E402
+from backend.models import Client, Project, Task  # noqa: E402
+from backend.projects import project_json  # noqa: E402
+from backend.serializers import PROJECT, TASK  # noqa: E402
+
+
+def _seed(rows: int) -> int:
+    now = datetime.utcnow()
+    client = Client(name="Benchmark client")
+    db.session.add(client)
+    db.session.flush()
+    db.session.execute(Project.__table__.insert(), [
+        {
+            "code": f"P{i:06d}", "client_id": client.id, "name": f"Project {i}", "description": "benchmark row",
+            "project_type": "residential", "status": "active",
+            "start_date": date(2026, 1, 1), "budget_cents": 1000 + i,  # Money type: dollars in, cents stored
+            "tax_rate": 0.12, "currency": "USD", "created_at": now, "updated_at": now,
+        }
+        for i in range(rows)
+    ])
+    pid = db.session.execute(db.select(Project.id).limit(1)).scalar()
+    db.session.execute(Task.__table__.insert(), [
+        {
+            "project_id": pid, "title": f"Task {i}", "status": "todo",
+            "order_index": i, "created_at": now, "updated_at": now,
+        }
+        for i in range(rows)
+    ])
+    db.session.commit()
+    return pid
+
+
+def _measure(fn):
+    db.session.expunge_all()
+    gc.collect()
+    tracemalloc.start()
+    cpu, wall = time.process_time(), time.perf_counter()
+    out = fn()
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    db.session.expunge_all()
+    return len(out), cpu, wall, peak
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=50_000)
+    args = ap.parse_args(argv)
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        pid = _seed(args.rows)
+        cases = [
+            ("projects  orm + project_json",
+             lambda: [project_json(p) for p in Project.query.order_by(Project.id).all()]),
+            ("projects  core + PROJECT",
+             lambda: PROJECT.all(PROJECT.select().order_by(Project.id))),
+            ("tasks     orm + Task.to_dict",
+             lambda: [t.to_dict() for t in Task.query.filter_by(project_id=pid).order_by(Task.id).all()]),
+            ("tasks     core + TASK",
+             lambda: TASK.all(TASK.select().where(Task.project_id == pid).order_by(Task.id))),
+        ]
+        _measure(cases[1][1])  # warm the connection and statement caches
+
+        print(f"{'case':32} {'rows':>7} {'cpu s':>8} {'wall s':>8} {'peak MiB':>9}")
+        for name, fn in cases:
+            n, cpu, wall, peak = _measure(fn)
+            print(f"{name:32} {n:7d} {cpu:8.3f} {wall:8.3f} {peak / 2**20:9.1f}")
+    remove_db(_tmp.name)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""Startup cost: cold import, app factory, forked workers and CLI latency.
+
+    python -m backend.benchmarks.startup [--repeat 5] [--workers 4]
+
+Every measurement runs in fresh interpreters against a throwaway SQLite
+file, so module caches from one case never help the next.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from . import db_env, remove_db
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_IMPORT = "import backend.app"
+_FACTORY = "from backend.app import create_app; create_app()"
+_FIRST_REQUEST = (
+    "from backend.app import create_app; "
+    "create_app().test_client().get('/api/health')"
+)
+
+# parent preloads the app, then forks workers that each serve one request;
+# prints per-worker ms from fork() to the response being ready
+_FORK = """
+import os, sys, time
+from backend.app import create_app
+app = create_app()
+n = int(sys.argv[1])
+r, w = os.pipe()
+for _ in range(n):
+    t0 = time.perf_counter()
+    if os.fork() == 0:
+        os.close(r)
+        app.test_client().get('/api/health')
+        os.write(w, f"{(time.perf_counter() - t0) * 1000:.1f}\\n".encode())
+        os._exit(0)
+os.close(w)
+for _ in range(n):
+    os.wait()
+print(os.read(r, 65536).decode().strip().replace("\\n", " "))
+"""
+
+
+def _env(db_path: str) -> dict:
+    env = dict(os.environ)
+    env.update(db_env(db_path))
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    env.pop("FLASK_APP", None)
+    return env
+
+
+def _time(cmd: list[str], env: dict, repeat: int) -> list[float]:
+    out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        subprocess.run(cmd, env=env, cwd=ROOT, check=True, capture_output=True)
+        out.append((time.perf_counter() - t0) * 1000)
+    return out
+
+
+def _row(name: str, ms: list[float]) -> None:
+    print(f"{name:34} {min(ms):9.0f} {statistics.median(ms):9.0f}")
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--workers", type=int, default=4)
+    args = ap.parse_args(argv)
+
+    fd, db_path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    env = _env(db_path)
+    py = sys.executable
+    try:
+        subprocess.run([py, "-m", "flask", "--app", "backend.app", "init-db"],
+                       env=env, cwd=ROOT, check=True, capture_output=True)
+
+        print(f"{'case (wall ms)':34} {'min':>9} {'median':>9}")
+        _row("interpreter only", _time([py, "-c", "pass"], env, args.repeat))
+        _row("import backend.app", _time([py, "-c", _IMPORT], env, args.repeat))
+        _row("import + create_app()", _time([py, "-c", _FACTORY], env, args.repeat))
+        _row("import + app + first request", _time([py, "-c", _FIRST_REQUEST], env, args.repeat))
+        _row("flask routes", _time([py, "-m", "flask", "--app", "backend.app", "routes"], env, args.repeat))
+        _row("flask init-db", _time([py, "-m", "flask", "--app", "backend.app", "init-db"], env, args.repeat))
+
+        if hasattr(os, "fork"):
+            res = subprocess.run([py, "-c", _FORK, str(args.workers)],
+                                 env=env, cwd=ROOT, check=True, capture_output=True, text=True)
+            ms = [float(x) for x in res.stdout.split()]
+            _row(f"fork -> first response ({args.workers} workers)", ms)
+    finally:
+        remove_db(db_path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""Write throughput vs number of tenant databases.
+
+    python -m backend.benchmarks.tenants [--writers 8] [--tenants 1,2,4,8]
+                                         [--duration 5] [--wal]
+
+For each tenant count a fresh TENANTS_DIR is created and the same number of
+writer processes run for the same time; writer i works for tenant i % N.
+Every write is a task create (POST /api/projects/<id>/tasks: INSERT, path
+UPDATE, commit, event publish) through the app, so it pays exactly what a
+request pays minus HTTP. With one tenant all writers queue on one SQLite
+write lock; with N they queue on N.
+"""
+import argparse
+import multiprocessing
+import shutil
+import sys
+import tempfile
+import time
+from . import make_app
+
+
+def _setup(tmp: str, n_tenants: int, wal: bool):
+    from backend.extensions import db
+
+    app = make_app(tmp, TENANT_ROUTING=True, TENANTS_DIR=f"{tmp}/tenants", SQLITE_WAL=wal)
+    with app.app_context():
+        db.create_all()
+    runner = app.test_cli_runner()
+    c = app.test_client()
+    targets = []
+    for i in range(n_tenants):
+        slug = f"org{i}"
+        runner.invoke(args=["tenants", "create", slug])
+        r = c.post("/api/auth/register", json={
+            "name": slug, "email": f"{slug}@example.com", "password": "benchmark1", "organization": slug,
+        })
+        token = r.headers["Set-Cookie"].split("=", 1)[1].split(";", 1)[0]
+        c.delete_cookie(app.config["COOKIE_NAME"])
+        h = {"Authorization": f"Bearer {token}"}
+        client = c.post("/api/clients", json={"name": slug}, headers=h).json
+        project = c.post("/api/projects", json={"client_id": client["id"], "name": slug}, headers=h).json
+        targets.append((h, project["id"]))
+    return app, targets
+
+
+def _writer(app, target, stop: float, out) -> None:
+    from backend.extensions import dispose_engines
+
+    dispose_engines(app)  # forked: never reuse the parent's connections
+    headers, pid = target
+    c = app.test_client()
+    ok = errors = 0
+    while time.time() < stop:
+        r = c.post(f"/api/projects/{pid}/tasks", json={"title": "bench"}, headers=headers)
+        if r.status_code == 201:
+            ok += 1
+        else:
+            errors += 1
+    out.put((ok, errors))
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--writers", type=int, default=8)
+    ap.add_argument("--tenants", default="1,2,4,8")
+    ap.add_argument("--duration", type=float, default=5.0)
+    ap.add_argument("--wal", action="store_true", help="WAL + synchronous=NORMAL (ProductionConfig default)")
+    args = ap.parse_args(argv)
+
+    ctx = multiprocessing.get_context("fork")
+    print(f"{args.writers} writers, {args.duration:.0f}s, journal={'WAL' if args.wal else 'rollback'}")
+    print(f"{'tenants':>7} {'writes/s':>9} {'errors':>7}")
+    for n in [int(x) for x in args.tenants.split(",")]:
+        tmp = tempfile.mkdtemp()
+        try:
+            app, targets = _setup(tmp, n, args.wal)
+            out = ctx.Queue()
+            stop = time.time() + args.duration
+            procs = [ctx.Process(target=_writer, args=(app, targets[i % n], stop, out)) for i in range(args.writers)]
+            t0 = time.time()
+            for p in procs:
+                p.start()
+            results = [out.get() for _ in procs]
+            for p in procs:
+                p.join()
+            elapsed = time.time() - t0
+            ok = sum(r[0] for r in results)
+            errors = sum(r[1] for r in results)
+            print(f"{n:7d} {ok / elapsed:9.0f} {errors:7d}")
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
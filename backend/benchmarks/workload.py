@@ -0,0 +1,134 @@
+"""Workload and overdue reports on a large task table.
+
+    python -m backend.benchmarks.workload [--tasks 500000] [--projects 1000]
+                                          [--users 2000] [--pages 20]
+
+Seeds one database with `--tasks` tasks spread over `--projects` projects
+and `--users` assignees (10% unassigned, 20% without a due date, 60% done,
+2% of projects soft-deleted), then times through the Flask test client:
+
+  per-project   what the board offers today: GET /tasks for every project,
+                aggregated client-side (one pass)
+  workload      GET /api/reports/workload, page 1 and following pages
+  overdue       GET /api/reports/overdue, page 1 and following pages
+  overdue/user  GET /api/reports/overdue?assignee_user_id=
+
+once with the report indexes and once with them dropped.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from . import db_env, pct, remove_db
+
+REPORT_INDEXES = ("ix_tasks_assignee_status_due", "ix_tasks_status_due")
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tasks", type=int, default=500_000)
+    ap.add_argument("--projects", type=int, default=1000)
+    ap.add_argument("--users", type=int, default=2000)
+    ap.add_argument("--pages", type=int, default=20)
+    args = ap.parse_args(argv)
+
+    fd, db_path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    os.environ.update(db_env(db_path))
+    from sqlalchemy import insert, text
+    from backend.app import create_app
+    from backend.extensions import db
+    from backend.models import Client, Project, Task, User
+
+    rng = random.Random(5)
+    today = date.today()
+    app = create_app()
+    try:
+        with app.app_context():
+            db.create_all()
+            db.session.execute(insert(User), [
+                {"name": f"User {i}", "email": f"u{i}@example.com", "password_hash": "-"} for i in range(args.users)
+            ])
+            db.session.execute(insert(Client), [{"name": "Bench"}])
+            db.session.execute(insert(Project), [
+                {"client_id": 1, "name": f"P{i}", "code": f"B-{i}"} for i in range(args.projects)
+            ])
+            statuses = ("todo", "doing", "done", "done", "done")
+            for start in range(0, args.tasks, 50_000):
+                db.session.execute(insert(Task), [
+                    {
+                        "project_id": 1 + rng.randrange(args.projects),
+                        "title": f"Task {i}",
+                        "status": rng.choice(statuses),
+                        "path": f"/{i + 1}/",
+                        "assignee_user_id": None if rng.random() < 0.1 else 1 + rng.randrange(args.users),
+                        "due_date": None if rng.random() < 0.2 else today + timedelta(days=rng.randrange(-300, 300)),
+                    }
+                    for i in range(start, min(start + 50_000, args.tasks))
+                ])
+            db.session.execute(text("UPDATE projects SET deleted_at = CURRENT_TIMESTAMP WHERE id % 50 = 0"))
+            db.session.commit()
+
+        c = app.test_client()
+        c.post("/api/auth/register", json={"name": "b", "email": "b@example.com", "password": "benchmark1"})
+        live = [p for p in range(1, args.projects + 1) if p % 50]
+
+        def per_project():
+            t0 = time.perf_counter()
+            open_by_user = {}
+            for pid in live:
+                for t in c.get(f"/api/projects/{pid}/tasks").json["tasks"]:
+                    if t["status"] != "done":
+                        open_by_user[t["assignee_user_id"]] = open_by_user.get(t["assignee_user_id"], 0) + 1
+            return [time.perf_counter() - t0]
+
+        def paged(path, **params):
+            first, rest, cursor = [], [], None
+            for n in range(args.pages):
+                t0 = time.perf_counter()
+                r = c.get(path, query_string={**params, **({"cursor": cursor} if cursor else {})})
+                (rest if n else first).append(time.perf_counter() - t0)
+                assert r.status_code == 200, r.json
+                cursor = r.json["next_cursor"]
+                if not cursor:
+                    break
+            return first, rest
+
+        def run():
+            out = {}
+            out["workload p1"], out["workload p2+"] = paged("/api/reports/workload")
+            out["overdue p1"], out["overdue p2+"] = paged("/api/reports/overdue")
+            users = [1 + rng.randrange(args.users) for _ in range(50)]
+            out["overdue/user"] = []
+            for u in users:
+                t0 = time.perf_counter()
+                c.get("/api/reports/overdue", query_string={"assignee_user_id": u})
+                out["overdue/user"].append(time.perf_counter() - t0)
+            return out
+
+        with_idx = run()
+        baseline = per_project()
+        with app.app_context():
+            for name in REPORT_INDEXES:
+                db.session.execute(text(f"DROP INDEX {name}"))
+            db.session.commit()
+        without = run()
+
+        print(f"{args.tasks} tasks, {args.projects} projects, {args.users} assignees")
+        print(f"{'request':16} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+        print(f"{'per-project x' + str(len(live)):16} {pct(baseline)}")
+        for label, runs in (("indexes", with_idx), ("no indexes", without)):
+            print(f"-- {label}")
+            for name, samples in runs.items():
+                if samples:
+                    print(f"{name:16} {pct(samples)}")
+    finally:
+        remove_db(db_path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,6 +10,7 @@ from sqlalchemy.exc import IntegrityError
 
 from .extensions import db
 from .models import Category, Component
+from .serializers import COMPONENT
 from .auth import _get_token_from_request, _verify_token
 
 bp = Blueprint("catalog", __name__, url_prefix="/api")
@@ -188,17 +189,17 @@ def restore_category(cid: int):
 @bp.get("/components")
 @require_auth
 def list_components():
-    qry = Component.query
+    stmt = COMPONENT.select()
     cid = request.args.get("category_id", type=int)
     q = (request.args.get("q") or "").strip()
 
     if cid:
-        qry = qry.filter(Component.category_id == cid)
+        stmt = stmt.where(Component.category_id == cid)
     if q:
         like = f"%{q}%"
-        qry = qry.filter(Component.name.ilike(like))
+        stmt = stmt.where(Component.name.ilike(like))
 
-    items = [component_json(x) for x in qry.order_by(Component.name).all()]
+    items = COMPONENT.all(stmt.order_by(Component.name))
     return jsonify(components=items)
 
 
@@ -0,0 +1,184 @@
+# backend/changes.py
+from __future__ import annotations
+from datetime import datetime, timedelta, timezone
+import click
+from flask import Blueprint, current_app, jsonify, request
+from .extensions import db
+from .models import Project, Task, TaskComment, Expense, ExpenseLine, Tombstone, utcnow
+from .auth import require_auth
+from .projects import project_json
+
+bp = Blueprint("changes", __name__, url_prefix="/api")
+
+DEFAULT_LIMIT = 1000
+MAX_LIMIT = 5000
+DEFAULT_SAFETY_LAG_SECONDS = 10
+DEFAULT_TOMBSTONE_RETENTION_DAYS = 30
+
+
+# --- serializers (headers only; lines arrive as their own rows) ---
+def _expense_header_json(e: Expense) -> dict:
+    return {
+        "id": e.id,
+        "project_id": e.project_id,
+        "reference_no": e.reference_no,
+        "expense_date": e.expense_date.isoformat() if e.expense_date else None,
+        "vendor": e.vendor,
+        "memo": e.memo,
+        "updated_at": e.updated_at.isoformat(),
+    }
+
+
+def _expense_line_json(ln: ExpenseLine) -> dict:
+    return {
+        "id": ln.id,
+        "expense_id": ln.expense_id,
+        "category_id": ln.category_id,
+        "qty": float(ln.qty),
+        "unit_price_usd": float(ln.unit_price_usd),
+        "line_total_usd": float(ln.line_total_usd),
+        "updated_at": ln.updated_at.isoformat(),
+    }
+
+
+def _tombstone_json(t: Tombstone) -> dict:
+    return {
+        "table": t.table_name,
+        "id": t.row_id,
+        "project_id": t.project_id,
+        "deleted_at": t.deleted_at.isoformat(),
+    }
+
+
+def _parse_watermark(s: str | None) -> datetime | None:
+    """Naive UTC, like the stored timestamps; ValueError if unparseable."""
+    if not s:
+        return None
+    ts = datetime.fromisoformat(s[:-1] + "+00:00" if s.endswith("Z") else s)
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def _page(q, ts_col, since: datetime | None, limit: int):
+    """Rows with ts_col > since, oldest first, at most ~limit.
+
+    Returns (rows, resume_ts). resume_ts is None when the table is drained;
+    otherwise the page stops short of a timestamp boundary so that rows
+    sharing a timestamp (bulk updates) are never split across pages.
+    """
+    if since is not None:
+        q = q.filter(ts_col > since)
+    rows = q.order_by(ts_col).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    key = ts_col.key
+    rows = rows[:limit]
+    last = getattr(rows[-1], key)
+    trimmed = [r for r in rows if getattr(r, key) < last]
+    if trimmed:
+        return trimmed, getattr(trimmed[-1], key)
+    # the whole page shares one timestamp: take every row at it
+    return q.filter(ts_col == last).all(), last
+
+
+# --- routes ---
+@bp.get("/changes")
+@require_auth
+def list_changes():
+    """Incremental change feed.
+    Query params:
+      - since: watermark returned by the previous call (omit for a full sync)
+      - project_id: only changes belonging to this project
+      - limit: max rows per table (default 1000, max 5000)
+    Rows carry deleted_at for soft deletes; hard deletes come as tombstones,
+    whose `table` is the feed key of the row. Pass the returned watermark
+    back as `since`; when has_more is true, call again straight away.
+
+    Timestamps are taken before a writer waits for the SQLite lock, so a
+    row can commit after rows stamped later than it. The watermark never
+    passes now - CHANGES_SAFETY_LAG_SECONDS: rows inside that window come
+    again on the next call (clients dedupe by id). A watermark older than
+    the tombstone retention gets 410: deletes may be missing, sync afresh.
+    """
+    try:
+        since = _parse_watermark(request.args.get("since"))
+    except ValueError:
+        return jsonify(error="invalid since watermark"), 400
+    now = utcnow()
+    if since is not None and since < now - _retention():
+        return jsonify(error="watermark older than tombstone retention; full sync required"), 410
+    pid = request.args.get("project_id", type=int)
+    limit = max(1, min(request.args.get("limit", DEFAULT_LIMIT, type=int), MAX_LIMIT))
+
+    projects_q = Project.query
+    tasks_q = Task.query
+    expenses_q = Expense.query
+    lines_q = ExpenseLine.query
+    comments_q = TaskComment.query
+    tombstones_q = Tombstone.query
+    if pid:
+        projects_q = projects_q.filter(Project.id == pid)
+        tasks_q = tasks_q.filter(Task.project_id == pid)
+        expenses_q = expenses_q.filter(Expense.project_id == pid)
+        lines_q = lines_q.join(Expense, Expense.id == ExpenseLine.expense_id).filter(
+            Expense.project_id == pid
+        )
+        comments_q = comments_q.join(Task, Task.id == TaskComment.task_id).filter(
+            Task.project_id == pid
+        )
+        tombstones_q = tombstones_q.filter(Tombstone.project_id == pid)
+
+    # comments are immutable, so created_at is their change timestamp
+    feeds = {
+        "projects": (projects_q, Project.updated_at, project_json),
+        "tasks": (tasks_q, Task.updated_at, Task.to_dict),
+        "expenses": (expenses_q, Expense.updated_at, _expense_header_json),
+        "expense_lines": (lines_q, ExpenseLine.updated_at, _expense_line_json),
+        "task_comments": (comments_q, TaskComment.created_at, TaskComment.to_dict),
+        "tombstones": (tombstones_q, Tombstone.deleted_at, _tombstone_json),
+    }
+
+    out, newest, resume = {}, [], []
+    for name, (q, ts_col, to_json) in feeds.items():
+        rows, resume_ts = _page(q, ts_col, since, limit)
+        out[name] = [to_json(r) for r in rows]
+        if resume_ts is not None:
+            resume.append(resume_ts)
+        elif rows:
+            newest.append(getattr(rows[-1], ts_col.key))
+
+    # a truncated table caps the watermark so nothing past its page is skipped
+    if resume:
+        watermark = min(resume)
+    elif newest:
+        watermark = max(newest)
+    else:
+        watermark = since
+    # stamped before the horizon means committed by now
+    horizon = now - timedelta(seconds=current_app.config.get("CHANGES_SAFETY_LAG_SECONDS", DEFAULT_SAFETY_LAG_SECONDS))
+    if watermark is not None and watermark > horizon:
+        watermark = horizon
+        resume = []  # the rest is inside the lag window: it comes with the next poll
+    out["watermark"] = watermark.isoformat() if watermark else None
+    out["has_more"] = bool(resume)
+    return jsonify(out)
+
+
+# --- tombstone retention ---
+def _retention() -> timedelta:
+    return timedelta(days=current_app.config.get("TOMBSTONE_RETENTION_DAYS", DEFAULT_TOMBSTONE_RETENTION_DAYS))
+
+
+def prune_tombstones(before: datetime) -> int:
+    n = Tombstone.query.filter(Tombstone.deleted_at < before).delete(synchronize_session=False)
+    db.session.commit()
+    return n
+
+
+@bp.cli.command("prune")
+@click.option("--days", type=int, default=None, help="Retention window (default TOMBSTONE_RETENTION_DAYS).")
+def prune(days):
+    """Delete tombstones past retention (run daily from cron)."""
+    keep = timedelta(days=days) if days is not None else _retention()
+    click.echo(f"pruned {prune_tombstones(utcnow() - keep)} tombstone(s)")
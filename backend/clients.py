@@ -4,6 +4,7 @@ from functools import wraps
 from flask import Blueprint, jsonify, request, g
 from .extensions import db
 from .models import Client
+from .serializers import CLIENT
 
 # use the helpers we already built in auth.py
 from .auth import _get_token_from_request, _verify_token
@@ -47,19 +48,19 @@ def client_json(c: Client) -> dict:
 @bp.get("")
 @require_auth
 def list_clients():
-    q = Client.query.filter(Client.deleted_at.is_(None))
+    stmt = CLIENT.select().where(Client.deleted_at.is_(None))
     search = request.args.get("q", "").strip()
     if search:
         like = f"%{search}%"
-        q = q.filter(
+        stmt = stmt.where(
             db.or_(
                 Client.name.ilike(like),
                 Client.email.ilike(like),
                 Client.contact_name.ilike(like),
             )
         )
-    q = q.order_by(Client.created_at.desc())
-    items = [client_json(c) for c in q.all()]
+    stmt = stmt.order_by(Client.created_at.desc())
+    items = CLIENT.all(stmt)
     return jsonify(clients=items)
 
 
@@ -11,5 +11,97 @@ class Config:
     UPLOAD_DIR = os.getenv("UPLOAD_DIR", os.path.join(os.getcwd(), "uploads"))
 
     JWT_SECRET = os.getenv("JWT_SECRET", SECRET_KEY)
-    JWT_EXPIRES_MIN = int(os.getenv("JWT_EXPIRES_MIN", "120"))
+    # access tokens are checked without a database read, so keep them short;
+    # the single-use refresh token (its cookie is only sent to /api/auth)
+    # renews them
+    JWT_EXPIRES_MIN = int(os.getenv("JWT_EXPIRES_MIN", "15"))
+    JWT_REFRESH_EXPIRES_DAYS = int(os.getenv("JWT_REFRESH_EXPIRES_DAYS", "14"))
+    # a refresh token presented again within this window is a race between
+    # two tabs, not a stolen copy: refused, but the session survives
+    JWT_REFRESH_REUSE_GRACE_SECONDS = float(os.getenv("JWT_REFRESH_REUSE_GRACE_SECONDS", "10"))
     COOKIE_NAME = os.getenv("COOKIE_NAME", "pp_access")
+    REFRESH_COOKIE_NAME = os.getenv("REFRESH_COOKIE_NAME", "pp_refresh")
+    # refresh tokens and revocations (backend/tokens.py); each worker polls
+    # new revocations this often
+    AUTH_DB = os.getenv("AUTH_DB", os.path.join(INSTANCE_DIR, "auth.db"))
+    AUTH_REVOCATION_SYNC_SECONDS = float(os.getenv("AUTH_REVOCATION_SYNC_SECONDS", "1.0"))
+
+    # live events: "local" (single process) or "sqlite" (fan out across workers)
+    EVENTS_FANOUT = os.getenv("EVENTS_FANOUT", "local")
+    EVENTS_DB = os.getenv("EVENTS_DB", os.path.join(INSTANCE_DIR, "events.db"))
+    EVENTS_MAX_SUBSCRIBERS = int(os.getenv("EVENTS_MAX_SUBSCRIBERS", "1000"))
+
+    # change feed (GET /api/changes): the watermark stays this far behind now
+    # so rows still waiting for the write lock are not skipped; tombstones
+    # older than the retention are pruned (flask changes prune)
+    CHANGES_SAFETY_LAG_SECONDS = float(os.getenv("CHANGES_SAFETY_LAG_SECONDS", "10"))
+    TOMBSTONE_RETENTION_DAYS = int(os.getenv("TOMBSTONE_RETENTION_DAYS", "30"))
+
+    # soft-deleted rows older than this move to the archive_* tables (flask archive run)
+    ARCHIVE_RETENTION_DAYS = int(os.getenv("ARCHIVE_RETENTION_DAYS", "90"))
+    ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+
+    # chunked backfills (flask backfill run): rows per transaction, and the
+    # throttle between chunks (minimum pause, max fraction of time writing)
+    BACKFILL_CHUNK_SIZE = int(os.getenv("BACKFILL_CHUNK_SIZE", "2000"))
+    BACKFILL_PAUSE = float(os.getenv("BACKFILL_PAUSE", "0.05"))
+    BACKFILL_DUTY = float(os.getenv("BACKFILL_DUTY", "0.5"))
+
+    # flask maintenance run: rows ANALYZE samples per index, free pages
+    # released per run (only with auto_vacuum=INCREMENTAL)
+    MAINTENANCE_ANALYSIS_LIMIT = int(os.getenv("MAINTENANCE_ANALYSIS_LIMIT", "1000"))
+    MAINTENANCE_VACUUM_PAGES = int(os.getenv("MAINTENANCE_VACUUM_PAGES", "2000"))
+    # record distinct statements for `flask maintenance indexes`
+    QUERY_PLAN_CAPTURE = os.getenv("QUERY_PLAN_CAPTURE", "0") == "1"
+    QUERY_PLAN_DB = os.getenv("QUERY_PLAN_DB", os.path.join(INSTANCE_DIR, "query_plans.db"))
+    QUERY_PLAN_FLUSH_SECONDS = float(os.getenv("QUERY_PLAN_FLUSH_SECONDS", "30"))
+
+    # dashboard KPI snapshot (backend/dashboard.py): commits touching KPI
+    # tables queue one refresh per window; a project whose spend reaches this
+    # share of its budget counts as at risk
+    KPI_REFRESH_ON_WRITE = os.getenv("KPI_REFRESH_ON_WRITE", "1") == "1"
+    KPI_DEBOUNCE_SECONDS = float(os.getenv("KPI_DEBOUNCE_SECONDS", "15"))
+    KPI_AT_RISK_SPEND_PCT = float(os.getenv("KPI_AT_RISK_SPEND_PCT", "90"))
+
+    # background jobs (flask jobs work): queue file, worker poll interval,
+    # how long a claimed job may run before another worker retries it,
+    # retry policy (first backoff, doubling) and retention of finished jobs
+    JOBS_DB = os.getenv("JOBS_DB", os.path.join(INSTANCE_DIR, "jobs.db"))
+    JOBS_POLL_SECONDS = float(os.getenv("JOBS_POLL_SECONDS", "1.0"))
+    JOBS_LEASE_SECONDS = float(os.getenv("JOBS_LEASE_SECONDS", "600"))
+    JOBS_MAX_ATTEMPTS = int(os.getenv("JOBS_MAX_ATTEMPTS", "5"))
+    JOBS_BACKOFF_SECONDS = float(os.getenv("JOBS_BACKOFF_SECONDS", "10"))
+    JOBS_RETENTION_DAYS = int(os.getenv("JOBS_RETENTION_DAYS", "7"))
+
+    # SQLite: WAL lets readers in other workers proceed during a write;
+    # busy_timeout makes writers wait for the lock instead of failing
+    SQLITE_WAL = os.getenv("SQLITE_WAL", "0") == "1"
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+    # ASGI mode (backend/asgi.py): async connections for the native read
+    # routes, threads for everything still served by the Flask app
+    ASYNC_DB_POOL_SIZE = int(os.getenv("ASYNC_DB_POOL_SIZE", "20"))
+    ASGI_WSGI_THREADS = int(os.getenv("ASGI_WSGI_THREADS", "10"))
+
+    # one SQLite file per organization (backend/tenancy.py); the main
+    # database keeps only the tenant directory when this is on
+    TENANT_ROUTING = os.getenv("TENANT_ROUTING", "0") == "1"
+    TENANTS_DIR = os.getenv("TENANTS_DIR", os.path.join(INSTANCE_DIR, "tenants"))
+    TENANT_ENGINE_CACHE = int(os.getenv("TENANT_ENGINE_CACHE", "32"))
+
+    # portfolio reports/exports (backend/reports.py) read a copy refreshed by
+    # `flask reports snapshot` instead of the live database
+    REPORT_SNAPSHOT = os.getenv("REPORT_SNAPSHOT", "0") == "1"
+    REPORT_SNAPSHOT_PATH = os.getenv("REPORT_SNAPSHOT_PATH", os.path.join(INSTANCE_DIR, "report_snapshot.db"))
+
+    # per-worker type-ahead index (backend/autocomplete.py) is rebuilt this
+    # often to pick up other workers' writes; 0 = only this worker's deltas
+    AUTOCOMPLETE_MAX_AGE = int(os.getenv("AUTOCOMPLETE_MAX_AGE", "300"))
+
+
+class ProductionConfig(Config):
+    """Defaults for several gunicorn workers sharing one database (backend/wsgi.py)."""
+    SQLALCHEMY_ENGINE_OPTIONS = {"pool_pre_ping": True}
+    SQLITE_WAL = os.getenv("SQLITE_WAL", "1") == "1"
+    # local fanout would only reach clients connected to the same worker
+    EVENTS_FANOUT = os.getenv("EVENTS_FANOUT", "sqlite")
@@ -0,0 +1,230 @@
+# backend/dashboard.py
+"""Home dashboard KPIs, precomputed into kpi_snapshots.
+
+The dashboard used to derive its numbers in the browser from one request per
+project, so it got slower with every project added. The portfolio totals are
+now computed in one aggregate query by a background refresh and stored as a
+single row, and the endpoint only reads that row:
+
+  GET /api/dashboard/kpis     the KPIs, `as_of` / `staleness_seconds`, ETag
+
+A refresh runs as the `dashboard.refresh` job (backend/jobs.py). Commits
+that touch projects, budget lines, BOM rows, expenses or tasks queue one,
+debounced: every write inside the same KPI_DEBOUNCE_SECONDS window maps to
+the same idempotency key, so a burst of edits costs one refresh, run at the
+end of the window. Raw SQL writes (backfills, maintenance scripts) are not
+seen; a timer covers those:
+
+  flask dashboard refresh               # once (cron)
+  flask dashboard refresh --every 300   # keep refreshing (sidecar process)
+
+Until the first refresh the endpoint computes the snapshot itself. With
+tenant routing each tenant database has its own snapshot row; jobs run
+against the tenant they were queued for (`flask tenants each dashboard refresh`
+for the timer).
+"""
+from __future__ import annotations
+import time
+from datetime import date as dt_date, timezone
+import click
+from flask import Blueprint, current_app, has_app_context, jsonify, request
+from sqlalchemy import bindparam, event, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from .auth import require_auth
+from .extensions import RoutingSession, db
+from .jobs import enqueue, job, run_every
+from .models import (
+    Component, Expense, ExpenseLine, KpiSnapshot, Project, ProjectCategory, ProjectComponent, Task, utcnow,
+)
+from .money import from_cents, to_cents
+from .projects import _actual_sql, _planned_sql
+from .reports import _watermark
+from .tasks import OPEN_STATUSES
+from .tenancy import current_tenant
+
+bp = Blueprint("dashboard", __name__, url_prefix="/api/dashboard")
+
+SNAPSHOT_ID = 1
+# writes to these change a KPI
+TRACKED = (Project, ProjectCategory, ProjectComponent, Component, Expense, ExpenseLine, Task)
+
+# (tenant -> debounce window) last queued by this process: skips the jobs
+# database for the rest of a write burst
+_requested: dict[str, int] = {}
+
+
+# --- computing ---
+# Per live project: its budget (budget_cents, else the planned total, as the
+# dashboard shows it), spend and overdue open tasks; folded into one row.
+# planned and spend sum the summary's per-category rows (projects._planned_sql
+# / _actual_sql) over every project.
+_KPI_SQL = text(
+    f"""
+    WITH planned AS (
+        SELECT project_id, SUM(planned_cents) AS cents FROM ({_planned_sql()}) GROUP BY project_id
+    ), spend AS (
+        SELECT project_id, SUM(actual_cents) AS cents FROM ({_actual_sql()}) GROUP BY project_id
+    ), overdue AS (
+        SELECT project_id, COUNT(*) AS n
+        FROM tasks
+        WHERE status IN :open AND due_date < :today
+        GROUP BY project_id
+    ), per_project AS (
+        SELECT p.status,
+               COALESCE(NULLIF(p.budget_cents, 0), planned.cents, 0) AS budget,
+               COALESCE(spend.cents, 0) AS spend,
+               COALESCE(overdue.n, 0) AS overdue
+        FROM projects p
+        LEFT JOIN planned ON planned.project_id = p.id
+        LEFT JOIN spend ON spend.project_id = p.id
+        LEFT JOIN overdue ON overdue.project_id = p.id
+        WHERE p.deleted_at IS NULL
+    )
+    SELECT COUNT(*) AS projects,
+           COALESCE(SUM(status = 'active'), 0) AS active_projects,
+           COALESCE(SUM(budget), 0) AS budget_cents,
+           COALESCE(SUM(spend), 0) AS spend_cents,
+           COALESCE(SUM(overdue), 0) AS overdue_tasks,
+           COALESCE(SUM(budget > 0 AND spend > budget), 0) AS over_budget_projects,
+           COALESCE(SUM(status != 'completed' AND (
+               overdue > 0 OR (budget > 0 AND spend * 100 >= budget * :risk_pct)
+           )), 0) AS at_risk_projects
+    FROM per_project
+"""
+).bindparams(bindparam("open", expanding=True), bindparam("today", type_=db.Date))
+
+
+def compute_kpis(today: dt_date | None = None) -> dict:
+    row = db.session.execute(_KPI_SQL, {
+        "open": list(OPEN_STATUSES),
+        "today": today or dt_date.today(),
+        "risk_pct": current_app.config.get("KPI_AT_RISK_SPEND_PCT", 90),
+    }).one()
+    return {
+        "projects": row.projects,
+        "active_projects": row.active_projects,
+        "total_budget_usd": from_cents(row.budget_cents),
+        "total_spend_usd": from_cents(row.spend_cents),
+        "overdue_tasks": row.overdue_tasks,
+        "at_risk_projects": row.at_risk_projects,
+        "over_budget_projects": row.over_budget_projects,
+    }
+
+
+def refresh_kpis() -> KpiSnapshot:
+    """Recompute the snapshot row and commit it."""
+    t0 = time.perf_counter()
+    kpis = compute_kpis()
+    values = {
+        **kpis,
+        "computed_at": utcnow(),
+        "compute_ms": round((time.perf_counter() - t0) * 1000),
+    }
+    # concurrent refreshes (two workers, or a first GET) both write the one row
+    stmt = sqlite_insert(KpiSnapshot).values(id=SNAPSHOT_ID, **values)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=["id"], set_={c.name: c for c in stmt.excluded if c.name != "id"},
+    ))
+    db.session.commit()
+    return db.session.get(KpiSnapshot, SNAPSHOT_ID, populate_existing=True)
+
+
+@job("dashboard.refresh")
+def _refresh_job(payload: dict) -> dict:
+    snap = refresh_kpis()
+    return {"computed_at": snap.computed_at.isoformat(), "compute_ms": snap.compute_ms}
+
+
+# --- write-triggered refresh: note KPI changes at flush, queue at commit ---
+def request_refresh() -> None:
+    """Queue a refresh at the end of the current debounce window (once per
+    window and tenant, however many commits land in it)."""
+    window = current_app.config.get("KPI_DEBOUNCE_SECONDS", 15)
+    now = time.time()
+    bucket = int(now // window)
+    tenant = current_tenant() or ""
+    if _requested.get(tenant) == bucket:
+        return
+    _requested[tenant] = bucket
+    try:
+        enqueue("dashboard.refresh", key=f"dashboard.refresh:{bucket}", delay=(bucket + 1) * window - now)
+    except Exception:  # the write is committed; the timer refresh catches up
+        _requested.pop(tenant, None)
+        current_app.logger.warning("could not queue a dashboard refresh", exc_info=True)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _collect(session, _ctx):
+    if "dashboard" in session.info:
+        return
+    for objs in (session.new, session.dirty, session.deleted):
+        if any(isinstance(obj, TRACKED) for obj in objs):
+            session.info["dashboard"] = True
+            return
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _collect_bulk(state):
+    # ORM-enabled update()/delete()/insert() statements bypass the flush
+    if (state.is_update or state.is_delete or state.is_insert) and state.bind_mapper is not None:
+        if issubclass(state.bind_mapper.class_, TRACKED):
+            state.session.info["dashboard"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _queue_refresh(session):
+    if session.info.pop("dashboard", None) and has_app_context() \
+            and current_app.config.get("KPI_REFRESH_ON_WRITE", True):
+        request_refresh()
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _discard(session):
+    session.info.pop("dashboard", None)
+
+
+# --- routes ---
+def snapshot_json(snap: KpiSnapshot) -> dict:
+    budget, spend = to_cents(snap.total_budget_usd), to_cents(snap.total_spend_usd)
+    return {
+        "kpis": {
+            "projects": snap.projects,
+            "active_projects": snap.active_projects,
+            "total_budget_usd": snap.total_budget_usd,
+            "total_spend_usd": snap.total_spend_usd,
+            "gross_profit_usd": from_cents(budget - spend),
+            "budget_used_pct": round(100 * spend / budget, 1) if budget else None,
+            "overdue_tasks": snap.overdue_tasks,
+            "at_risk_projects": snap.at_risk_projects,
+            "over_budget_projects": snap.over_budget_projects,
+        },
+        **_watermark(snap.computed_at.replace(tzinfo=timezone.utc)),
+        "compute_ms": snap.compute_ms,
+    }
+
+
+@bp.get("/kpis")
+@require_auth
+def kpis():
+    snap = db.session.get(KpiSnapshot, SNAPSHOT_ID) or refresh_kpis()
+    as_of = snap.computed_at.replace(tzinfo=timezone.utc)
+    resp = jsonify(snapshot_json(snap))
+    # the row only changes on refresh: revalidate, and get a 304 until then
+    resp.set_etag(f"kpis-{int(as_of.timestamp() * 1000)}")
+    resp.headers["Cache-Control"] = "private, no-cache"
+    resp.headers["X-Report-As-Of"] = as_of.isoformat()
+    resp.make_conditional(request)
+    return resp
+
+
+# --- CLI ---
+@bp.cli.command("refresh")
+@click.option("--every", type=float, default=0, help="Keep refreshing every N seconds.")
+def refresh(every):
+    """Recompute the dashboard KPI snapshot."""
+
+    def step():
+        snap = refresh_kpis()
+        click.echo(f"{snap.computed_at.isoformat()} {snap.projects} project(s) in {snap.compute_ms} ms")
+
+    run_every(every, step, "refresh")
@@ -0,0 +1,283 @@
+# backend/events.py
+"""Per-project live events (task, comment and expense changes) over SSE.
+
+Write paths call ``broker.publish(pid, type, data)`` after they commit.
+The broker hands the event to a fanout, which is responsible for getting
+it to every worker process:
+
+  - LocalFanout   single process; dispatches straight to local subscribers
+  - SQLiteFanout  appends to a small SQLite event log; one poller thread per
+                  worker reads new rows and dispatches them locally
+
+Each open stream is a bounded queue (no DB session, no app context). The
+Flask view below drains it from a blocking generator, so under WSGI every
+open stream holds a thread: with gthread workers a handful of idle clients
+fill a worker, so serve it from gevent workers there. backend/asgi.py
+serves the same stream natively: the subscription's `wake` callback sets
+an asyncio event, and an idle client costs a parked coroutine.
+"""
+from __future__ import annotations
+import itertools
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from flask import Blueprint, Response, jsonify, request, g, has_app_context
+from .extensions import db
+from .models import Project
+from .auth import require_auth
+
+bp = Blueprint("events", __name__, url_prefix="/api/projects")
+
+HEARTBEAT_SEC = 15
+QUEUE_SIZE = 100
+HISTORY_SIZE = 200  # per project, for Last-Event-ID replay
+
+# set while a caller holds events back until its transaction commits
+_held: ContextVar[list | None] = ContextVar("events_held", default=None)
+
+
+# --- fanouts ---
+class LocalFanout:
+    """Single-process fanout: events never leave this worker."""
+
+    def __init__(self):
+        self._ids = itertools.count(1)
+
+    def start(self, broker: "EventBroker") -> None:
+        pass
+
+    def publish(self, broker: "EventBroker", event: dict) -> None:
+        event["id"] = next(self._ids)
+        broker.dispatch(event)
+
+
+class SQLiteFanout:
+    """Cross-worker fanout through an append-only SQLite log.
+
+    Publishing is one INSERT; each worker runs a single poller thread, so the
+    cost does not grow with the number of connected clients.
+    """
+
+    POLL_SEC = 0.25
+    RETENTION_SEC = 600
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS event_log ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " project_id INTEGER NOT NULL,"
+                " payload TEXT NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+            conn.commit()
+            self._local.conn = conn
+        return conn
+
+    def start(self, broker: "EventBroker") -> None:
+        last_id = self._conn().execute("SELECT COALESCE(MAX(id), 0) FROM event_log").fetchone()[0]
+        t = threading.Thread(target=self._poll, args=(broker, last_id), daemon=True, name="events-poller")
+        t.start()
+
+    def publish(self, broker: "EventBroker", event: dict) -> None:
+        conn = self._conn()
+        conn.execute(
+            "INSERT INTO event_log (project_id, payload, created_at) VALUES (?, ?, ?)",
+            (event["project_id"], json.dumps(event), time.time()),
+        )
+        conn.commit()
+
+    def _poll(self, broker: "EventBroker", last_id: int) -> None:
+        conn = self._conn()
+        loops = 0
+        while True:
+            try:
+                rows = conn.execute(
+                    "SELECT id, payload FROM event_log WHERE id > ? ORDER BY id LIMIT 500",
+                    (last_id,),
+                ).fetchall()
+                for row_id, payload in rows:
+                    event = json.loads(payload)
+                    event["id"] = row_id
+                    broker.dispatch(event)
+                    last_id = row_id
+                loops += 1
+                if loops % 240 == 0:  # about once a minute
+                    conn.execute(
+                        "DELETE FROM event_log WHERE created_at < ?",
+                        (time.time() - self.RETENTION_SEC,),
+                    )
+                    conn.commit()
+            except sqlite3.Error:
+                pass  # locked or briefly unavailable; try again next tick
+            time.sleep(self.POLL_SEC)
+
+
+# --- broker ---
+class _Subscription:
+    def __init__(self):
+        self.queue: queue.Queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self.closed = False
+        # called from the dispatching thread after every put (or close)
+        self.wake = None
+
+
+class EventBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # keyed by (tenant slug or None, project id)
+        self._subs: dict[tuple, set[_Subscription]] = {}
+        self._history: dict[tuple, deque] = {}
+        self._fanout = LocalFanout()
+        self._started_pid: int | None = None
+        self.max_subscribers = 1000
+
+    def init_app(self, app, fanout=None) -> None:
+        kind = app.config.get("EVENTS_FANOUT", "local")
+        if fanout is not None:
+            self._fanout = fanout
+        elif kind == "sqlite":
+            self._fanout = SQLiteFanout(app.config["EVENTS_DB"])
+        else:
+            self._fanout = LocalFanout()
+        self.max_subscribers = app.config.get("EVENTS_MAX_SUBSCRIBERS", 1000)
+        app.extensions["events"] = self
+
+    def _ensure_started(self) -> None:
+        # lazily, and again after a fork: threads do not survive into workers
+        pid = os.getpid()
+        if self._started_pid == pid:
+            return
+        with self._lock:
+            if self._started_pid != pid:
+                self._fanout.start(self)
+                self._started_pid = pid
+
+    @contextmanager
+    def hold(self):
+        """Collect publishes instead of sending them; the caller replays
+        them with publish_all() once its transaction has committed."""
+        token = _held.set([])
+        try:
+            yield _held.get()
+        finally:
+            _held.reset(token)
+
+    def publish_all(self, held: list) -> None:
+        for args in held:
+            self.publish(*args)
+
+    def publish(self, project_id: int, type_: str, data) -> None:
+        held = _held.get()
+        if held is not None:
+            held.append((project_id, type_, data))
+            return
+        self._ensure_started()
+        event = {
+            "type": type_,
+            "project_id": project_id,
+            "data": data,
+            "ts": datetime.now(timezone.utc).isoformat(),
+        }
+        tenant = g.get("tenant") if has_app_context() else None
+        if tenant is not None:
+            # project ids repeat across tenant databases
+            event["tenant"] = tenant
+        self._fanout.publish(self, event)
+
+    def dispatch(self, event: dict) -> None:
+        channel = (event.get("tenant"), event["project_id"])
+        with self._lock:
+            self._history.setdefault(channel, deque(maxlen=HISTORY_SIZE)).append(event)
+            subs = list(self._subs.get(channel, ()))
+        for sub in subs:
+            try:
+                sub.queue.put_nowait(event)
+            except queue.Full:
+                # slow consumer: end its stream, it will reconnect with Last-Event-ID
+                sub.closed = True
+            if sub.wake is not None:
+                sub.wake()
+
+    def subscribe(self, project_id: int, last_event_id: int | None = None, tenant: str | None = None) -> _Subscription | None:
+        self._ensure_started()
+        sub = _Subscription()
+        channel = (tenant, project_id)
+        with self._lock:
+            if sum(len(s) for s in self._subs.values()) >= self.max_subscribers:
+                return None
+            self._subs.setdefault(channel, set()).add(sub)
+            if last_event_id is not None:
+                missed = [e for e in self._history.get(channel, ()) if e["id"] > last_event_id]
+                for event in missed[-QUEUE_SIZE:]:
+                    sub.queue.put_nowait(event)
+        return sub
+
+    def unsubscribe(self, project_id: int, sub: _Subscription, tenant: str | None = None) -> None:
+        channel = (tenant, project_id)
+        with self._lock:
+            subs = self._subs.get(channel)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subs[channel]
+
+
+broker = EventBroker()
+
+
+def _sse(event: dict) -> str:
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+# --- routes ---
+@bp.get("/<int:pid>/events")
+@require_auth
+def project_events(pid: int):
+    """Server-Sent Events stream of a project's task, comment and expense changes.
+    Reconnects send Last-Event-ID and get the events they missed (best effort).
+    """
+    p = Project.query.get(pid)
+    if not p or p.deleted_at is not None:
+        return jsonify(error="not found"), 404
+    # don't pin a pooled connection for the lifetime of the stream
+    db.session.remove()
+
+    last_id = request.headers.get("Last-Event-ID", type=int)
+    tenant = g.get("tenant")
+    sub = broker.subscribe(pid, last_id, tenant)
+    if sub is None:
+        return jsonify(error="too many event streams"), 503
+
+    def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while not sub.closed:
+                try:
+                    event = sub.queue.get(timeout=HEARTBEAT_SEC)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield _sse(event)
+        finally:
+            broker.unsubscribe(pid, sub, tenant)
+
+    return Response(
+        stream(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -2,10 +2,13 @@ from __future__ import annotations
 from datetime import date as dt_date
 from functools import wraps
 from flask import Blueprint, jsonify, request, g, current_app
+from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 from .extensions import db
 from .models import Expense, ExpenseLine, Project, Category
 from .auth import _get_token_from_request, _verify_token
+from .events import broker
+from .money import from_cents, line_total_cents
 
 bp = Blueprint("expenses", __name__, url_prefix="/api/projects")
 
@@ -36,23 +39,39 @@ def _coerce_num(v, default=0.0) -> float:
     except Exception:
         return float(default)
 
-def _recalculate_expense(exp: Expense) -> None:
-    """Recompute per-line totals and (if columns exist) subtotal/tax/total."""
-    subtotal = 0.0
+def _recalculate_expense(exp: Expense) -> dict:
+    """Recompute per-line totals and (if columns exist) subtotal/tax/total.
+    Returns the totals either way."""
+    subtotal_cents = 0
     for ln in exp.lines:
         ln.qty = _coerce_num(getattr(ln, "qty", 0))
         ln.unit_price_usd = _coerce_num(getattr(ln, "unit_price_usd", 0))
-        ln.line_total_usd = round(ln.qty * ln.unit_price_usd, 2)
-        subtotal += ln.line_total_usd
+        cents = line_total_cents(ln.qty, ln.unit_price_usd)
+        ln.line_total_usd = from_cents(cents)
+        subtotal_cents += cents
     tax_rate = _coerce_num(getattr(exp.project, "tax_rate", 0.0))
-    tax = round(subtotal * tax_rate, 2)
-    total = round(subtotal + tax, 2)
+    tax_cents = line_total_cents(from_cents(subtotal_cents), tax_rate)
+    subtotal = from_cents(subtotal_cents)
+    tax = from_cents(tax_cents)
+    total = from_cents(subtotal_cents + tax_cents)
     if hasattr(exp, "subtotal_usd"):
         exp.subtotal_usd = subtotal
     if hasattr(exp, "tax_usd"):
         exp.tax_usd = tax
     if hasattr(exp, "total_usd"):
         exp.total_usd = total
+    return {"subtotal_usd": subtotal, "tax_usd": tax, "total_usd": total}
+
+
+def _apply_header(exp: Expense, data: dict) -> None:
+    if "expense_date" in data:
+        exp.expense_date = _parse_date(data["expense_date"]) or exp.expense_date
+    if "vendor" in data:
+        exp.vendor = data["vendor"] or None
+    if "reference_no" in data:
+        exp.reference_no = data["reference_no"] or None
+    if "memo" in data:
+        exp.memo = data["memo"] or None
 
 
 def _expense_to_dict(e: Expense) -> dict:
@@ -74,6 +93,52 @@ def _expense_to_dict(e: Expense) -> dict:
         ],
     }
 
+def _expense_list_stmts(pid: int):
+    """(expenses, lines) for a project's expense list: two flat queries
+    instead of a lazy load per expense. Shared with backend/asgi.py."""
+    expenses = (
+        select(Expense.id, Expense.reference_no, Expense.expense_date, Expense.vendor, Expense.memo)
+        .where(Expense.project_id == pid)
+        .order_by(Expense.expense_date.desc())
+    )
+    lines = (
+        select(
+            ExpenseLine.expense_id,
+            ExpenseLine.id,
+            ExpenseLine.category_id,
+            ExpenseLine.qty,
+            ExpenseLine.unit_price_usd,
+            ExpenseLine.line_total_usd,
+        )
+        .join(Expense, Expense.id == ExpenseLine.expense_id)
+        .where(Expense.project_id == pid)
+        .order_by(ExpenseLine.id)
+    )
+    return expenses, lines
+
+
+def _expense_list(expense_rows, line_rows) -> list[dict]:
+    lines: dict[int, list] = {}
+    for l in line_rows:
+        lines.setdefault(l.expense_id, []).append({
+            "id": l.id,
+            "category_id": l.category_id,
+            "qty": float(l.qty),
+            "unit_price_usd": float(l.unit_price_usd),
+            "line_total_usd": float(l.line_total_usd),
+        })
+    return [
+        {
+            "id": e.id,
+            "reference_no": e.reference_no,
+            "expense_date": e.expense_date.isoformat(),
+            "vendor": e.vendor,
+            "memo": e.memo,
+            "lines": lines.get(e.id, []),
+        }
+        for e in expense_rows
+    ]
+
 @bp.post("/<int:pid>/expenses")
 @require_auth
 def create_expense(pid: int):
@@ -107,10 +172,11 @@ def create_expense(pid: int):
             category_id=cid,
             qty=qty,
             unit_price_usd=unit,
-            line_total_usd=qty * unit,
+            line_total_usd=from_cents(line_total_cents(qty, unit)),
         ))
 
     db.session.commit()
+    broker.publish(pid, "expense.created", _expense_to_dict(e))
     return jsonify(id=e.id), 201
 
 
@@ -121,24 +187,8 @@ def list_expenses(pid: int):
     if not project or project.deleted_at is not None:
         return jsonify(error="not found"), 404
 
-    items = []
-    for e in Expense.query.filter_by(project_id=pid).order_by(Expense.expense_date.desc()).all():
-        items.append({
-            "id": e.id,
-            "reference_no": e.reference_no,
-            "expense_date": e.expense_date.isoformat(),
-            "vendor": e.vendor,
-            "memo": e.memo,
-            "lines": [
-                {
-                    "id": l.id,
-                    "category_id": l.category_id,
-                    "qty": float(l.qty),
-                    "unit_price_usd": float(l.unit_price_usd),
-                    "line_total_usd": float(l.line_total_usd),
-                } for l in e.lines
-            ],
-        })
+    expenses, lines = _expense_list_stmts(pid)
+    items = _expense_list(db.session.execute(expenses), db.session.execute(lines))
     return jsonify(expenses=items)
 
 @bp.route("/<int:pid>/expenses/<int:eid>", methods=["PATCH"])
@@ -151,16 +201,11 @@ def patch_expense(pid: int, eid: int):
     if not exp:
         return jsonify(error="not found"), 404
     data = request.get_json(silent=True) or {}
-    if "expense_date" in data:
-        exp.expense_date = _parse_date(data["expense_date"]) or exp.expense_date
-    if "vendor" in data:
-        exp.vendor = data["vendor"] or None
-    if "reference_no" in data:
-        exp.reference_no = data["reference_no"] or None
-    if "memo" in data:
-        exp.memo = data["memo"] or None
+    _apply_header(exp, data)
     db.session.commit()
-    return jsonify(_expense_to_dict(exp))
+    body = _expense_to_dict(exp)
+    broker.publish(pid, "expense.updated", body)
+    return jsonify(body)
 
 @bp.post("/<int:pid>/expenses/<int:eid>/lines")
 @require_auth
@@ -184,11 +229,12 @@ def add_expense_line(pid: int, eid: int):
         category_id=cid,
         qty=qty,
         unit_price_usd=unit,
-        line_total_usd=round(qty * unit, 2),
+        line_total_usd=from_cents(line_total_cents(qty, unit)),
     )
     db.session.add(ln)
     _recalculate_expense(exp)
     db.session.commit()
+    broker.publish(pid, "expense.updated", _expense_to_dict(exp))
     return jsonify({
         "id": ln.id,
         "expense_id": eid,
@@ -232,6 +278,7 @@ def patch_expense_line(pid: int, eid: int, lid: int):
     ln.unit_price_usd = _coerce_num(ln.unit_price_usd, ln.unit_price_usd)
     _recalculate_expense(exp)
     db.session.commit()
+    broker.publish(pid, "expense.updated", _expense_to_dict(exp))
     return jsonify({
         "id": ln.id,
         "expense_id": eid,
@@ -256,4 +303,101 @@ def delete_expense_line(pid: int, eid: int, lid: int):
     db.session.delete(ln)
     _recalculate_expense(exp)
     db.session.commit()
+    broker.publish(pid, "expense.updated", _expense_to_dict(exp))
     return jsonify(ok=True)
+
+
+def _is_id(v) -> bool:
+    return isinstance(v, int) and not isinstance(v, bool)
+
+
+@bp.post("/<int:pid>/expenses/<int:eid>/ops")
+@require_auth
+def apply_expense_ops(pid: int, eid: int):
+    """Header patch plus line operations, applied all-or-nothing.
+    Body:
+      {"header": {...same fields as PATCH...},
+       "lines": [{"op": "add", "category_id", "qty", "unit_price_usd"},
+                 {"op": "update", "id", ...fields to change...},
+                 {"op": "delete", "id"}]}
+    Returns the full expense with recalculated totals.
+    """
+    project = Project.query.get(pid)
+    if not project or getattr(project, "deleted_at", None) is not None:
+        return jsonify(error="not found"), 404
+    exp = Expense.query.filter_by(id=eid, project_id=pid).first()
+    if not exp:
+        return jsonify(error="not found"), 404
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify(error="body must be an object"), 400
+    header = data.get("header") or {}
+    if not isinstance(header, dict):
+        return jsonify(error="header must be an object"), 400
+    ops = data.get("lines") or []
+    if not isinstance(ops, list):
+        return jsonify(error="lines must be a list"), 400
+
+    # shape first: ids must be ints before they are hashed or looked up
+    for i, op in enumerate(ops):
+        kind = op.get("op") if isinstance(op, dict) else None
+        if kind not in ("add", "update", "delete"):
+            return jsonify(error="op must be add, update or delete", op_index=i), 400
+        if kind != "add" and not _is_id(op.get("id")):
+            return jsonify(error="id must be an integer", op_index=i), 400
+        if "category_id" in op and not _is_id(op["category_id"]):
+            return jsonify(error="invalid category_id", op_index=i), 400
+
+    # one prefetch for every category referenced by any op
+    wanted = {op["category_id"] for op in ops if op.get("category_id") is not None}
+    valid_cats = (
+        {c.id for c in Category.query.filter(Category.id.in_(wanted)).all()} if wanted else set()
+    )
+    lines_by_id = {ln.id: ln for ln in exp.lines}
+
+    # validate everything before touching the session
+    planned = []
+    touched = set()  # each line may be updated or deleted once per request
+    for i, op in enumerate(ops):
+        kind = op["op"]
+        ln = None
+        if kind in ("update", "delete"):
+            if op["id"] in touched:
+                return jsonify(error="line already changed by an earlier op", op_index=i), 400
+            ln = lines_by_id.get(op["id"])
+            if ln is None:
+                return jsonify(error="line not found", op_index=i), 404
+            touched.add(op["id"])
+        if kind == "delete":
+            planned.append((kind, ln, None))
+            continue
+        fields = {}
+        if kind == "add" or "category_id" in op:
+            if op.get("category_id") not in valid_cats:
+                return jsonify(error="invalid category_id", op_index=i), 400
+            fields["category_id"] = op["category_id"]
+        if kind == "add" or "qty" in op or "quantity" in op:
+            qv = op.get("qty") if "qty" in op else op.get("quantity")
+            fields["qty"] = _coerce_num(qv, ln.qty if ln is not None else 0)
+        if kind == "add" or "unit_price_usd" in op:
+            up = op.get("unit_price_usd")
+            fields["unit_price_usd"] = _coerce_num(up, ln.unit_price_usd if ln is not None else 0)
+        if fields.get("qty", 0) < 0 or fields.get("unit_price_usd", 0) < 0:
+            return jsonify(error="negative qty or unit_price_usd", op_index=i), 400
+        planned.append((kind, ln, fields))
+
+    _apply_header(exp, header)
+    for kind, ln, fields in planned:
+        if kind == "add":
+            exp.lines.append(ExpenseLine(**fields))
+        elif kind == "update":
+            for k, v in fields.items():
+                setattr(ln, k, v)
+        else:
+            exp.lines.remove(ln)  # delete-orphan cascade removes the row
+    totals = _recalculate_expense(exp)
+    db.session.commit()
+
+    body = {**_expense_to_dict(exp), "totals": totals}
+    broker.publish(pid, "expense.updated", body)
+    return jsonify(body)
@@ -1,5 +1,68 @@
+import os
+from flask import current_app, g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, inspect
 
-db = SQLAlchemy()
-migrate = Migrate()
+
+class RoutingSession(Session):
+    """With tenant routing on (backend/tenancy.py), queries go to the
+    database of the request's tenant; directory tables stay on the main
+    engine. Without a tenant this is the stock Flask-SQLAlchemy session."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            tenant = g.get("tenant")
+            if tenant is not None and not (
+                mapper is not None and inspect(mapper).local_table.info.get("directory")
+            ):
+                return current_app.extensions["tenancy"].get(tenant)
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+
+def init_migrate(app) -> None:
+    """Attach Flask-Migrate. It imports all of Alembic, so only CLI runs
+    (and scripts that drive migrations) pay for it; web workers never do."""
+    if "migrate" not in app.extensions:
+        from flask_migrate import Migrate
+        # absolute, so `flask db ...` works from any working directory
+        Migrate(app, db, directory=os.path.join(os.path.dirname(__file__), "migrations"))
+
+
+def init_sqlite(app, engine=None) -> None:
+    """Per-connection pragmas for SQLite engines (no-op for other databases).
+    Defaults to the app's own engine; backend/asgi.py passes its async
+    engine's sync_engine."""
+    if engine is None:
+        with app.app_context():
+            engine = db.engine
+    if engine.dialect.name != "sqlite":
+        return
+    wal = app.config.get("SQLITE_WAL", False)
+    busy_ms = int(app.config.get("SQLITE_BUSY_TIMEOUT_MS", 5000))
+
+    @event.listens_for(engine, "connect")
+    def _pragmas(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        cur.execute(f"PRAGMA busy_timeout = {busy_ms}")
+        if wal:
+            cur.execute("PRAGMA journal_mode = WAL")
+            cur.execute("PRAGMA synchronous = NORMAL")
+        cur.close()
+
+    if app.config.get("QUERY_PLAN_CAPTURE"):
+        from .maintenance import capture_queries
+        capture_queries(app, engine)
+
+
+def dispose_engines(app) -> None:
+    """Drop pooled connections inherited across fork(). close=False leaves
+    the parent's sockets/file handles alone; the child just opens new ones."""
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    if "tenancy" in app.extensions:
+        app.extensions["tenancy"].dispose(close=False)
@@ -0,0 +1,244 @@
+# backend/forecast.py
+from __future__ import annotations
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
+from flask import Blueprint, jsonify, request
+from sqlalchemy import text
+from .extensions import db
+from .jobs import JobFailed, accepted, enqueue, job
+from .models import Project, Category
+from .projects import _ACTUAL_SQL, _PLANNED_SQL, _actual_sql, _planned_sql
+from .auth import require_auth
+from .tenancy import current_tenant
+
+if TYPE_CHECKING:  # numpy is imported on first forecast, not at app startup
+    import numpy as np
+
+bp = Blueprint("forecast", __name__, url_prefix="/api/projects")
+
+DEFAULT_SIMULATIONS = 10000
+MAX_SIMULATIONS = 100000
+# categories with fewer historical ratios than this borrow the pooled ratios
+MIN_CATEGORY_SAMPLES = 3
+PERCENTILES = (50, 80, 95)
+
+_CACHE_MAX = 256
+_cache: "OrderedDict[tuple, dict]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+# --- data loading ---
+# completed projects other than :pid, whose actual/planned ratios feed the draws
+_HISTORY = "project_id IN (SELECT id FROM projects WHERE status = 'completed' AND deleted_at IS NULL AND id != :pid)"
+_HIST_PLANNED_SQL = text(_planned_sql(f"pc.{_HISTORY}"))
+_HIST_ACTUAL_SQL = text(_actual_sql(f"e.{_HISTORY}"))
+
+# one round trip that changes whenever the project's expenses, lines,
+# category base costs or BOM are touched
+_FINGERPRINT_SQL = text(
+    """
+    SELECT
+      (SELECT COUNT(*) || ':' || COALESCE(MAX(e.updated_at), '')
+         FROM expenses e WHERE e.project_id = :pid) AS expenses_fp,
+      (SELECT COUNT(*) || ':' || COALESCE(MAX(el.updated_at), '') || ':' || COALESCE(SUM(el.line_total_cents), 0)
+         FROM expense_lines el JOIN expenses e ON e.id = el.expense_id
+        WHERE e.project_id = :pid) AS lines_fp,
+      (SELECT COUNT(*) || ':' || COALESCE(MAX(pc.updated_at), '') || ':' || COALESCE(SUM(pc.base_cost_cents), 0)
+         FROM project_categories pc WHERE pc.project_id = :pid) AS categories_fp,
+      (SELECT COUNT(*) || ':' || COALESCE(MAX(b.updated_at), '')
+         FROM project_components b WHERE b.project_id = :pid) AS bom_fp
+"""
+)
+
+
+def _fingerprint(pid: int) -> tuple:
+    row = db.session.execute(_FINGERPRINT_SQL, {"pid": pid}).one()
+    return tuple(row)
+
+
+def _historical_ratios(pid: int) -> dict[int, list[float]]:
+    """actual/planned per category across completed projects (planned > 0 only)."""
+    planned = {
+        (r["project_id"], r["category_id"]): r["planned_cents"] / 100
+        for r in db.session.execute(_HIST_PLANNED_SQL, {"pid": pid}).mappings()
+    }
+    actual = {
+        (r["project_id"], r["category_id"]): r["actual_cents"] / 100
+        for r in db.session.execute(_HIST_ACTUAL_SQL, {"pid": pid}).mappings()
+    }
+    ratios: dict[int, list[float]] = {}
+    for (proj_id, cid), p_val in planned.items():
+        if p_val <= 0:
+            continue
+        ratios.setdefault(cid, []).append(actual.get((proj_id, cid), 0.0) / p_val)
+    return ratios
+
+
+# --- simulation ---
+def simulate(
+    planned: np.ndarray,
+    actual: np.ndarray,
+    ratio_pools: list[np.ndarray],
+    n: int,
+    seed: int | None,
+) -> np.ndarray:
+    """Return an (n, C) matrix of simulated final costs per category.
+
+    Each category's final cost is its planned cost times a ratio drawn from
+    that category's historical actual/planned ratios, floored at what has
+    already been spent.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    n_cat = planned.shape[0]
+    if n_cat == 0:
+        return np.zeros((n, 0))
+    ratios = np.empty((n, n_cat))
+    for j, pool in enumerate(ratio_pools):
+        # bootstrap: draw indices for the whole column in one call
+        ratios[:, j] = pool[rng.integers(0, pool.shape[0], size=n)]
+    return np.maximum(ratios * planned, actual)
+
+
+def _forecast(pid: int, n: int, seed: int | None) -> dict:
+    import numpy as np
+
+    planned_map = {
+        r["category_id"]: r["planned_cents"] / 100
+        for r in db.session.execute(_PLANNED_SQL, {"pids": [pid]}).mappings()
+    }
+    actual_map = {
+        r["category_id"]: r["actual_cents"] / 100
+        for r in db.session.execute(_ACTUAL_SQL, {"pids": [pid]}).mappings()
+    }
+    cat_ids = sorted({*planned_map.keys(), *actual_map.keys()})
+    names = (
+        {c.id: c.name for c in Category.query.filter(Category.id.in_(cat_ids)).all()}
+        if cat_ids
+        else {}
+    )
+
+    hist = _historical_ratios(pid)
+    pooled = np.array([r for rs in hist.values() for r in rs], dtype=float)
+    if pooled.size == 0:
+        pooled = np.array([1.0])
+
+    pools, sample_counts = [], []
+    for cid in cat_ids:
+        own = hist.get(cid, [])
+        sample_counts.append(len(own))
+        pools.append(np.array(own, dtype=float) if len(own) >= MIN_CATEGORY_SAMPLES else pooled)
+
+    planned = np.array([planned_map.get(cid, 0.0) for cid in cat_ids], dtype=float)
+    actual = np.array([actual_map.get(cid, 0.0) for cid in cat_ids], dtype=float)
+    outcomes = simulate(planned, actual, pools, n, seed)
+    totals = outcomes.sum(axis=1)
+
+    total_pcts = np.percentile(totals, PERCENTILES) if n else np.zeros(len(PERCENTILES))
+    cat_pcts = (
+        np.percentile(outcomes, PERCENTILES, axis=0)
+        if cat_ids
+        else np.zeros((len(PERCENTILES), 0))
+    )
+
+    per_category = []
+    for j, cid in enumerate(cat_ids):
+        item = {
+            "category_id": cid,
+            "category_name": names.get(cid),
+            "planned_usd": float(planned[j]),
+            "actual_usd": float(actual[j]),
+            "historical_samples": sample_counts[j],
+        }
+        for k, pct in enumerate(PERCENTILES):
+            item[f"p{pct}_usd"] = round(float(cat_pcts[k, j]), 2)
+        per_category.append(item)
+
+    result = {
+        "project_id": pid,
+        "simulations": n,
+        "seed": seed,
+        "planned_total_usd": float(planned.sum()),
+        "actual_to_date_usd": float(actual.sum()),
+        "mean_usd": round(float(totals.mean()), 2) if n else 0.0,
+        "per_category": per_category,
+        "computed_at": datetime.now(timezone.utc).isoformat(),
+    }
+    for k, pct in enumerate(PERCENTILES):
+        result[f"p{pct}_usd"] = round(float(total_pcts[k]), 2)
+    return result
+
+
+# --- routes ---
+@bp.get("/<int:pid>/forecast")
+@require_auth
+def project_forecast(pid: int):
+    """Monte Carlo final-cost forecast (P50/P80/P95).
+    Query params:
+      - n: number of simulations (default 10000, max 100000)
+      - seed: integer seed for reproducible results
+    """
+    p = Project.query.get(pid)
+    if not p or p.deleted_at is not None:
+        return jsonify(error="not found"), 404
+
+    n = request.args.get("n", DEFAULT_SIMULATIONS, type=int)
+    if n < 1 or n > MAX_SIMULATIONS:
+        return jsonify(error=f"n must be between 1 and {MAX_SIMULATIONS}"), 400
+    seed = request.args.get("seed", type=int)
+
+    if seed is None:
+        # an unseeded run is a fresh draw each time; caching it would repeat one
+        return jsonify({**_forecast(pid, n, seed), "cached": False})
+    key = (current_tenant(), pid, n, seed, _fingerprint(pid))
+    with _cache_lock:
+        hit = _cache.get(key)
+        if hit is not None:
+            _cache.move_to_end(key)
+    if hit is not None:
+        return jsonify({**hit, "cached": True})
+
+    result = _forecast(pid, n, seed)
+    with _cache_lock:
+        _cache[key] = result
+        while len(_cache) > _CACHE_MAX:
+            _cache.popitem(last=False)
+    return jsonify({**result, "cached": False})
+
+
+@bp.post("/<int:pid>/forecast")
+@require_auth
+def queue_forecast(pid: int):
+    """Same forecast as a background job: 202 with the job; its `result` is
+    the forecast. JSON body: {n, seed}. Seeded requests for the same n and
+    seed while the project's data is unchanged share one job."""
+    p = Project.query.get(pid)
+    if not p or p.deleted_at is not None:
+        return jsonify(error="not found"), 404
+    data = request.get_json(silent=True) or {}
+    n = data.get("n", DEFAULT_SIMULATIONS)
+    if isinstance(n, bool) or not isinstance(n, int) or n < 1 or n > MAX_SIMULATIONS:
+        return jsonify(error=f"n must be between 1 and {MAX_SIMULATIONS}"), 400
+    seed = data.get("seed")
+    if seed is not None and (isinstance(seed, bool) or not isinstance(seed, int)):
+        return jsonify(error="seed must be an integer"), 400
+    key = None
+    if seed is not None:
+        # like the GET cache: only a seeded run is worth sharing
+        fp = hashlib.sha1(repr(_fingerprint(pid)).encode()).hexdigest()[:16]
+        key = f"forecast:{pid}:{n}:{seed}:{fp}"
+    j, _created = enqueue("forecast", {"project_id": pid, "n": n, "seed": seed}, key=key)
+    return accepted(j)
+
+
+@job("forecast")
+def _forecast_job(payload: dict) -> dict:
+    pid = payload["project_id"]
+    p = db.session.get(Project, pid)
+    if not p or p.deleted_at is not None:
+        raise JobFailed(f"project {pid} not found")
+    return _forecast(pid, payload["n"], payload["seed"])
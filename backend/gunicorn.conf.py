@@ -0,0 +1,65 @@
+# backend/gunicorn.conf.py
+"""gunicorn settings for the API.
+
+    gunicorn -c backend/gunicorn.conf.py backend.wsgi:app
+
+Knobs (environment):
+  GUNICORN_BIND          default 127.0.0.1:5001
+  GUNICORN_WORKERS       default 2 x CPUs + 1
+  GUNICORN_WORKER_CLASS  sync | gthread | gevent   (default gthread)
+  GUNICORN_THREADS       threads per gthread worker (default 4)
+  GUNICORN_CONNECTIONS   greenlets per gevent worker (default 200)
+  GUNICORN_PRELOAD       1/0, default 1 (forced off for gevent, see below)
+  GUNICORN_TIMEOUT       default 60; SSE streams send a heartbeat every 15 s
+  GUNICORN_ACCESSLOG     default "-" (stdout); empty disables it
+"""
+import gc
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", "127.0.0.1:5001")
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+# an open /events stream holds a thread for its whole life: with gthread a
+# few idle SSE clients fill a worker, so deployments with live events run
+# gevent here (or serve /events through backend/asgi.py)
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+worker_connections = int(os.getenv("GUNICORN_CONNECTIONS", "200"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+# recycle workers now and then so slow leaks never accumulate
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "5000"))
+max_requests_jitter = max_requests // 10
+
+# gevent has to patch the stdlib before the app is imported; a preloaded
+# master imports it unpatched, so gevent workers load the app themselves
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1" and worker_class != "gevent"
+
+# "-" is stdout; an empty value turns the access log off
+accesslog = os.getenv("GUNICORN_ACCESSLOG", "-") or None
+errorlog = "-"
+
+
+def when_ready(server):
+    server.log.info(
+        "workers=%s class=%s threads=%s preload=%s", workers, worker_class, threads, preload_app
+    )
+
+
+def pre_fork(server, worker):
+    # keep the preloaded heap out of the cyclic GC so collections in a
+    # worker do not touch (and un-share) the master's pages
+    if preload_app:
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    if not preload_app:
+        return
+    from backend.extensions import dispose_engines
+    from backend.wsgi import app
+
+    # a pooled connection opened in the master must never be used by two
+    # processes; workers start with an empty pool
+    dispose_engines(app)
@@ -0,0 +1,477 @@
+# backend/jobs.py
+"""Durable background jobs in a local SQLite file; no broker to run.
+
+Endpoints enqueue work that does not have to finish inside the request and
+answer 202 with the job; `flask jobs work` processes run it:
+
+  flask jobs work [--burst] [--kind forecast]   # one job at a time; start more for concurrency
+  flask jobs enqueue maintenance.run [--payload '{}'] [--priority 5] [--key K] [--delay 60]
+  flask jobs status                             # counts per kind and state
+  flask jobs retry 42
+  flask jobs prune [--days 7]                   # workers also prune hourly
+
+  GET    /api/jobs?state=&kind=&limit=
+  GET    /api/jobs/<id>       state, attempts, last_error, result
+  DELETE /api/jobs/<id>       cancel a job that has not started
+
+The queue lives in JOBS_DB, next to the event log (backend/events.py) rather
+than in the main database: workers polling and claiming jobs never take the
+main database's write lock, and one queue serves every tenant (each job
+records the tenant it was enqueued for and runs against that database).
+
+A worker claims the ready job with the highest priority (then the oldest)
+in one UPDATE ... RETURNING, so several workers never run the same job, and
+holds it for JOBS_LEASE_SECONDS; a job whose worker died is queued again
+once the lease runs out. A failing job is retried with exponential backoff
+(JOBS_BACKOFF_SECONDS, doubling) up to JOBS_MAX_ATTEMPTS attempts, unless
+it raises JobFailed. Handlers must therefore be idempotent. An idempotency
+key makes enqueueing idempotent too: the same key (per tenant) returns the
+existing job instead of a new one.
+
+Handlers register by kind and run in an app context with their own session:
+
+    @job("schedule.rebuild")
+    def _rebuild_job(payload: dict):
+        ...
+        return {"updated": n}     # stored as the job's result (JSON)
+"""
+from __future__ import annotations
+import json
+import os
+import random
+import signal
+import socket
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+import click
+from flask import Blueprint, current_app, g, jsonify, request
+from .auth import require_auth
+from .extensions import db
+from .tenancy import current_tenant
+
+bp = Blueprint("jobs", __name__, url_prefix="/api/jobs")
+
+STATES = ("queued", "running", "done", "failed", "cancelled")
+MAX_BACKOFF_SECONDS = 3600
+DEFAULT_LIST = 50
+MAX_LIST = 200
+ERROR_MAX_CHARS = 2000
+
+
+class JobFailed(Exception):
+    """Raise from a handler to fail the job without retrying it."""
+
+
+HANDLERS: dict[str, object] = {}
+
+
+def job(kind: str):
+    """Register `fn(payload) -> result` as the handler for `kind`."""
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+# --- queue ---
+class JobQueue:
+    """The jobs table in its own SQLite file (WAL). `locked_by` keeps the
+    worker that last ran a job; `locked_until` is only set while it runs."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        # per thread and per process: a connection must not cross fork()
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " tenant TEXT NOT NULL DEFAULT '',"
+                " kind TEXT NOT NULL,"
+                " payload TEXT NOT NULL,"
+                " priority INTEGER NOT NULL DEFAULT 0,"
+                " idempotency_key TEXT,"
+                " state TEXT NOT NULL DEFAULT 'queued',"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " max_attempts INTEGER NOT NULL,"
+                " run_at REAL NOT NULL,"
+                " locked_by TEXT,"
+                " locked_until REAL,"
+                " last_error TEXT,"
+                " result TEXT,"
+                " created_by INTEGER,"
+                " created_at REAL NOT NULL,"
+                " started_at REAL,"
+                " finished_at REAL);"
+                "CREATE UNIQUE INDEX IF NOT EXISTS ux_jobs_key ON jobs (tenant, idempotency_key)"
+                " WHERE idempotency_key IS NOT NULL;"
+                "CREATE INDEX IF NOT EXISTS ix_jobs_ready ON jobs (priority DESC, run_at, id)"
+                " WHERE state = 'queued';"
+                "CREATE INDEX IF NOT EXISTS ix_jobs_lease ON jobs (locked_until) WHERE state = 'running';"
+                "CREATE INDEX IF NOT EXISTS ix_jobs_tenant ON jobs (tenant, id);"
+            )
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def enqueue(self, kind: str, payload: dict, *, tenant: str = "", priority: int = 0,
+                key: str | None = None, delay: float = 0.0, max_attempts: int = 5,
+                created_by: int | None = None) -> tuple[dict, bool]:
+        """(job, created). With `key`, an existing job under the same key is
+        returned as is, or queued again if it had failed or been cancelled."""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if key is not None:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE tenant = ? AND idempotency_key = ?", (tenant, key)
+                ).fetchone()
+                if row is not None:
+                    if row["state"] in ("failed", "cancelled"):
+                        row = conn.execute(
+                            "UPDATE jobs SET state = 'queued', attempts = 0, run_at = ?, last_error = NULL,"
+                            " result = NULL, finished_at = NULL WHERE id = ? RETURNING *",
+                            (now + delay, row["id"]),
+                        ).fetchall()[0]
+                    conn.execute("COMMIT")
+                    return dict(row), False
+            row = conn.execute(
+                "INSERT INTO jobs (tenant, kind, payload, priority, idempotency_key, max_attempts,"
+                " run_at, created_by, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) RETURNING *",
+                (tenant, kind, json.dumps(payload), priority, key, max_attempts, now + delay, created_by, now),
+            ).fetchall()[0]
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return dict(row), True
+
+    def get(self, job_id: int, tenant: str | None = None) -> dict | None:
+        q, args = "SELECT * FROM jobs WHERE id = ?", [job_id]
+        if tenant is not None:
+            q, args = q + " AND tenant = ?", args + [tenant]
+        row = self._conn().execute(q, args).fetchone()
+        return dict(row) if row else None
+
+    def recent(self, tenant: str, state: str | None = None, kind: str | None = None, limit: int = DEFAULT_LIST) -> list[dict]:
+        q, args = "SELECT * FROM jobs WHERE tenant = ?", [tenant]
+        if state:
+            q, args = q + " AND state = ?", args + [state]
+        if kind:
+            q, args = q + " AND kind = ?", args + [kind]
+        rows = self._conn().execute(q + " ORDER BY id DESC LIMIT ?", args + [limit]).fetchall()
+        return [dict(r) for r in rows]
+
+    def claim(self, worker: str, lease: float, kinds=()) -> dict | None:
+        """Take the next ready job, or None. One statement, so two workers
+        can never take the same row."""
+        now = time.time()
+        where, args = "state = 'queued' AND run_at <= ?", [now]
+        if kinds:
+            where += f" AND kind IN ({', '.join('?' * len(kinds))})"
+            args += list(kinds)
+        conn = self._conn()
+        # an idle poll stays a read; only a ready job takes the write lock
+        if conn.execute(f"SELECT 1 FROM jobs WHERE {where} LIMIT 1", args).fetchone() is None:
+            return None
+        rows = conn.execute(
+            "UPDATE jobs SET state = 'running', attempts = attempts + 1, locked_by = ?, locked_until = ?,"
+            " started_at = ? WHERE id = (SELECT id FROM jobs WHERE " + where +
+            " ORDER BY priority DESC, run_at, id LIMIT 1) RETURNING *",
+            [worker, now + lease, now] + args,
+        ).fetchall()
+        return dict(rows[0]) if rows else None
+
+    def finish(self, job: dict, worker: str, result=None) -> None:
+        self._conn().execute(
+            "UPDATE jobs SET state = 'done', result = ?, finished_at = ?, locked_until = NULL"
+            " WHERE id = ? AND locked_by = ?",
+            (json.dumps(result), time.time(), job["id"], worker),
+        )
+
+    def fail(self, job: dict, worker: str, error: str, retry_in: float | None) -> None:
+        """Back to the queue in `retry_in` seconds, or failed for good (None)."""
+        now = time.time()
+        if retry_in is None:
+            sql = "state = 'failed', finished_at = ?"
+            args = [now]
+        else:
+            sql = "state = 'queued', run_at = ?"
+            args = [now + retry_in]
+        self._conn().execute(
+            f"UPDATE jobs SET {sql}, last_error = ?, locked_until = NULL"
+            " WHERE id = ? AND locked_by = ?",
+            args + [error[:ERROR_MAX_CHARS], job["id"], worker],
+        )
+
+    def reclaim_expired(self) -> int:
+        """Requeue (or fail, when out of attempts) jobs whose lease ran out."""
+        now = time.time()
+        return self._conn().execute(
+            "UPDATE jobs SET state = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END,"
+            " finished_at = CASE WHEN attempts >= max_attempts THEN ? END,"
+            " last_error = 'lease expired: worker stopped or job ran past JOBS_LEASE_SECONDS',"
+            " run_at = ?, locked_by = NULL, locked_until = NULL"
+            " WHERE state = 'running' AND locked_until < ?",
+            (now, now, now),
+        ).rowcount
+
+    def cancel(self, job_id: int, tenant: str) -> bool:
+        return self._conn().execute(
+            "UPDATE jobs SET state = 'cancelled', finished_at = ? WHERE id = ? AND tenant = ? AND state = 'queued'",
+            (time.time(), job_id, tenant),
+        ).rowcount == 1
+
+    def retry(self, job_id: int) -> bool:
+        return self._conn().execute(
+            "UPDATE jobs SET state = 'queued', attempts = 0, run_at = ?, last_error = NULL, finished_at = NULL"
+            " WHERE id = ? AND state IN ('failed', 'cancelled')",
+            (time.time(), job_id),
+        ).rowcount == 1
+
+    def prune(self, older_than: float) -> int:
+        return self._conn().execute(
+            "DELETE FROM jobs WHERE state IN ('done', 'failed', 'cancelled') AND finished_at < ?",
+            (older_than,),
+        ).rowcount
+
+    def counts(self) -> list[tuple[str, str, int]]:
+        return [tuple(r) for r in self._conn().execute(
+            "SELECT kind, state, count(*) FROM jobs GROUP BY kind, state ORDER BY kind, state"
+        )]
+
+
+def init_jobs(app) -> None:
+    app.extensions["jobs"] = JobQueue(app.config["JOBS_DB"])
+
+
+def _queue() -> JobQueue:
+    return current_app.extensions["jobs"]
+
+
+def enqueue(kind: str, payload: dict | None = None, *, priority: int = 0, key: str | None = None,
+            delay: float = 0.0) -> tuple[dict, bool]:
+    """Queue `kind` for the current tenant (and user, inside a request)."""
+    if kind not in HANDLERS:
+        raise LookupError(f"no job handler for {kind!r}")
+    return _queue().enqueue(
+        kind, payload or {}, tenant=current_tenant() or "", priority=priority, key=key, delay=delay,
+        max_attempts=current_app.config.get("JOBS_MAX_ATTEMPTS", 5), created_by=g.get("user_id"),
+    )
+
+
+def _iso(ts: float | None) -> str | None:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat() if ts is not None else None
+
+
+def job_json(j: dict) -> dict:
+    return {
+        "id": j["id"],
+        "kind": j["kind"],
+        "state": j["state"],
+        "priority": j["priority"],
+        "payload": json.loads(j["payload"]),
+        "attempts": j["attempts"],
+        "max_attempts": j["max_attempts"],
+        "run_at": _iso(j["run_at"]),
+        "created_at": _iso(j["created_at"]),
+        "started_at": _iso(j["started_at"]),
+        "finished_at": _iso(j["finished_at"]),
+        "last_error": j["last_error"],
+        "result": json.loads(j["result"]) if j["result"] is not None else None,
+    }
+
+
+def accepted(j: dict):
+    """202 response for an endpoint that handed its work to a job."""
+    resp = jsonify({"job": job_json(j)})
+    resp.status_code = 202
+    resp.headers["Location"] = f"/api/jobs/{j['id']}"
+    return resp
+
+
+# --- worker ---
+def backoff(attempts: int, base: float) -> float:
+    """Seconds before attempt `attempts + 1`: base, 2x base, 4x base, ...
+    capped, with +-20% jitter so retries of a burst do not line up."""
+    delay = min(MAX_BACKOFF_SECONDS, base * 2 ** max(0, attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def run_job(app, queue: JobQueue, j: dict, worker: str) -> str:
+    """Run one claimed job to completion; returns its new state."""
+    handler = HANDLERS.get(j["kind"])
+    if handler is None:
+        queue.fail(j, worker, f"no handler for {j['kind']!r} in this worker", None)
+        return "failed"
+    db.session.remove()
+    if j["tenant"]:
+        g.tenant = j["tenant"]
+    try:
+        result = handler(json.loads(j["payload"]))
+        db.session.commit()
+    except JobFailed as e:
+        db.session.rollback()
+        queue.fail(j, worker, str(e) or "failed", None)
+        return "failed"
+    except Exception as e:  # noqa: BLE001 - any error is a failed attempt
+        db.session.rollback()
+        app.logger.exception("job %s (%s) failed", j["id"], j["kind"])
+        if j["attempts"] >= j["max_attempts"]:
+            queue.fail(j, worker, repr(e), None)
+            return "failed"
+        queue.fail(j, worker, repr(e), backoff(j["attempts"], app.config.get("JOBS_BACKOFF_SECONDS", 10)))
+        return "queued"
+    finally:
+        g.pop("tenant", None)
+        db.session.remove()
+    queue.finish(j, worker, result)
+    return "done"
+
+
+def work(app, *, burst: bool = False, kinds=(), max_jobs: int | None = None, echo=None,
+         should_stop=lambda: False) -> int:
+    """Claim and run jobs until stopped (or, with `burst`, until none is
+    ready). Returns the number of jobs run."""
+    queue = app.extensions["jobs"]
+    cfg = app.config
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    poll, lease = cfg.get("JOBS_POLL_SECONDS", 1.0), cfg.get("JOBS_LEASE_SECONDS", 600)
+    done, last_reclaim, last_prune = 0, 0.0, 0.0
+    while not should_stop() and (max_jobs is None or done < max_jobs):
+        if time.monotonic() - last_reclaim > min(lease, 30):
+            queue.reclaim_expired()
+            last_reclaim = time.monotonic()
+        if time.monotonic() - last_prune > 3600:
+            queue.prune(time.time() - cfg.get("JOBS_RETENTION_DAYS", 7) * 86400)
+            last_prune = time.monotonic()
+        j = queue.claim(worker, lease, kinds)
+        if j is None:
+            if burst:
+                break
+            time.sleep(poll)
+            continue
+        t0 = time.perf_counter()
+        state = run_job(app, queue, j, worker)
+        done += 1
+        if echo:
+            echo(f"job {j['id']} {j['kind']} attempt {j['attempts']}: {state} in {time.perf_counter() - t0:.2f}s")
+    return done
+
+
+# --- routes ---
+@bp.get("")
+@require_auth
+def list_jobs():
+    state = request.args.get("state")
+    if state and state not in STATES:
+        return jsonify(error=f"state must be one of {', '.join(STATES)}"), 400
+    limit = max(1, min(request.args.get("limit", DEFAULT_LIST, type=int), MAX_LIST))
+    jobs = _queue().recent(current_tenant() or "", state, request.args.get("kind"), limit)
+    return jsonify({"jobs": [job_json(j) for j in jobs]})
+
+
+@bp.get("/<int:job_id>")
+@require_auth
+def get_job(job_id: int):
+    j = _queue().get(job_id, current_tenant() or "")
+    if j is None:
+        return jsonify(error="not found"), 404
+    return jsonify(job_json(j))
+
+
+@bp.delete("/<int:job_id>")
+@require_auth
+def cancel_job(job_id: int):
+    queue = _queue()
+    if queue.cancel(job_id, current_tenant() or ""):
+        return ("", 204)
+    j = queue.get(job_id, current_tenant() or "")
+    if j is None:
+        return jsonify(error="not found"), 404
+    return jsonify(error=f"job is {j['state']}; only queued jobs can be cancelled"), 409
+
+
+# --- CLI ---
+def run_every(every: float, step, name: str, retry_on: type[Exception] = Exception) -> None:
+    """`step()` once (errors propagate), or with `every` > 0 every that many
+    seconds as a sidecar: a `retry_on` failure is reported and the step runs
+    again next time, leaving whatever the last good run produced in place."""
+    while True:
+        t0 = time.perf_counter()
+        try:
+            step()
+        except retry_on as e:
+            if not every:
+                raise
+            db.session.rollback()
+            click.echo(f"{name} failed: {e!r}", err=True)
+        if not every:
+            return
+        time.sleep(max(0.0, every - (time.perf_counter() - t0)))
+
+
+@bp.cli.command("work")
+@click.option("--burst", is_flag=True, help="Exit once no job is ready (cron, tests).")
+@click.option("--kind", "kinds", multiple=True, help="Only run these kinds (repeatable).")
+@click.option("--max-jobs", type=int, default=None, help="Exit after this many jobs.")
+def work_cmd(burst, kinds, max_jobs):
+    """Run queued jobs, one at a time. SIGTERM stops after the current job."""
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    unknown = set(kinds) - set(HANDLERS)
+    if unknown:
+        raise click.ClickException(f"unknown job kind(s): {', '.join(sorted(unknown))}")
+    n = work(current_app._get_current_object(), burst=burst, kinds=kinds, max_jobs=max_jobs,
+             echo=click.echo, should_stop=stop.is_set)
+    click.echo(f"worker stopped after {n} job(s)")
+
+
+@bp.cli.command("enqueue")
+@click.argument("kind")
+@click.option("--payload", default="{}", help="JSON object passed to the handler.")
+@click.option("--priority", type=int, default=0, help="Higher runs first.")
+@click.option("--key", default=None, help="Idempotency key.")
+@click.option("--delay", type=float, default=0.0, help="Seconds before the job may run.")
+def enqueue_cmd(kind, payload, priority, key, delay):
+    """Queue a job (cron-friendly: maintenance.run, ...)."""
+    try:
+        data = json.loads(payload)
+        j, created = enqueue(kind, data, priority=priority, key=key, delay=delay)
+    except (ValueError, LookupError) as e:
+        raise click.ClickException(str(e))
+    click.echo(f"job {j['id']} {j['kind']}: {j['state']}" + ("" if created else " (existing)"))
+
+
+@bp.cli.command("status")
+def status():
+    """Job counts per kind and state."""
+    for kind, state, n in _queue().counts():
+        click.echo(f"{kind:24} {state:10} {n:8d}")
+
+
+@bp.cli.command("retry")
+@click.argument("job_id", type=int)
+def retry(job_id):
+    """Queue a failed or cancelled job again, with fresh attempts."""
+    if not _queue().retry(job_id):
+        raise click.ClickException(f"job {job_id} is not failed or cancelled")
+    click.echo(f"job {job_id} queued")
+
+
+@bp.cli.command("prune")
+@click.option("--days", type=int, default=None, help="Keep finished jobs this long (default JOBS_RETENTION_DAYS).")
+def prune(days):
+    """Delete finished jobs older than the retention window."""
+    days = current_app.config.get("JOBS_RETENTION_DAYS", 7) if days is None else days
+    n = _queue().prune(time.time() - days * 86400)
+    click.echo(f"deleted {n} job(s)")
@@ -0,0 +1,526 @@
+# backend/maintenance.py
+"""SQLite upkeep that is safe to run while the API is up.
+
+Nothing in the app runs ANALYZE, so the planner works from missing or stale
+statistics, and rows freed by deletes and archiving stay in the file as
+free pages. `flask maintenance` takes care of both:
+
+  flask maintenance run [--every 3600]   # optimize + incremental vacuum + WAL checkpoint
+  flask maintenance analyze [--limit 0]  # refresh all planner statistics
+  flask maintenance vacuum [--enable-incremental]   # full rewrite, exclusive lock
+  flask maintenance integrity [--full]   # quick_check / integrity_check + foreign keys
+  flask maintenance stats                # size and rows per table and index
+  flask maintenance indexes              # unused and missing indexes, from captured plans
+
+`run` only takes the write lock in short steps: ANALYZE is bounded by
+`PRAGMA analysis_limit` (MAINTENANCE_ANALYSIS_LIMIT rows per index), free
+pages go back in small `incremental_vacuum` batches, and the WAL checkpoint
+is PASSIVE, so it never waits for readers. Schedule it from cron or keep it
+running as a sidecar with `--every` (or queue it for a job worker:
+`flask jobs enqueue maintenance.run`). Incremental vacuum needs
+auto_vacuum=INCREMENTAL, which an existing file only gets from one full
+`vacuum --enable-incremental` (in a maintenance window).
+
+With QUERY_PLAN_CAPTURE=1 every engine records the distinct SELECT / UPDATE /
+DELETE statements it runs, with call counts and one sample of their
+parameters, in QUERY_PLAN_DB. `indexes` re-plans them with EXPLAIN QUERY
+PLAN against the current schema and statistics and reports indexes no
+statement uses, full scans of large tables and sorts an index could have
+served, with the index that would avoid them.
+
+With tenant routing: `flask tenants each maintenance run`.
+"""
+from __future__ import annotations
+import atexit
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+import click
+from flask import Blueprint, current_app
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from .extensions import db
+from .jobs import job, run_every
+
+bp = Blueprint("maintenance", __name__)
+
+DEFAULT_ANALYSIS_LIMIT = 1000
+DEFAULT_VACUUM_PAGES = 2000
+VACUUM_STEP_PAGES = 200
+CAPTURED_VERBS = ("SELECT", "UPDATE", "DELETE", "WITH")
+# `IN (?, ?, ?)` lists differ in length from call to call
+_IN_LIST = re.compile(r"\?(?:, \?)+")
+
+
+# --- query capture ---
+class QueryLog:
+    """Distinct statements this process has run, buffered in memory and
+    merged into QUERY_PLAN_DB every `flush_every` seconds (and at exit)."""
+
+    def __init__(self, path: str, flush_every: float):
+        self.path = path
+        self.flush_every = flush_every
+        self._pending: dict[str, list] = {}
+        self._lock = threading.Lock()
+        self._flushed = time.monotonic()
+        atexit.register(self.flush)
+
+    def attach(self, engine) -> None:
+        event.listen(engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if executemany or not statement.lstrip().upper().startswith(CAPTURED_VERBS):
+            return
+        key = _IN_LIST.sub("?", statement)
+        with self._lock:
+            entry = self._pending.get(key)
+            if entry is None:
+                self._pending[key] = [1, statement, parameters]
+            else:
+                entry[0] += 1
+            due = time.monotonic() - self._flushed >= self.flush_every
+        if due:
+            self.flush()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS captured_queries ("
+            " key TEXT PRIMARY KEY,"
+            " sql TEXT NOT NULL,"
+            " params TEXT NOT NULL,"
+            " calls INTEGER NOT NULL,"
+            " last_seen REAL NOT NULL)"
+        )
+        return conn
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flushed = time.monotonic()
+        if not pending:
+            return
+        rows = [
+            (key, sql, json.dumps(list(params or ()), default=str), calls, time.time())
+            for key, (calls, sql, params) in pending.items()
+        ]
+        try:
+            conn = self._conn()
+            with conn:
+                conn.executemany(
+                    "INSERT INTO captured_queries (key, sql, params, calls, last_seen) VALUES (?, ?, ?, ?, ?)"
+                    " ON CONFLICT (key) DO UPDATE SET sql = excluded.sql, params = excluded.params,"
+                    " calls = calls + excluded.calls, last_seen = excluded.last_seen",
+                    rows,
+                )
+            conn.close()
+        except sqlite3.Error:
+            pass  # capture is best effort; never fail a request over it
+
+    def load(self) -> list[tuple[str, list, int]]:
+        """(sql, params, calls) of everything captured so far."""
+        self.flush()
+        conn = self._conn()
+        try:
+            rows = conn.execute("SELECT sql, params, calls FROM captured_queries ORDER BY calls DESC").fetchall()
+        finally:
+            conn.close()
+        return [(sql, json.loads(params), calls) for sql, params, calls in rows]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pending.clear()
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM captured_queries")
+        conn.close()
+
+
+def query_log(app) -> QueryLog:
+    log = app.extensions.get("query_log")
+    if log is None:
+        log = app.extensions["query_log"] = QueryLog(
+            app.config["QUERY_PLAN_DB"], app.config.get("QUERY_PLAN_FLUSH_SECONDS", 30)
+        )
+    return log
+
+
+def capture_queries(app, engine) -> None:
+    """Called by init_sqlite for every SQLite engine when QUERY_PLAN_CAPTURE is on."""
+    query_log(app).attach(engine)
+
+
+# --- helpers ---
+def _engine():
+    # the session's bind follows tenant routing (`flask tenants each ...`)
+    return db.session.get_bind()
+
+
+def _autocommit():
+    """A connection outside any transaction: VACUUM refuses to run in one,
+    and every PRAGMA below should commit (and release the lock) at once."""
+    engine = _engine()
+    if engine.dialect.name != "sqlite":
+        raise click.ClickException("database maintenance needs a SQLite database")
+    return engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+
+
+def _pragma(conn, name: str):
+    return conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+
+def _has_stats(conn) -> bool:
+    return conn.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+    ).first() is not None
+
+
+def _mb(n_bytes) -> str:
+    return "-" if n_bytes is None else f"{n_bytes / 1e6:.1f} MB"
+
+
+# --- maintenance steps ---
+def analyze(conn, limit: int) -> str:
+    """Refresh planner statistics, reading at most `limit` rows per index
+    (0: all of them). SQLite 3.46+ only re-analyzes tables that changed."""
+    conn.exec_driver_sql(f"PRAGMA analysis_limit = {int(limit)}")
+    if _has_stats(conn) and limit and sqlite3.sqlite_version_info >= (3, 46):
+        # 0x10000: consider every table, not just those this connection used
+        conn.exec_driver_sql("PRAGMA optimize(0x10002)")
+        return "optimize"
+    conn.exec_driver_sql("ANALYZE")
+    return "analyze"
+
+
+def incremental_vacuum(conn, max_pages: int, pause: float = 0.01) -> int:
+    """Return up to `max_pages` free pages to the filesystem, a few hundred
+    per transaction. No-op unless auto_vacuum is INCREMENTAL (2)."""
+    if _pragma(conn, "auto_vacuum") != 2:
+        return 0
+    freed = 0
+    while freed < max_pages:
+        free = _pragma(conn, "freelist_count")
+        step = min(VACUUM_STEP_PAGES, free, max_pages - freed)
+        if step <= 0:
+            break
+        # the pragma frees one page per sqlite3_step() and Python steps a
+        # statement once, so repeat it for the batch inside one transaction
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        try:
+            for _ in range(step):
+                conn.exec_driver_sql("PRAGMA incremental_vacuum(1)")
+            conn.exec_driver_sql("COMMIT")
+        except Exception:
+            conn.exec_driver_sql("ROLLBACK")
+            raise
+        freed += free - _pragma(conn, "freelist_count")
+        time.sleep(pause)
+    return freed
+
+
+def checkpoint(conn) -> tuple[int, int, int] | None:
+    """PASSIVE WAL checkpoint: (busy, wal pages, pages checkpointed), or
+    None in rollback-journal mode."""
+    if str(_pragma(conn, "journal_mode")).lower() != "wal":
+        return None
+    return tuple(conn.exec_driver_sql("PRAGMA wal_checkpoint(PASSIVE)").one())
+
+
+def run_maintenance(analysis_limit: int, vacuum_pages: int) -> list[str]:
+    """One round of the online steps; a line of output per step."""
+    out = []
+    with _autocommit() as conn:
+        t0 = time.perf_counter()
+        how = analyze(conn, analysis_limit)
+        out.append(f"{how}: {time.perf_counter() - t0:.2f}s")
+
+        t0 = time.perf_counter()
+        page_size = _pragma(conn, "page_size")
+        if _pragma(conn, "auto_vacuum") == 2:
+            freed = incremental_vacuum(conn, vacuum_pages)
+            left = _pragma(conn, "freelist_count")
+            out.append(f"incremental vacuum: freed {_mb(freed * page_size)}, {_mb(left * page_size)} still free "
+                       f"({time.perf_counter() - t0:.2f}s)")
+        else:
+            free = _pragma(conn, "freelist_count")
+            out.append(f"incremental vacuum: off, {_mb(free * page_size)} free "
+                       f"(flask maintenance vacuum --enable-incremental)")
+
+        wal = checkpoint(conn)
+        if wal is not None:
+            busy, log, done = wal
+            out.append(f"wal checkpoint: {done}/{log} pages" + (" (readers busy)" if busy else ""))
+    return out
+
+
+@job("maintenance.run")
+def _maintenance_job(payload: dict) -> dict:
+    cfg = current_app.config
+    lines = run_maintenance(
+        payload.get("analysis_limit", cfg.get("MAINTENANCE_ANALYSIS_LIMIT", DEFAULT_ANALYSIS_LIMIT)),
+        payload.get("vacuum_pages", cfg.get("MAINTENANCE_VACUUM_PAGES", DEFAULT_VACUUM_PAGES)),
+    )
+    return {"log": lines}
+
+
+def integrity(conn, full: bool) -> list[str]:
+    """Problems found by quick_check (or integrity_check) and foreign_key_check."""
+    check = "integrity_check" if full else "quick_check"
+    problems = [r[0] for r in conn.exec_driver_sql(f"PRAGMA {check}") if r[0] != "ok"]
+    for table, rowid, parent, _fkid in conn.exec_driver_sql("PRAGMA foreign_key_check"):
+        problems.append(f"{table} row {rowid}: missing {parent} row")
+    return problems
+
+
+def object_stats(conn) -> list[dict]:
+    """Tables and their indexes with size on disk (dbstat, when SQLite was
+    built with it) and row counts (indexes: from sqlite_stat1)."""
+    objects = conn.exec_driver_sql(
+        "SELECT type, name, tbl_name, sql FROM sqlite_master"
+        " WHERE type IN ('table', 'index') AND tbl_name NOT LIKE 'sqlite_%'"
+    ).all()
+    try:
+        sizes = dict(conn.exec_driver_sql("SELECT name, pgsize FROM dbstat WHERE aggregate = TRUE").all())
+    except OperationalError:
+        sizes = None
+    stat_rows = {}
+    if _has_stats(conn):
+        for idx, stat in conn.exec_driver_sql("SELECT idx, stat FROM sqlite_stat1 WHERE idx IS NOT NULL"):
+            stat_rows[idx] = int(stat.split()[0])
+    table_rows = {
+        name: conn.exec_driver_sql(f'SELECT count(*) FROM "{name}"').scalar()
+        for kind, name, _t, _s in objects if kind == "table"
+    }
+    out = []
+    for kind, name, table, sql in objects:
+        partial = kind == "index" and sql is not None and " WHERE " in sql.upper()
+        if kind == "table":
+            rows = table_rows[name]
+        else:
+            rows = stat_rows.get(name, None if partial else table_rows.get(table))
+        out.append({
+            "type": kind, "name": name, "table": table, "rows": rows,
+            "bytes": None if sizes is None else sizes.get(name, 0),
+            "partial": partial, "auto": name.startswith("sqlite_autoindex_"),
+        })
+    return out
+
+
+# --- index advice ---
+_USING_INDEX = re.compile(r"USING (?:COVERING )?INDEX (\w+)")
+_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS (\w+))?$")
+_SEARCH = re.compile(r"^SEARCH (?:TABLE )?(\w+)(?: AS (\w+))? USING (AUTOMATIC )?.*?(?:\((.*)\))?$")
+_CONSTRAINT = re.compile(r"(\w+)([=<>])")
+_ORDER_BY = re.compile(r"ORDER BY (.+?)(?:\s+LIMIT\b|\s+OFFSET\b|\)|$)", re.S)
+
+
+def _referenced(sql: str, alias: str) -> tuple[list[str], list[str], list[str]]:
+    """Columns of `alias` the statement compares with =/IN/IS, with a
+    range operator, and sorts by (the last ORDER BY), in order of appearance."""
+    col = rf"\b{re.escape(alias)}\.(\w+)"
+    eq = re.findall(col + r"\s*(?:=|IN\b|IS\b)", sql)
+    rng = re.findall(col + r"\s*(?:<|>|BETWEEN\b|LIKE\b)", sql)
+    orders = _ORDER_BY.findall(sql)
+    order = re.findall(col, orders[-1]) if orders else []
+    return eq, rng, order
+
+
+def _unique(cols) -> list[str]:
+    return list(dict.fromkeys(cols))
+
+
+def _covers(index_cols: list[str], eq: list[str], rest: list[str]) -> bool:
+    head = index_cols[:len(eq)]
+    return set(head) == set(eq) and index_cols[len(eq):len(eq) + len(rest)] == rest
+
+
+def _index_columns(conn) -> dict[str, tuple[str, list[str], bool]]:
+    """index name -> (table, columns, unique)."""
+    out = {}
+    for (table,) in conn.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+    ):
+        for _seq, name, unique, *_ in conn.exec_driver_sql(f'PRAGMA index_list("{table}")'):
+            cols = [r[2] for r in conn.exec_driver_sql(f'PRAGMA index_info("{name}")')]
+            out[name] = (table, cols, bool(unique))
+    return out
+
+
+def advise_indexes(conn, captured, min_rows: int = 1000) -> dict:
+    """Re-plan captured statements and sum, weighted by calls:
+    `used` index -> calls, `unused` indexes, and `missing` suggestions
+    (table, columns) -> {calls, reasons, sample, existing}. Tables under
+    `min_rows` rows are left out of both lists."""
+    indexes = _index_columns(conn)
+    rows = {
+        name: conn.exec_driver_sql(f'SELECT count(*) FROM "{name}"').scalar()
+        for name in {t for t, _c, _u in indexes.values()}
+    }
+    used: dict[str, int] = defaultdict(int)
+    missing: dict[tuple, dict] = {}
+    planned = failed = 0
+    for sql, params, calls in captured:
+        try:
+            plan = [r[3] for r in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", tuple(params))]
+        except Exception:  # schema changed since capture, or params lost their types
+            failed += 1
+            continue
+        planned += 1
+        sorts = any(d.startswith("USE TEMP B-TREE FOR") and "ORDER BY" in d for d in plan)
+        for detail in plan:
+            for name in _USING_INDEX.findall(detail):
+                used[name] += calls
+            scan, search = _SCAN.match(detail), _SEARCH.match(detail)
+            m = scan or search
+            if m is None or m.group(1) not in rows or rows[m.group(1)] < min_rows:
+                continue
+            table, alias = m.group(1), m.group(2) or m.group(1)
+            eq, rng, order = _referenced(sql, alias)
+            if search:
+                if not (search.group(3) or (sorts and order)):
+                    continue  # an index lookup that needs no sort: fine
+                searched = _CONSTRAINT.findall(search.group(4) or "")
+                eq = [c for c, op in searched if op == "="] + eq
+                reason = "automatic index" if search.group(3) else "sort after index search"
+            else:
+                reason = "full scan"
+            eq = _unique(eq)
+            rest = [c for c in _unique(order if sorts and order else rng[:1]) if c not in eq]
+            cols = tuple(eq + rest)
+            if not cols:
+                continue  # nothing to index on: the statement reads the whole table
+            hit = missing.setdefault((table, cols), {
+                "calls": 0, "reasons": set(), "sample": sql, "rows": rows[table],
+                "existing": next((n for n, (t, c, _u) in indexes.items()
+                                  if t == table and _covers(c, eq, rest)), None),
+            })
+            hit["calls"] += calls
+            hit["reasons"].add(reason)
+    unused = sorted(
+        n for n, (t, _c, unique) in indexes.items()
+        if n not in used and not unique and not n.startswith("sqlite_autoindex_") and rows[t] >= min_rows
+    )
+    return {"planned": planned, "failed": failed, "used": dict(used), "unused": unused, "missing": missing}
+
+
+# --- CLI ---
+@bp.cli.command("run")
+@click.option("--analysis-limit", type=int, default=None,
+              help="Rows ANALYZE reads per index (default MAINTENANCE_ANALYSIS_LIMIT).")
+@click.option("--vacuum-pages", type=int, default=None,
+              help="Free pages to release per run (default MAINTENANCE_VACUUM_PAGES).")
+@click.option("--every", type=float, default=0, help="Keep running every N seconds.")
+def run(analysis_limit, vacuum_pages, every):
+    """Online upkeep: optimize, incremental vacuum, WAL checkpoint."""
+    cfg = current_app.config
+    limit = cfg.get("MAINTENANCE_ANALYSIS_LIMIT", DEFAULT_ANALYSIS_LIMIT) if analysis_limit is None else analysis_limit
+    pages = cfg.get("MAINTENANCE_VACUUM_PAGES", DEFAULT_VACUUM_PAGES) if vacuum_pages is None else vacuum_pages
+
+    def step():
+        for line in run_maintenance(limit, pages):
+            click.echo(line)
+
+    # only lock timeouts (longer than busy_timeout) are worth another try
+    run_every(every, step, "maintenance", retry_on=OperationalError)
+
+
+@bp.cli.command("analyze")
+@click.option("--limit", type=int, default=0, show_default=True, help="Rows per index; 0 reads them all.")
+def analyze_cmd(limit):
+    """Rebuild planner statistics for every table and index."""
+    with _autocommit() as conn:
+        t0 = time.perf_counter()
+        analyze(conn, limit)
+    click.echo(f"analyzed in {time.perf_counter() - t0:.2f}s")
+
+
+@bp.cli.command("vacuum")
+@click.option("--enable-incremental", is_flag=True, help="Switch the file to auto_vacuum=INCREMENTAL first.")
+@click.confirmation_option(prompt="VACUUM rewrites the whole file and blocks every writer until done. Continue?")
+def vacuum(enable_incremental):
+    """Full VACUUM (maintenance window only)."""
+    with _autocommit() as conn:
+        before = _pragma(conn, "page_count") * _pragma(conn, "page_size")
+        if enable_incremental:
+            conn.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+        t0 = time.perf_counter()
+        conn.exec_driver_sql("VACUUM")
+        after = _pragma(conn, "page_count") * _pragma(conn, "page_size")
+        mode = {0: "none", 1: "full", 2: "incremental"}.get(_pragma(conn, "auto_vacuum"))
+    click.echo(f"{_mb(before)} -> {_mb(after)} in {time.perf_counter() - t0:.1f}s, auto_vacuum={mode}")
+
+
+@bp.cli.command("integrity")
+@click.option("--full", is_flag=True, help="integrity_check (also verifies every index) instead of quick_check.")
+def integrity_cmd(full):
+    """Check the file and foreign keys; exit code 1 on any problem.
+    Reads the whole file under one read lock: without WAL, writers wait."""
+    with _autocommit() as conn:
+        problems = integrity(conn, full)
+    for p in problems[:100]:
+        click.echo(p, err=True)
+    if problems:
+        raise click.ClickException(f"{len(problems)} problem(s) found")
+    click.echo("ok")
+
+
+@bp.cli.command("stats")
+def stats():
+    """Size on disk and row count of every table and index."""
+    with _autocommit() as conn:
+        page_size = _pragma(conn, "page_size")
+        pages, free = _pragma(conn, "page_count"), _pragma(conn, "freelist_count")
+        mode = {0: "none", 1: "full", 2: "incremental"}.get(_pragma(conn, "auto_vacuum"))
+        click.echo(f"{conn.engine.url.database}: {_mb(pages * page_size)}, {_mb(free * page_size)} free, "
+                   f"journal={_pragma(conn, 'journal_mode')}, auto_vacuum={mode}, "
+                   f"statistics={'yes' if _has_stats(conn) else 'never analyzed'}")
+        objects = object_stats(conn)
+    if objects and objects[0]["bytes"] is None:
+        click.echo("(sizes need SQLite built with dbstat)")
+    by_table = defaultdict(list)
+    for o in objects:
+        by_table[o["table"]].append(o)
+    order = sorted(by_table, key=lambda t: -sum(o["bytes"] or 0 for o in by_table[t]))
+    click.echo(f"{'name':44} {'rows':>10} {'size':>10}")
+    for table in order:
+        for o in sorted(by_table[table], key=lambda o: (o["type"] != "table", -(o["bytes"] or 0))):
+            label = o["name"] if o["type"] == "table" else "  " + o["name"] + (" (partial)" if o["partial"] else "")
+            rows = "-" if o["rows"] is None else str(o["rows"])
+            click.echo(f"{label:44} {rows:>10} {_mb(o['bytes']):>10}")
+
+
+@bp.cli.command("indexes")
+@click.option("--min-rows", type=int, default=1000, show_default=True, help="Ignore smaller tables.")
+@click.option("--clear", is_flag=True, help="Forget the captured statements afterwards.")
+def indexes(min_rows, clear):
+    """Unused and missing indexes, from the plans of captured statements."""
+    log = query_log(current_app)
+    captured = log.load()
+    if not captured:
+        raise click.ClickException("no captured statements: run the app with QUERY_PLAN_CAPTURE=1 first")
+    with _autocommit() as conn:
+        advice = advise_indexes(conn, captured, min_rows)
+    total = sum(calls for _s, _p, calls in captured)
+    click.echo(f"{advice['planned']} statements ({total} calls) planned"
+               + (f", {advice['failed']} no longer valid" if advice["failed"] else ""))
+
+    click.echo("\nmissing indexes:")
+    missing = sorted(advice["missing"].items(), key=lambda kv: -kv[1]["calls"])
+    for (table, cols), hit in missing:
+        where = f"exists as {hit['existing']}: run flask maintenance analyze" if hit["existing"] else "create"
+        click.echo(f"  {table}({', '.join(cols)})  {hit['calls']} calls, {hit['rows']} rows, "
+                   f"{' / '.join(sorted(hit['reasons']))}; {where}")
+        click.echo(f"      {' '.join(hit['sample'].split())[:160]}")
+    if not missing:
+        click.echo("  none")
+
+    click.echo("\nunused indexes (no captured statement plans with them):")
+    for name in advice["unused"]:
+        click.echo(f"  {name}")
+    if not advice["unused"]:
+        click.echo("  none")
+    if clear:
+        log.clear()
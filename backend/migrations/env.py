@@ -16,6 +16,10 @@ logger = logging.getLogger('alembic.env')
 
 
 def get_engine():
+    # `flask tenants migrate` runs once per tenant with -x tenant=<slug>
+    tenant = context.get_x_argument(as_dictionary=True).get('tenant')
+    if tenant:
+        return current_app.extensions['tenancy'].get(tenant)
     try:
         # this works with Flask-SQLAlchemy<3 and Alchemical
         return current_app.extensions['migrate'].db.get_engine()
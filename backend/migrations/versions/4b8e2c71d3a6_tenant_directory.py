@@ -0,0 +1,48 @@
+"""tenant directory
+
+Revision ID: 4b8e2c71d3a6
+Revises: e61b0f4d9a27
+Create Date: 2026-10-19 13:02:44.518230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b8e2c71d3a6'
+down_revision = 'e61b0f4d9a27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('tenants',
+    sa.Column('slug', sa.String(length=40), nullable=False),
+    sa.Column('name', sa.String(length=160), nullable=False),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('slug')
+    )
+    op.create_table('tenant_members',
+    sa.Column('email', sa.String(length=255), nullable=False),
+    sa.Column('tenant_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('email')
+    )
+    with op.batch_alter_table('tenant_members', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_tenant_members_tenant_id'), ['tenant_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('tenant_members', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_tenant_members_tenant_id'))
+
+    op.drop_table('tenant_members')
+    op.drop_table('tenants')
@@ -0,0 +1,57 @@
+"""add tasks materialized path
+
+Revision ID: 5b1e9d27a4f3
+Revises: c4600ab7c64d
+Create Date: 2026-10-19 10:40:12.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b1e9d27a4f3'
+down_revision = 'c4600ab7c64d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('path', sa.String(length=512), nullable=True))
+        batch_op.create_index(batch_op.f('ix_tasks_path'), ['path'], unique=False)
+
+    # backfill: walk each hierarchy top-down; tasks on a parent cycle become roots
+    # (`flask tasks check-paths` reports them afterwards)
+    conn = op.get_bind()
+    rows = conn.execute(sa.text("SELECT id, parent_task_id FROM tasks")).all()
+    parent_of = {tid: parent for tid, parent in rows}
+    children = {}
+    for tid, parent in parent_of.items():
+        children.setdefault(parent if parent in parent_of else None, []).append(tid)
+    paths = {}
+
+    def walk(root):
+        stack = [(root, "/")]
+        while stack:
+            tid, pre = stack.pop()
+            paths[tid] = pre + f"{tid}/"
+            stack.extend((k, paths[tid]) for k in children.get(tid, ()) if k not in paths)
+
+    for tid in children.get(None, ()):
+        walk(tid)
+    for tid in parent_of:
+        if tid not in paths:
+            walk(tid)
+
+    if paths:
+        conn.execute(
+            sa.text("UPDATE tasks SET path = :path WHERE id = :id"),
+            [{"id": tid, "path": p} for tid, p in paths.items()],
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_tasks_path'))
+        batch_op.drop_column('path')
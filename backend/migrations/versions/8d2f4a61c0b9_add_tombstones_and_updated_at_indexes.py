@@ -0,0 +1,49 @@
+"""add tombstones and updated_at indexes
+
+Revision ID: 8d2f4a61c0b9
+Revises: 5b1e9d27a4f3
+Create Date: 2026-10-19 11:02:47.530118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2f4a61c0b9'
+down_revision = '5b1e9d27a4f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('tombstones',
+    sa.Column('table_name', sa.String(length=40), nullable=False),
+    sa.Column('row_id', sa.Integer(), nullable=False),
+    sa.Column('project_id', sa.Integer(), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('tombstones', schema=None) as batch_op:
+        batch_op.create_index('ix_tombstones_deleted_at', ['deleted_at'], unique=False)
+        batch_op.create_index('ix_tombstones_project_deleted', ['project_id', 'deleted_at'], unique=False)
+
+    # plain CREATE INDEX: no table rebuild needed
+    op.create_index('ix_projects_updated_at', 'projects', ['updated_at'], unique=False)
+    op.create_index('ix_tasks_project_updated', 'tasks', ['project_id', 'updated_at'], unique=False)
+    op.create_index('ix_expenses_project_updated', 'expenses', ['project_id', 'updated_at'], unique=False)
+    op.create_index('ix_expense_lines_updated_at', 'expense_lines', ['updated_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_expense_lines_updated_at', table_name='expense_lines')
+    op.drop_index('ix_expenses_project_updated', table_name='expenses')
+    op.drop_index('ix_tasks_project_updated', table_name='tasks')
+    op.drop_index('ix_projects_updated_at', table_name='projects')
+
+    with op.batch_alter_table('tombstones', schema=None) as batch_op:
+        batch_op.drop_index('ix_tombstones_project_deleted')
+        batch_op.drop_index('ix_tombstones_deleted_at')
+
+    op.drop_table('tombstones')
@@ -0,0 +1,80 @@
+"""task dependencies and schedule columns
+
+Revision ID: 9c3f5a18e6d2
+Revises: 4b8e2c71d3a6
+Create Date: 2026-10-19 14:21:37.306118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c3f5a18e6d2'
+down_revision = '4b8e2c71d3a6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # existing tasks have no dependencies yet, so the server defaults
+    # (1 day long, starting on day 0) are already a consistent schedule
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('duration_days', sa.Integer(), server_default='1', nullable=False))
+        batch_op.add_column(sa.Column('early_start_days', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('tail_days', sa.Integer(), server_default='1', nullable=False))
+
+    with op.batch_alter_table('archive_tasks', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('duration_days', sa.Integer(), autoincrement=False, nullable=True))
+        batch_op.add_column(sa.Column('early_start_days', sa.Integer(), autoincrement=False, nullable=True))
+        batch_op.add_column(sa.Column('tail_days', sa.Integer(), autoincrement=False, nullable=True))
+
+    op.create_table('task_dependencies',
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.Column('predecessor_id', sa.Integer(), nullable=False),
+    sa.Column('successor_id', sa.Integer(), nullable=False),
+    sa.Column('lag_days', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['predecessor_id'], ['tasks.id'], ),
+    sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ),
+    sa.ForeignKeyConstraint(['successor_id'], ['tasks.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('predecessor_id', 'successor_id', name='uq_task_dependencies_pair')
+    )
+    with op.batch_alter_table('task_dependencies', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_task_dependencies_project_id'), ['project_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_task_dependencies_successor_id'), ['successor_id'], unique=False)
+
+    op.create_table('archive_task_dependencies',
+    sa.Column('project_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('predecessor_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('successor_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('lag_days', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('created_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.Column('root_table', sa.String(length=20), nullable=False),
+    sa.Column('root_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_archive_task_dependencies_root', 'archive_task_dependencies', ['root_table', 'root_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_archive_task_dependencies_root', table_name='archive_task_dependencies')
+    op.drop_table('archive_task_dependencies')
+    with op.batch_alter_table('task_dependencies', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_task_dependencies_successor_id'))
+        batch_op.drop_index(batch_op.f('ix_task_dependencies_project_id'))
+
+    op.drop_table('task_dependencies')
+    with op.batch_alter_table('archive_tasks', schema=None) as batch_op:
+        batch_op.drop_column('tail_days')
+        batch_op.drop_column('early_start_days')
+        batch_op.drop_column('duration_days')
+
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.drop_column('tail_days')
+        batch_op.drop_column('early_start_days')
+        batch_op.drop_column('duration_days')
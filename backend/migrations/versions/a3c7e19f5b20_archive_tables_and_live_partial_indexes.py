@@ -0,0 +1,219 @@
+"""archive tables and live-row partial indexes
+
+Revision ID: a3c7e19f5b20
+Revises: 8d2f4a61c0b9
+Create Date: 2026-10-19 11:48:12.904417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c7e19f5b20'
+down_revision = '8d2f4a61c0b9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('archive_clients',
+    sa.Column('name', sa.String(length=200), autoincrement=False, nullable=True),
+    sa.Column('contact_name', sa.String(length=120), autoincrement=False, nullable=True),
+    sa.Column('email', sa.String(length=255), autoincrement=False, nullable=True),
+    sa.Column('phone', sa.String(length=50), autoincrement=False, nullable=True),
+    sa.Column('address', sa.Text(), autoincrement=False, nullable=True),
+    sa.Column('notes', sa.Text(), autoincrement=False, nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('created_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('updated_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('deleted_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.Column('root_table', sa.String(length=20), nullable=False),
+    sa.Column('root_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_archive_clients_root', 'archive_clients', ['root_table', 'root_id'], unique=False)
+    op.create_table('archive_categories',
+    sa.Column('name', sa.String(length=120), autoincrement=False, nullable=True),
+    sa.Column('description', sa.Text(), autoincrement=False, nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('created_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('updated_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('deleted_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.Column('root_table', sa.String(length=20), nullable=False),
+    sa.Column('root_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_archive_categories_root', 'archive_categories', ['root_table', 'root_id'], unique=False)
+    op.create_table('archive_components',
+    sa.Column('category_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('name', sa.String(length=200), autoincrement=False, nullable=True),
+    sa.Column('default_unit_price_usd', sa.Float(), autoincrement=False, nullable=True),
+    sa.Column('uom', sa.String(length=40), autoincrement=False, nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('created_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('updated_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('deleted_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.Column('root_table', sa.String(length=20), nullable=False),
+    sa.Column('root_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_archive_components_root', 'archive_components', ['root_table', 'root_id'], unique=False)
+    op.create_table('archive_projects',
+    sa.Column('client_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('code', sa.String(length=20), autoincrement=False, nullable=True),
+    sa.Column('name', sa.String(length=200), autoincrement=False, nullable=True),
+    sa.Column('description', sa.Text(), autoincrement=False, nullable=True),
+    sa.Column('project_type', sa.String(length=120), autoincrement=False, nullable=True),
+    sa.Column('status', sa.String(length=20), autoincrement=False, nullable=True),
+    sa.Column('start_date', sa.Date(), autoincrement=False, nullable=True),
+    sa.Column('end_date', sa.Date(), autoincrement=False, nullable=True),
+    sa.Column('budget_amount_usd', sa.Float(), autoincrement=False, nullable=True),
+    sa.Column('tax_rate', sa.Float(), autoincrement=False, nullable=True),
+    sa.Column('currency', sa.String(length=3), autoincrement=False, nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('created_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('updated_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('deleted_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.Column('root_table', sa.String(length=20), nullable=False),
+    sa.Column('root_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_archive_projects_root', 'archive_projects', ['root_table', 'root_id'], unique=False)
+    op.create_table('archive_project_categories',
+    sa.Column('project_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('category_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('base_cost_usd', sa.Float(), autoincrement=False, nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('created_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('updated_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('deleted_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.Column('root_table', sa.String(length=20), nullable=False),
+    sa.Column('root_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_archive_project_categories_root', 'archive_project_categories', ['root_table', 'root_id'], unique=False)
+    op.create_table('archive_project_components',
+    sa.Column('project_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('category_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('component_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('quantity', sa.Float(), autoincrement=False, nullable=True),
+    sa.Column('unit_price_usd', sa.Float(), autoincrement=False, nullable=True),
+    sa.Column('note', sa.Text(), autoincrement=False, nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('created_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('updated_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('deleted_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.Column('root_table', sa.String(length=20), nullable=False),
+    sa.Column('root_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_archive_project_components_root', 'archive_project_components', ['root_table', 'root_id'], unique=False)
+    op.create_table('archive_tasks',
+    sa.Column('project_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('parent_task_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('title', sa.String(length=200), autoincrement=False, nullable=True),
+    sa.Column('description', sa.Text(), autoincrement=False, nullable=True),
+    sa.Column('status', sa.String(length=20), autoincrement=False, nullable=True),
+    sa.Column('assignee_user_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('due_date', sa.Date(), autoincrement=False, nullable=True),
+    sa.Column('order_index', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('path', sa.String(length=512), autoincrement=False, nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('created_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('updated_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('deleted_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.Column('root_table', sa.String(length=20), nullable=False),
+    sa.Column('root_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_archive_tasks_root', 'archive_tasks', ['root_table', 'root_id'], unique=False)
+    op.create_table('archive_task_comments',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('task_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('user_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('body', sa.Text(), autoincrement=False, nullable=True),
+    sa.Column('created_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.Column('root_table', sa.String(length=20), nullable=False),
+    sa.Column('root_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_archive_task_comments_root', 'archive_task_comments', ['root_table', 'root_id'], unique=False)
+    op.create_table('archive_expenses',
+    sa.Column('project_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('reference_no', sa.String(length=50), autoincrement=False, nullable=True),
+    sa.Column('expense_date', sa.Date(), autoincrement=False, nullable=True),
+    sa.Column('vendor', sa.String(length=120), autoincrement=False, nullable=True),
+    sa.Column('memo', sa.Text(), autoincrement=False, nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('created_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('updated_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('deleted_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.Column('root_table', sa.String(length=20), nullable=False),
+    sa.Column('root_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_archive_expenses_root', 'archive_expenses', ['root_table', 'root_id'], unique=False)
+    op.create_table('archive_expense_lines',
+    sa.Column('expense_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('category_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('qty', sa.Numeric(precision=12, scale=2), autoincrement=False, nullable=True),
+    sa.Column('unit_price_usd', sa.Numeric(precision=12, scale=2), autoincrement=False, nullable=True),
+    sa.Column('line_total_usd', sa.Numeric(precision=12, scale=2), autoincrement=False, nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('created_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('updated_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('deleted_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.Column('root_table', sa.String(length=20), nullable=False),
+    sa.Column('root_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_archive_expense_lines_root', 'archive_expense_lines', ['root_table', 'root_id'], unique=False)
+
+    # partial indexes: plain CREATE INDEX, no table rebuild
+    op.create_index('ix_clients_deleted_at', 'clients', ['deleted_at'], unique=False, sqlite_where=sa.text('deleted_at IS NOT NULL'), postgresql_where=sa.text('deleted_at IS NOT NULL'))
+    op.create_index('ix_clients_live_created', 'clients', ['created_at'], unique=False, sqlite_where=sa.text('deleted_at IS NULL'), postgresql_where=sa.text('deleted_at IS NULL'))
+    op.create_index('ix_categories_deleted_at', 'categories', ['deleted_at'], unique=False, sqlite_where=sa.text('deleted_at IS NOT NULL'), postgresql_where=sa.text('deleted_at IS NOT NULL'))
+    op.create_index('ix_categories_live_name', 'categories', ['name'], unique=False, sqlite_where=sa.text('deleted_at IS NULL'), postgresql_where=sa.text('deleted_at IS NULL'))
+    op.create_index('ix_projects_deleted_at', 'projects', ['deleted_at'], unique=False, sqlite_where=sa.text('deleted_at IS NOT NULL'), postgresql_where=sa.text('deleted_at IS NOT NULL'))
+    op.create_index('ix_projects_live_created', 'projects', ['created_at'], unique=False, sqlite_where=sa.text('deleted_at IS NULL'), postgresql_where=sa.text('deleted_at IS NULL'))
+
+
+def downgrade():
+    op.drop_index('ix_projects_live_created', table_name='projects')
+    op.drop_index('ix_projects_deleted_at', table_name='projects')
+    op.drop_index('ix_categories_live_name', table_name='categories')
+    op.drop_index('ix_categories_deleted_at', table_name='categories')
+    op.drop_index('ix_clients_live_created', table_name='clients')
+    op.drop_index('ix_clients_deleted_at', table_name='clients')
+
+    op.drop_index('ix_archive_expense_lines_root', table_name='archive_expense_lines')
+    op.drop_table('archive_expense_lines')
+    op.drop_index('ix_archive_expenses_root', table_name='archive_expenses')
+    op.drop_table('archive_expenses')
+    op.drop_index('ix_archive_task_comments_root', table_name='archive_task_comments')
+    op.drop_table('archive_task_comments')
+    op.drop_index('ix_archive_tasks_root', table_name='archive_tasks')
+    op.drop_table('archive_tasks')
+    op.drop_index('ix_archive_project_components_root', table_name='archive_project_components')
+    op.drop_table('archive_project_components')
+    op.drop_index('ix_archive_project_categories_root', table_name='archive_project_categories')
+    op.drop_table('archive_project_categories')
+    op.drop_index('ix_archive_projects_root', table_name='archive_projects')
+    op.drop_table('archive_projects')
+    op.drop_index('ix_archive_components_root', table_name='archive_components')
+    op.drop_table('archive_components')
+    op.drop_index('ix_archive_categories_root', table_name='archive_categories')
+    op.drop_table('archive_categories')
+    op.drop_index('ix_archive_clients_root', table_name='archive_clients')
+    op.drop_table('archive_clients')
@@ -0,0 +1,68 @@
+"""store money as integer cents
+
+Revision ID: e61b0f4d9a27
+Revises: a3c7e19f5b20
+Create Date: 2026-10-19 12:21:05.377941
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e61b0f4d9a27'
+down_revision = 'a3c7e19f5b20'
+branch_labels = None
+depends_on = None
+
+
+# table -> [(old dollar column, old type, new cents column, nullable)]
+MONEY_COLUMNS = {
+    'projects': [('budget_amount_usd', sa.Float(), 'budget_cents', True)],
+    'components': [('default_unit_price_usd', sa.Float(), 'default_unit_price_cents', True)],
+    'project_categories': [('base_cost_usd', sa.Float(), 'base_cost_cents', False)],
+    'project_components': [('unit_price_usd', sa.Float(), 'unit_price_cents', True)],
+    'expense_lines': [
+        ('unit_price_usd', sa.Numeric(precision=12, scale=2), 'unit_price_cents', False),
+        ('line_total_usd', sa.Numeric(precision=12, scale=2), 'line_total_cents', False),
+    ],
+}
+
+
+def _tables():
+    for table, cols in MONEY_COLUMNS.items():
+        # archive mirrors carry the same columns, always nullable
+        yield table, cols
+        yield f'archive_{table}', [(old, t, new, True) for old, t, new, _ in cols]
+
+
+def upgrade():
+    # add, backfill, then drop: the backfill needs both columns at once
+    for table, cols in _tables():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for old, _type, new, _nullable in cols:
+                batch_op.add_column(sa.Column(new, sa.Integer(), nullable=True))
+        for old, _type, new, _nullable in cols:
+            op.execute(
+                f'UPDATE {table} SET {new} = CAST(ROUND({old} * 100) AS INTEGER) '
+                f'WHERE {old} IS NOT NULL'
+            )
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for old, _type, new, nullable in cols:
+                if not nullable:
+                    batch_op.alter_column(new, existing_type=sa.Integer(), nullable=False)
+                batch_op.drop_column(old)
+
+
+def downgrade():
+    for table, cols in _tables():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for old, old_type, new, _nullable in cols:
+                batch_op.add_column(sa.Column(old, old_type, nullable=True))
+        for old, _type, new, _nullable in cols:
+            op.execute(f'UPDATE {table} SET {old} = {new} / 100.0 WHERE {new} IS NOT NULL')
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for old, old_type, new, nullable in cols:
+                if not nullable:
+                    batch_op.alter_column(old, existing_type=old_type, nullable=False)
+                batch_op.drop_column(new)
@@ -1,14 +1,22 @@
 from __future__ import annotations
 import re
 from datetime import datetime, date as dt_date
-from sqlalchemy import UniqueConstraint, Index, event, ForeignKey
+from sqlalchemy import UniqueConstraint, Index, event, ForeignKey, text
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from .extensions import db
+from .money import Money
 
 
 # ----- helpers -----
 def utcnow() -> datetime:
     return datetime.utcnow()
+
+
+# partial index predicates for soft-deleted tables
+LIVE = text("deleted_at IS NULL")
+DELETED = text("deleted_at IS NOT NULL")
+
+
 # ----- mixins -----
 class TimestampMixin:
     created_at: Mapped[datetime] = mapped_column(default=utcnow, nullable=False)
@@ -33,6 +41,25 @@ class User(db.Model, PKMixin, TimestampMixin):
     is_active: Mapped[bool] = mapped_column(db.Boolean, default=True, nullable=False)
 
 
+# ----- tenant directory (main database only; see backend/tenancy.py) -----
+# info["directory"] keeps these on the main engine while a request is
+# routed to a tenant's database
+class Tenant(db.Model, PKMixin, TimestampMixin):
+    __tablename__ = "tenants"
+    __table_args__ = {"info": {"directory": True}}
+    slug: Mapped[str] = mapped_column(db.String(40), unique=True, nullable=False)
+    name: Mapped[str] = mapped_column(db.String(160), nullable=False)
+
+
+class TenantMember(db.Model, PKMixin):
+    """Which organization a login email belongs to."""
+    __tablename__ = "tenant_members"
+    __table_args__ = {"info": {"directory": True}}
+    email: Mapped[str] = mapped_column(db.String(255), unique=True, nullable=False)
+    tenant_id: Mapped[int] = mapped_column(ForeignKey("tenants.id"), nullable=False, index=True)
+    created_at: Mapped[datetime] = mapped_column(default=utcnow, nullable=False)
+
+
 # ----- clients -----
 class Client(db.Model, PKMixin, TimestampMixin):
     __tablename__ = "clients"
@@ -47,6 +74,11 @@ class Client(db.Model, PKMixin, TimestampMixin):
         "Project", back_populates="client", cascade="all, delete-orphan"
     )
 
+    __table_args__ = (
+        Index("ix_clients_live_created", "created_at", sqlite_where=LIVE, postgresql_where=LIVE),
+        Index("ix_clients_deleted_at", "deleted_at", sqlite_where=DELETED, postgresql_where=DELETED),
+    )
+
 
 # ----- categories (global master) -----
 class Category(db.Model, PKMixin, TimestampMixin):
@@ -58,6 +90,11 @@ class Category(db.Model, PKMixin, TimestampMixin):
         "Component", back_populates="category", cascade="all, delete-orphan"
     )
 
+    __table_args__ = (
+        Index("ix_categories_live_name", "name", sqlite_where=LIVE, postgresql_where=LIVE),
+        Index("ix_categories_deleted_at", "deleted_at", sqlite_where=DELETED, postgresql_where=DELETED),
+    )
+
 
 # ----- components (global master) -----
 class Component(db.Model, PKMixin, TimestampMixin):
@@ -66,7 +103,7 @@ class Component(db.Model, PKMixin, TimestampMixin):
         ForeignKey("categories.id"), nullable=False, index=True
     )
     name: Mapped[str] = mapped_column(db.String(200), nullable=False)
-    default_unit_price_usd: Mapped[float | None] = mapped_column(db.Float)
+    default_unit_price_usd: Mapped[float | None] = mapped_column("default_unit_price_cents", Money)
     uom: Mapped[str | None] = mapped_column(db.String(40))  # piece, meter, hour, etc.
 
     category = relationship("Category", back_populates="components")
@@ -93,7 +130,7 @@ class Project(db.Model, PKMixin, TimestampMixin):
     )  # planned/active/on_hold/completed
     start_date: Mapped[dt_date | None]
     end_date: Mapped[dt_date | None]
-    budget_amount_usd: Mapped[float | None] = mapped_column(db.Float)
+    budget_amount_usd: Mapped[float | None] = mapped_column("budget_cents", Money)
     tax_rate: Mapped[float | None] = mapped_column(db.Float)  # 0.0 - 0.25 etc.
     currency: Mapped[str] = mapped_column(db.String(3), default="USD", nullable=False)
 
@@ -111,6 +148,13 @@ class Project(db.Model, PKMixin, TimestampMixin):
         cascade="all, delete-orphan",
     )
 
+    __table_args__ = (
+        Index("ix_projects_updated_at", "updated_at"),
+        # hot lists only ever read live rows
+        Index("ix_projects_live_created", "created_at", sqlite_where=LIVE, postgresql_where=LIVE),
+        Index("ix_projects_deleted_at", "deleted_at", sqlite_where=DELETED, postgresql_where=DELETED),
+    )
+
 
 @event.listens_for(Project, "before_insert")
 def assign_project_code(mapper, connection, target: Project):
@@ -137,7 +181,7 @@ class ProjectCategory(db.Model, PKMixin, TimestampMixin):
     category_id: Mapped[int] = mapped_column(
         ForeignKey("categories.id"), nullable=False, index=True
     )
-    base_cost_usd: Mapped[float] = mapped_column(db.Float, default=0.0, nullable=False)
+    base_cost_usd: Mapped[float] = mapped_column("base_cost_cents", Money, default=0.0, nullable=False)
     project = relationship("Project", back_populates="categories")
     category = relationship("Category")
     __table_args__ = (
@@ -162,7 +206,7 @@ class ProjectComponent(db.Model, PKMixin, TimestampMixin):
     )
     quantity: Mapped[float] = mapped_column(db.Float, default=1.0, nullable=False)
     unit_price_usd: Mapped[float | None] = mapped_column(
-        db.Float
+        "unit_price_cents", Money
     )  # overrides component default
     note: Mapped[str | None] = mapped_column(db.Text)
     project = relationship("Project", back_populates="components")
@@ -184,9 +228,17 @@ class Task(db.Model, PKMixin, TimestampMixin):
     title = mapped_column(db.String(200), nullable=False)
     description = mapped_column(db.Text)
     status = mapped_column(db.String(20), nullable=False, default="todo")
-    assignee_user_id = mapped_column(ForeignKey("users.id"), nullable=True, index=True)
+    assignee_user_id = mapped_column(ForeignKey("users.id"), nullable=True)
     due_date = mapped_column(db.Date)
     order_index = mapped_column(db.Integer, nullable=False, default=0)
+    # materialized path of ancestor ids incl. self, e.g. "/1/5/9/"
+    path = mapped_column(db.String(512), index=True)
+    duration_days = mapped_column(db.Integer, nullable=False, default=1, server_default="1")
+    # critical path, kept current by backend/schedule.py: earliest start in
+    # days from the project start, and the longest chain of work from this
+    # task's start to the end of the project (its own duration included)
+    early_start_days = mapped_column(db.Integer, nullable=False, default=0, server_default="0")
+    tail_days = mapped_column(db.Integer, nullable=False, default=1, server_default="1")
     project = relationship("Project", back_populates="tasks")
     parent = relationship(
         "Task",
@@ -205,6 +257,13 @@ class Task(db.Model, PKMixin, TimestampMixin):
         order_by="TaskComment.created_at"
     )
     assignee = relationship("User")
+    __table_args__ = (
+        Index("ix_tasks_project_updated", "project_id", "updated_at"),
+        # workload / overdue reports (backend/reports.py); the first also
+        # serves plain lookups by assignee
+        Index("ix_tasks_assignee_status_due", "assignee_user_id", "status", "due_date"),
+        Index("ix_tasks_status_due", "status", "due_date"),
+    )
     def to_dict(self) -> dict:
         return {
             "id": self.id,
@@ -216,11 +275,35 @@ class Task(db.Model, PKMixin, TimestampMixin):
             "assignee_user_id": self.assignee_user_id,
             "due_date": self.due_date.isoformat() if self.due_date else None,
             "order_index": self.order_index,
+            "duration_days": self.duration_days,
             "created_at": self.created_at.isoformat(),
             "updated_at": self.updated_at.isoformat(),
         }
 
 
+# ----- task dependencies (finish-to-start) -----
+class TaskDependency(db.Model, PKMixin):
+    __tablename__ = "task_dependencies"
+    project_id: Mapped[int] = mapped_column(ForeignKey("projects.id"), nullable=False, index=True)
+    predecessor_id: Mapped[int] = mapped_column(ForeignKey("tasks.id"), nullable=False)
+    successor_id: Mapped[int] = mapped_column(ForeignKey("tasks.id"), nullable=False, index=True)
+    lag_days: Mapped[int] = mapped_column(db.Integer, nullable=False, default=0, server_default="0")
+    created_at: Mapped[datetime] = mapped_column(default=utcnow, nullable=False)
+
+    __table_args__ = (
+        # also serves lookups by predecessor
+        UniqueConstraint("predecessor_id", "successor_id", name="uq_task_dependencies_pair"),
+    )
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "predecessor_id": self.predecessor_id,
+            "successor_id": self.successor_id,
+            "lag_days": self.lag_days,
+        }
+
+
 class TaskComment(db.Model):
     __tablename__ = "task_comments"
     id = db.Column(db.Integer, primary_key=True)
@@ -253,6 +336,7 @@ class Expense(db.Model, PKMixin, TimestampMixin):
         back_populates="expense",
         cascade="all, delete-orphan",
     )
+    __table_args__ = (Index("ix_expenses_project_updated", "project_id", "updated_at"),)
 
 
 # ----- expense lines (detail, tax-exclusive) -----
@@ -261,10 +345,127 @@ class ExpenseLine(db.Model, PKMixin, TimestampMixin):
     expense_id: Mapped[int] = mapped_column(ForeignKey("expenses.id"), nullable=False, index=True)
     category_id: Mapped[int] = mapped_column(ForeignKey("categories.id"), nullable=False, index=True)
     qty: Mapped[float] = mapped_column(db.Numeric(12, 2), default=1)
-    unit_price_usd: Mapped[float] = mapped_column(db.Numeric(12, 2), default=0)
-    line_total_usd: Mapped[float] = mapped_column(db.Numeric(12, 2))
+    unit_price_usd: Mapped[float] = mapped_column("unit_price_cents", Money, default=0)
+    line_total_usd: Mapped[float] = mapped_column("line_total_cents", Money)
     expense: Mapped["Expense"] = relationship("Expense", back_populates="lines")
     category: Mapped["Category"] = relationship("Category")
+    __table_args__ = (Index("ix_expense_lines_updated_at", "updated_at"),)
+
+
+# ----- online backfills (backend/backfill.py) -----
+class BackfillCheckpoint(db.Model, PKMixin):
+    """How far a chunked backfill got; committed with each chunk."""
+    __tablename__ = "backfill_checkpoints"
+    name: Mapped[str] = mapped_column(db.String(80), unique=True, nullable=False)
+    last_id: Mapped[int | None] = mapped_column(db.Integer)
+    rows_changed: Mapped[int] = mapped_column(db.Integer, nullable=False, default=0)
+    started_at: Mapped[datetime | None] = mapped_column(default=None)
+    finished_at: Mapped[datetime | None] = mapped_column(default=None)
+
+
+# ----- dashboard KPIs (backend/dashboard.py) -----
+class KpiSnapshot(db.Model, PKMixin):
+    """Portfolio KPIs as of `computed_at`; a single row, rewritten by each refresh."""
+    __tablename__ = "kpi_snapshots"
+    projects: Mapped[int] = mapped_column(db.Integer, nullable=False, default=0)
+    active_projects: Mapped[int] = mapped_column(db.Integer, nullable=False, default=0)
+    total_budget_usd: Mapped[float] = mapped_column("total_budget_cents", Money, nullable=False, default=0)
+    total_spend_usd: Mapped[float] = mapped_column("total_spend_cents", Money, nullable=False, default=0)
+    overdue_tasks: Mapped[int] = mapped_column(db.Integer, nullable=False, default=0)
+    at_risk_projects: Mapped[int] = mapped_column(db.Integer, nullable=False, default=0)
+    over_budget_projects: Mapped[int] = mapped_column(db.Integer, nullable=False, default=0)
+    computed_at: Mapped[datetime] = mapped_column(default=utcnow, nullable=False)
+    compute_ms: Mapped[int] = mapped_column(db.Integer, nullable=False, default=0)
+
+
+# ----- tombstones (hard deletes, for the change feed) -----
+class Tombstone(db.Model, PKMixin):
+    __tablename__ = "tombstones"
+    table_name: Mapped[str] = mapped_column(db.String(40), nullable=False)
+    row_id: Mapped[int] = mapped_column(db.Integer, nullable=False)
+    project_id: Mapped[int | None] = mapped_column(db.Integer)
+    deleted_at: Mapped[datetime] = mapped_column(default=utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_tombstones_deleted_at", "deleted_at"),
+        Index("ix_tombstones_project_deleted", "project_id", "deleted_at"),
+    )
+
+
+def _record_tombstone(connection, table_name: str, row_id: int, project_id) -> None:
+    connection.execute(
+        Tombstone.__table__.insert().values(
+            table_name=table_name,
+            row_id=row_id,
+            project_id=project_id,
+            deleted_at=utcnow(),
+        )
+    )
+
+
+@event.listens_for(Project, "after_delete")
+def _tombstone_project(mapper, connection, target: Project):
+    _record_tombstone(connection, "projects", target.id, target.id)
+
+
+@event.listens_for(Task, "after_delete")
+def _tombstone_task(mapper, connection, target: Task):
+    _record_tombstone(connection, "tasks", target.id, target.project_id)
+
+
+@event.listens_for(TaskComment, "after_delete")
+def _tombstone_comment(mapper, connection, target: TaskComment):
+    project_id = connection.scalar(
+        db.select(Task.project_id).where(Task.id == target.task_id)
+    )
+    _record_tombstone(connection, "task_comments", target.id, project_id)
+
+
+@event.listens_for(Expense, "after_delete")
+def _tombstone_expense(mapper, connection, target: Expense):
+    _record_tombstone(connection, "expenses", target.id, target.project_id)
+
+
+@event.listens_for(ExpenseLine, "after_delete")
+def _tombstone_expense_line(mapper, connection, target: ExpenseLine):
+    project_id = connection.scalar(
+        db.select(Expense.project_id).where(Expense.id == target.expense_id)
+    )
+    _record_tombstone(connection, "expense_lines", target.id, project_id)
+
+
+# ----- archive (soft-deleted rows moved out of the hot tables) -----
+def _archive_table(live: db.Table) -> db.Table:
+    """Column-for-column copy of a live table, without its constraints or
+    indexes, plus the archive bookkeeping columns. root_table/root_id name
+    the soft-deleted row (project, client or category) it was archived with."""
+    name = f"archive_{live.name}"
+    return db.Table(
+        name,
+        *[db.Column(c.name, c.type, primary_key=c.primary_key, autoincrement=False) for c in live.columns],
+        db.Column("archived_at", db.DateTime, nullable=False),
+        db.Column("root_table", db.String(20), nullable=False),
+        db.Column("root_id", db.Integer, nullable=False),
+        Index(f"ix_{name}_root", "root_table", "root_id"),
+    )
+
+
+ARCHIVE_TABLES = {
+    t.name: _archive_table(t)
+    for t in (
+        Client.__table__,
+        Category.__table__,
+        Component.__table__,
+        Project.__table__,
+        ProjectCategory.__table__,
+        ProjectComponent.__table__,
+        Task.__table__,
+        TaskDependency.__table__,
+        TaskComment.__table__,
+        Expense.__table__,
+        ExpenseLine.__table__,
+    )
+}
 
 
 # ----- attachments (polymorphic) -----
@@ -0,0 +1,47 @@
+# backend/money.py
+"""Money is stored as integer cents.
+
+Columns use the Money type: the database holds an INTEGER number of cents,
+Python (and therefore the JSON API) keeps seeing plain dollar floats, so
+`budget_amount_usd: 1234.5` in and out exactly as before. SQL aggregates
+over the raw columns are integer sums, exact and cheap; convert once at
+the edge with from_cents().
+"""
+from __future__ import annotations
+from decimal import ROUND_HALF_UP, Decimal
+from sqlalchemy.types import Integer, TypeDecorator
+
+_CENT = Decimal(1)
+
+
+def to_cents(value) -> int | None:
+    """Dollars (float, int, str or Decimal) -> whole cents, half up."""
+    if value is None or value == "":
+        return None
+    # str() first: Decimal(0.1) would carry the binary float error along
+    return int(Decimal(str(value)).scaleb(2).quantize(_CENT, rounding=ROUND_HALF_UP))
+
+
+def from_cents(cents) -> float | None:
+    if cents is None:
+        return None
+    return int(cents) / 100
+
+
+def line_total_cents(qty, unit_price) -> int:
+    """qty x unit price in cents, rounded once (not per operand)."""
+    exact = Decimal(str(qty or 0)) * Decimal(str(unit_price or 0))
+    return int(exact.scaleb(2).quantize(_CENT, rounding=ROUND_HALF_UP))
+
+
+class Money(TypeDecorator):
+    """INTEGER cents in the database, float dollars in Python."""
+
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return to_cents(value)
+
+    def process_result_value(self, value, dialect):
+        return from_cents(value)
@@ -3,11 +3,16 @@ from typing import cast
 from datetime import datetime, date as dt_date
 from functools import wraps
 from flask import Blueprint, jsonify, request, g, current_app
-from sqlalchemy import or_, text
+from sqlalchemy import bindparam, or_, select, text
+from sqlalchemy.orm import selectinload
 from sqlalchemy.exc import IntegrityError
 from .extensions import db
-from .models import Project, Client,Category,Component,ProjectCategory, ProjectComponent
+from .models import Project, Client,Category,Component,ProjectCategory, ProjectComponent, Task, Expense
 from .auth import _get_token_from_request, _verify_token
+from .tasks import compute_progress
+from .expenses import _expense_to_dict
+from .serializers import BOM, PROJECT, TASK
+from .money import from_cents
 
 bp = Blueprint("projects", __name__, url_prefix="/api/projects")
 
@@ -91,19 +96,124 @@ def bom_json(b: ProjectComponent) -> dict:
     }
 
 
+# --- sparse fields / compound includes ---
+PROJECT_FIELDS = PROJECT.names
+PROJECT_INCLUDES = ("categories", "components", "summary", "tasks", "progress", "expenses")
+
+
+def _list_arg(args, name: str, allowed) -> list[str] | None:
+    """Comma-separated query arg; raises ValueError on unknown names."""
+    raw = (args.get(name) or "").strip()
+    if not raw:
+        return None
+    vals = [x.strip() for x in raw.split(",") if x.strip()]
+    bad = [v for v in vals if v not in allowed]
+    if bad:
+        raise ValueError(f"unknown {name}: {', '.join(bad)}")
+    return vals
+
+
+def _project_select(where, fields: list[str] | None, order_by=None):
+    """(serializer, statement); with fields, only those columns are selected."""
+    ser = PROJECT.subset(["id", *[f for f in fields if f != "id"]]) if fields else PROJECT
+    stmt = ser.select().where(*where)
+    if order_by is not None:
+        stmt = stmt.order_by(order_by)
+    return ser, stmt
+
+
+def _project_rows(where, fields: list[str] | None, order_by=None) -> list[dict]:
+    """Serialize matching projects; with fields, only those columns are selected."""
+    ser, stmt = _project_select(where, fields, order_by)
+    return ser.all(stmt)
+
+
+def _attach_includes(items: list[dict], includes: list[str] | None) -> None:
+    """Add related collections to each project dict: one query per relation,
+    however many projects are listed."""
+    if not includes or not items:
+        return
+    pids = [it["id"] for it in items]
+    grouped: dict[str, dict[int, list]] = {}
+
+    def group(name, rows, key="project_id"):
+        g_ = grouped.setdefault(name, {pid: [] for pid in pids})
+        for r in rows:
+            g_[getattr(r, key)].append(r)
+        return g_
+
+    if "categories" in includes:
+        group("categories", ProjectCategory.query.filter(ProjectCategory.project_id.in_(pids)).all())
+    if "components" in includes:
+        group("components", ProjectComponent.query.filter(ProjectComponent.project_id.in_(pids)).all())
+    if "progress" in includes:
+        group(
+            "progress",
+            db.session.query(Task.project_id, Task.id, Task.parent_task_id, Task.status)
+            .filter(Task.project_id.in_(pids))
+            .all(),
+        )
+    if "expenses" in includes:
+        group(
+            "expenses",
+            Expense.query.options(selectinload(Expense.lines))
+            .filter(Expense.project_id.in_(pids))
+            .order_by(Expense.expense_date.desc())
+            .all(),
+        )
+    summaries = _summaries(pids) if "summary" in includes else {}
+    tasks = {pid: [] for pid in pids}
+    if "tasks" in includes:
+        stmt = (
+            TASK.select()
+            .where(Task.project_id.in_(pids))
+            .order_by(Task.parent_task_id.is_(None).desc(), Task.parent_task_id, Task.order_index, Task.id)
+        )
+        for t in TASK.all(stmt):
+            tasks[t["project_id"]].append(t)
+
+    for it in items:
+        pid = it["id"]
+        if "categories" in includes:
+            it["categories"] = [pc_json(x) for x in grouped["categories"][pid]]
+        if "components" in includes:
+            it["components"] = [bom_json(x) for x in grouped["components"][pid]]
+        if "tasks" in includes:
+            it["tasks"] = tasks[pid]
+        if "progress" in includes:
+            it["progress"] = compute_progress(grouped["progress"][pid])
+        if "expenses" in includes:
+            it["expenses"] = [_expense_to_dict(e) for e in grouped["expenses"][pid]]
+        if "summary" in includes:
+            it["summary"] = summaries[pid]
+
+
 # --- routes: projects ---
 @bp.get("")
 @require_auth
 def list_projects():
-    q = Project.query.filter(Project.deleted_at.is_(None))
-    client_id = request.args.get("client_id", type=int)
+    try:
+        ser, stmt, includes = _project_list_query(request.args)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+    items = ser.all(stmt)
+    _attach_includes(items, includes)
+    return jsonify(projects=items)
+
+
+def _project_list_query(args):
+    """GET /api/projects args -> (serializer, statement, includes).
+    Raises ValueError on unknown fields/include. Shared with backend/asgi.py."""
+    where = [Project.deleted_at.is_(None)]
+    client_id = args.get("client_id", type=int)
     if client_id:
-        q = q.filter(Project.client_id == client_id)
+        where.append(Project.client_id == client_id)
 
-    search = (request.args.get("q") or "").strip()
+    search = (args.get("q") or "").strip()
     if search:
         like = f"%{search}%"
-        q = q.filter(
+        where.append(
             or_(
                 Project.name.ilike(like),
                 Project.code.ilike(like),
@@ -111,9 +221,10 @@ def list_projects():
             )
         )
 
-    q = q.order_by(Project.created_at.desc())
-    items = [project_json(p) for p in q.all()]
-    return jsonify(projects=items)
+    fields = _list_arg(args, "fields", PROJECT_FIELDS)
+    includes = _list_arg(args, "include", PROJECT_INCLUDES)
+    ser, stmt = _project_select(where, fields, order_by=Project.created_at.desc())
+    return ser, stmt, includes
 
 
 @bp.post("")
@@ -150,10 +261,20 @@ def create_project():
 @bp.get("/<int:pid>")
 @require_auth
 def get_project(pid: int):
-    p = _get_project_or_404(pid)
-    if not p:
+    """Query params:
+      - fields: comma-separated project columns to return (id is always included)
+      - include: categories, components, summary, tasks, progress, expenses
+    """
+    try:
+        fields = _list_arg(request.args, "fields", PROJECT_FIELDS)
+        includes = _list_arg(request.args, "include", PROJECT_INCLUDES)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    items = _project_rows([Project.id == pid, Project.deleted_at.is_(None)], fields)
+    if not items:
         return jsonify(error="not found"), 404
-    return jsonify(project_json(p))
+    _attach_includes(items, includes)
+    return jsonify(items[0])
 
 
 @bp.patch("/<int:pid>")
@@ -278,8 +399,8 @@ def list_project_components(pid: int):
     p = _get_project_or_404(pid)
     if not p:
         return jsonify(error="not found"), 404
-    rows = ProjectComponent.query.filter_by(project_id=pid).all()
-    return jsonify(components=[bom_json(x) for x in rows])
+    rows = BOM.all(BOM.select().where(ProjectComponent.project_id == pid))
+    return jsonify(components=rows)
 
 
 @bp.post("/<int:pid>/components")
@@ -343,69 +464,103 @@ def delete_project_component(pid: int, bid: int):
 
 
 # --- routes: project summary (planned vs actual) ---
+def _planned_sql(where: str = "") -> str:
+    """Planned cents per (project_id, category_id): base cost plus the BOM at
+    its unit prices (component defaults where unset). `where` filters the
+    project_categories rows (alias pc) before grouping. Shared with the
+    forecast and dashboard queries so the arithmetic lives in one place."""
+    return f"""
+    SELECT pc.project_id, pc.category_id,
+           pc.base_cost_cents
+           + COALESCE(SUM(CAST(ROUND(b.quantity * COALESCE(b.unit_price_cents, comp.default_unit_price_cents)) AS INTEGER)), 0)
+             AS planned_cents
+    FROM project_categories pc
+    LEFT JOIN project_components b
+      ON b.project_id = pc.project_id AND b.category_id = pc.category_id
+    LEFT JOIN components comp ON comp.id = b.component_id
+    {f"WHERE {where}" if where else ""}
+    GROUP BY pc.project_id, pc.category_id, pc.base_cost_cents
+"""
+
+
+def _actual_sql(where: str = "") -> str:
+    """Spent cents per (project_id, category_id); `where` filters the
+    expenses rows (alias e)."""
+    return f"""
+    SELECT e.project_id, el.category_id, COALESCE(SUM(el.line_total_cents), 0) AS actual_cents
+    FROM expenses e
+    JOIN expense_lines el ON el.expense_id = e.id
+    {f"WHERE {where}" if where else ""}
+    GROUP BY e.project_id, el.category_id
+"""
+
+
+_PLANNED_SQL = text(_planned_sql("pc.project_id IN :pids")).bindparams(bindparam("pids", expanding=True))
+_ACTUAL_SQL = text(_actual_sql("e.project_id IN :pids")).bindparams(bindparam("pids", expanding=True))
+
+
+def _summaries(pids: list[int]) -> dict[int, dict]:
+    """Planned vs actual per category for several projects in two grouped queries."""
+    planned_rows = actual_rows = []
+    if pids:
+        planned_rows = db.session.execute(_PLANNED_SQL, {"pids": pids}).mappings().all()
+        actual_rows = db.session.execute(_ACTUAL_SQL, {"pids": pids}).mappings().all()
+    names_stmt = _category_names_stmt(planned_rows, actual_rows)
+    names = dict(db.session.execute(names_stmt).all()) if names_stmt is not None else {}
+    return _build_summaries(pids, planned_rows, actual_rows, names)
+
+
+def _category_names_stmt(planned_rows, actual_rows):
+    cat_ids = {r["category_id"] for r in (*planned_rows, *actual_rows)}
+    if not cat_ids:
+        return None
+    return select(Category.id, Category.name).where(Category.id.in_(cat_ids))
+
+
+def _build_summaries(pids, planned_rows, actual_rows, names: dict) -> dict[int, dict]:
+    """Summary payloads from the _PLANNED_SQL/_ACTUAL_SQL rows (also used by backend/asgi.py)."""
+    planned: dict[int, dict] = {pid: {} for pid in pids}
+    actual: dict[int, dict] = {pid: {} for pid in pids}
+    for r in planned_rows:
+        planned[r["project_id"]][r["category_id"]] = int(r["planned_cents"])
+    for r in actual_rows:
+        actual[r["project_id"]][r["category_id"]] = int(r["actual_cents"])
+
+    # all arithmetic in integer cents; dollars only at the edge
+    out = {}
+    for pid in pids:
+        planned_map, actual_map = planned[pid], actual[pid]
+        cat_ids = list({*planned_map.keys(), *actual_map.keys()})
+        per_category = []
+        planned_total = actual_total = 0
+        for cid in sorted(cat_ids):
+            p_val = planned_map.get(cid, 0)
+            a_val = actual_map.get(cid, 0)
+            planned_total += p_val
+            actual_total += a_val
+            per_category.append(
+                {
+                    "category_id": cid,
+                    "category_name": names.get(cid),
+                    "planned_usd": from_cents(p_val),
+                    "actual_usd": from_cents(a_val),
+                    "variance_usd": from_cents(p_val - a_val),
+                }
+            )
+
+        totals = {
+            "planned_total_usd": from_cents(planned_total),
+            "actual_total_usd": from_cents(actual_total),
+            "variance_total_usd": from_cents(planned_total - actual_total),
+        }
+        out[pid] = {"per_category": per_category, "totals": totals}
+    return out
+
+
 @bp.get("/<int:pid>/summary")
 @require_auth
 def project_summary(pid: int):
     p = _get_project_or_404(pid)
     if not p:
         return jsonify(error="not found"), 404
-
-    planned_sql = text(
-        """
-        SELECT pc.category_id,
-               pc.base_cost_usd
-               + COALESCE(SUM(b.quantity * COALESCE(b.unit_price_usd, comp.default_unit_price_usd)), 0) AS planned_usd
-        FROM project_categories pc
-        LEFT JOIN project_components b
-          ON b.project_id = pc.project_id AND b.category_id = pc.category_id
-        LEFT JOIN components comp ON comp.id = b.component_id
-        WHERE pc.project_id = :pid
-        GROUP BY pc.category_id, pc.base_cost_usd
-    """
-    )
-
-    actual_sql = text(
-        """
-        SELECT el.category_id, COALESCE(SUM(el.line_total_usd), 0) AS actual_usd
-        FROM expenses e
-        JOIN expense_lines el ON el.expense_id = e.id
-        WHERE e.project_id = :pid
-        GROUP BY el.category_id
-    """
-    )
-
-    rows_planned = db.session.execute(planned_sql, {"pid": pid}).mappings().all()
-    rows_actual = db.session.execute(actual_sql, {"pid": pid}).mappings().all()
-    planned_map = {r["category_id"]: float(r["planned_usd"]) for r in rows_planned}
-    actual_map = {r["category_id"]: float(r["actual_usd"]) for r in rows_actual}
-
-    cat_ids = list({*planned_map.keys(), *actual_map.keys()})
-    names = (
-        {c.id: c.name for c in Category.query.filter(Category.id.in_(cat_ids)).all()}
-        if cat_ids
-        else {}
-    )
-
-    per_category = []
-    for cid in sorted(cat_ids):
-        p_val = planned_map.get(cid, 0.0)
-        a_val = actual_map.get(cid, 0.0)
-        per_category.append(
-            {
-                "category_id": cid,
-                "category_name": names.get(cid),
-                "planned_usd": p_val,
-                "actual_usd": a_val,
-                "variance_usd": p_val - a_val,
-            }
-        )
-
-    totals = {
-        "planned_total_usd": sum(x["planned_usd"] for x in per_category),
-        "actual_total_usd": sum(x["actual_usd"] for x in per_category),
-    }
-    totals["variance_total_usd"] = (
-        totals["planned_total_usd"] - totals["actual_total_usd"]
-    )
-
-    return jsonify(per_category=per_category, totals=totals)
+    return jsonify(_summaries([pid])[pid])
@@ -0,0 +1,450 @@
+# backend/reports.py
+"""Portfolio reports and exports, optionally served from a database snapshot.
+
+Reports scan every project. On the live SQLite file that long read holds a
+shared lock (rollback journal) that makes expense and task writers wait, or,
+in WAL mode, pins the WAL so it cannot be checkpointed. With
+REPORT_SNAPSHOT=1 they read a replica instead:
+
+  flask reports snapshot              # refresh once (cron)
+  flask reports snapshot --every 60   # keep refreshing (sidecar process)
+
+A refresh copies the database into <replica>.tmp with SQLite's online
+backup API, stamps the copy with the time it was taken and renames it over
+the replica. Reports open a fresh read-only connection per request, so each
+one sees the newest complete snapshot, and a rename never disturbs a report
+still streaming from the previous file.
+
+Supervisor views across all projects, both paginated with a keyset cursor:
+
+  GET /api/reports/workload   open / doing / overdue tasks per assignee
+  GET /api/reports/overdue    overdue open tasks, oldest due date first
+
+Every response carries its watermark: `as_of` and `staleness_seconds` in
+JSON bodies and the X-Report-As-Of header. Without REPORT_SNAPSHOT the
+reports read the live database and the watermark is the request time.
+
+With tenant routing each tenant's replica sits next to its database
+(TENANTS_DIR/<slug>.report.db): `flask tenants each reports snapshot`.
+"""
+from __future__ import annotations
+import base64
+import csv
+import io
+import os
+import sqlite3
+import threading
+import time
+from datetime import date as dt_date, datetime, timezone
+import click
+from flask import Blueprint, Response, current_app, jsonify, request
+from sqlalchemy import and_, case, create_engine, func, or_, select, text, union_all
+from sqlalchemy.pool import NullPool
+from .auth import require_auth
+from .extensions import db
+from .jobs import run_every
+from .models import Category, Client, Expense, ExpenseLine, Project, Task, User
+from .money import from_cents, to_cents
+from .projects import _ACTUAL_SQL, _PLANNED_SQL, _build_summaries, _category_names_stmt
+from .tasks import DOING_STATUSES, OPEN_STATUSES, _norm_status
+from .tenancy import current_tenant
+
+bp = Blueprint("reports", __name__, url_prefix="/api/reports")
+
+CSV_COLUMNS = (
+    "project_code", "project_name", "expense_id", "reference_no", "expense_date",
+    "vendor", "category", "qty", "unit_price_usd", "line_total_usd",
+)
+CSV_FLUSH_ROWS = 500
+DEFAULT_PAGE = 50
+MAX_PAGE = 200
+
+_replicas: dict[str, object] = {}
+_replicas_lock = threading.Lock()
+
+
+# --- where reports read from ---
+def _source():
+    """(engine, replica path) for the current database: the main one, or the
+    request's tenant when tenant routing is on."""
+    tenant = current_tenant()
+    if tenant is None:
+        return db.engine, current_app.config["REPORT_SNAPSHOT_PATH"]
+    engines = current_app.extensions["tenancy"]
+    return engines.get(tenant), os.path.join(engines.directory, f"{tenant}.report.db")
+
+
+def _replica_engine(path: str):
+    with _replicas_lock:
+        engine = _replicas.get(path)
+        if engine is None:
+            # NullPool: every report connects anew and so sees the latest rename
+            engine = create_engine(f"sqlite:///file:{path}?mode=ro&uri=true", poolclass=NullPool)
+            _replicas[path] = engine
+        return engine
+
+
+def _connect():
+    """(connection, as_of) for one report, or None while no snapshot exists."""
+    engine, replica = _source()
+    if not current_app.config["REPORT_SNAPSHOT"]:
+        return engine.connect(), datetime.now(timezone.utc)
+    if not os.path.exists(replica):
+        return None
+    conn = _replica_engine(replica).connect()
+    # read on the same connection as the report, so it describes the same file
+    taken_at = conn.execute(text("SELECT taken_at FROM report_snapshot")).scalar_one()
+    return conn, datetime.fromisoformat(taken_at)
+
+
+def _watermark(as_of: datetime) -> dict:
+    return {
+        "as_of": as_of.isoformat(),
+        "staleness_seconds": round((datetime.now(timezone.utc) - as_of).total_seconds(), 1),
+    }
+
+
+def _no_snapshot():
+    return jsonify(error="report snapshot not taken yet; run `flask reports snapshot`"), 503
+
+
+def take_snapshot(engine, replica: str) -> datetime:
+    """Copy the database behind `engine` to `replica`; returns the watermark."""
+    os.makedirs(os.path.dirname(replica) or ".", exist_ok=True)
+    tmp = replica + ".tmp"
+    if os.path.exists(tmp):
+        os.unlink(tmp)
+    # taken before the copy starts, so it never overstates freshness
+    taken_at = datetime.now(timezone.utc)
+    src = engine.raw_connection()  # carries the app's busy_timeout
+    dst = sqlite3.connect(tmp)
+    try:
+        # one step: the source is read-locked only while pages are copied;
+        # a stepwise backup starts over whenever a writer commits in between
+        src.driver_connection.backup(dst)
+        # a copy of a WAL database is itself in WAL mode, which read-only
+        # connections cannot open without a -shm file
+        dst.execute("PRAGMA journal_mode = DELETE")
+        with dst:
+            dst.execute("CREATE TABLE report_snapshot (taken_at TEXT NOT NULL)")
+            dst.execute("INSERT INTO report_snapshot VALUES (?)", (taken_at.isoformat(),))
+    finally:
+        dst.close()
+        src.close()
+    os.replace(tmp, replica)
+    return taken_at
+
+
+# --- report queries (run on whatever connection _connect() returned) ---
+def _portfolio(conn) -> dict:
+    projects = conn.execute(
+        select(
+            Project.id, Project.code, Project.name, Project.status,
+            Project.budget_amount_usd.label("budget_usd"), Client.name.label("client_name"),
+        )
+        .join(Client, Client.id == Project.client_id)
+        .where(Project.deleted_at.is_(None))
+        .order_by(Project.id)
+    ).all()
+    pids = [p.id for p in projects]
+    planned_rows = actual_rows = []
+    if pids:
+        planned_rows = conn.execute(_PLANNED_SQL, {"pids": pids}).mappings().all()
+        actual_rows = conn.execute(_ACTUAL_SQL, {"pids": pids}).mappings().all()
+    names_stmt = _category_names_stmt(planned_rows, actual_rows)
+    names = dict(conn.execute(names_stmt).all()) if names_stmt is not None else {}
+    summaries = _build_summaries(pids, planned_rows, actual_rows, names)
+
+    tasks: dict[int, dict] = {pid: {"todo": 0, "doing": 0, "done": 0} for pid in pids}
+    for pid, status, n in conn.execute(
+        select(Task.project_id, Task.status, func.count()).group_by(Task.project_id, Task.status)
+    ):
+        if pid in tasks:
+            tasks[pid][_norm_status(status)] += n
+
+    items = []
+    for p in projects:
+        totals = summaries[p.id]["totals"]
+        budget = p.budget_usd
+        items.append({
+            "id": p.id,
+            "code": p.code,
+            "name": p.name,
+            "client": p.client_name,
+            "status": p.status,
+            "budget_usd": budget,
+            **totals,
+            "budget_used_pct": round(100 * totals["actual_total_usd"] / budget, 1) if budget else None,
+            "tasks": tasks[p.id],
+        })
+    grand = {
+        key: from_cents(sum(to_cents(i[key]) for i in items))
+        for key in ("planned_total_usd", "actual_total_usd", "variance_total_usd")
+    }
+    return {"projects": items, "totals": {"projects": len(items), **grand}}
+
+
+def _expense_lines_stmt(date_from: dt_date | None, date_to: dt_date | None):
+    stmt = (
+        select(
+            Project.code, Project.name, Expense.id, Expense.reference_no, Expense.expense_date,
+            Expense.vendor, Category.name, ExpenseLine.qty, ExpenseLine.unit_price_usd,
+            ExpenseLine.line_total_usd,
+        )
+        .join(Expense, Expense.id == ExpenseLine.expense_id)
+        .join(Project, Project.id == Expense.project_id)
+        .join(Category, Category.id == ExpenseLine.category_id)
+        .where(Project.deleted_at.is_(None))
+        .order_by(Project.id, Expense.expense_date, ExpenseLine.id)
+    )
+    if date_from:
+        stmt = stmt.where(Expense.expense_date >= date_from)
+    if date_to:
+        stmt = stmt.where(Expense.expense_date <= date_to)
+    return stmt
+
+
+def _live_tasks():
+    """Tasks outside soft-deleted projects (few, via ix_projects_deleted_at)."""
+    return Task.project_id.not_in(select(Project.id).where(Project.deleted_at.is_not(None)))
+
+
+def _workload(conn, today: dt_date, after: int, limit: int) -> list:
+    """Open-task counts for the assignees after `after` (None: unassigned),
+    in id order. One grouped query that walks ix_tasks_assignee_status_due
+    in assignee order and stops once `limit` assignees are done."""
+    overdue = Task.due_date < today
+    stmt = (
+        select(
+            Task.assignee_user_id,
+            func.count().label("open"),
+            func.sum(case((Task.status.in_(DOING_STATUSES), 1), else_=0)).label("doing"),
+            func.sum(case((overdue, 1), else_=0)).label("overdue"),
+            func.min(case((overdue, Task.due_date))).label("oldest_overdue"),
+            func.min(case((Task.due_date >= today, Task.due_date))).label("next_due"),
+        )
+        # `|| ''` keeps the planner off ix_tasks_status_due: without ANALYZE
+        # stats SQLite prefers it and sorts every open task to group them
+        .where(Task.status.concat("").in_(OPEN_STATUSES), _live_tasks())
+        .group_by(Task.assignee_user_id)
+        .order_by(Task.assignee_user_id)
+        .limit(limit)
+    )
+    if after is None:
+        return conn.execute(stmt.where(Task.assignee_user_id.is_(None))).all()
+    return conn.execute(stmt.where(Task.assignee_user_id > after)).all()
+
+
+def _overdue(conn, today: dt_date, after: tuple | None, limit: int, assignee: int | None) -> list:
+    """Overdue open tasks ordered by (due_date, id). Each status is read in
+    that order straight off its index range and SQLite merges the ranges,
+    so a page costs `limit` rows per status, however many are overdue."""
+    arms = []
+    for status in OPEN_STATUSES:
+        q = select(
+            Task.id, Task.title, Task.status, Task.due_date, Task.assignee_user_id, Task.project_id,
+        ).where(Task.status == status, Task.due_date < today, _live_tasks())
+        if assignee is not None:
+            q = q.where(Task.assignee_user_id == assignee)
+        if after is not None:
+            q = q.where(or_(Task.due_date > after[0], and_(Task.due_date == after[0], Task.id > after[1])))
+        arms.append(select(q.order_by(Task.due_date, Task.id).limit(limit).subquery()))
+    merged = union_all(*arms).subquery()
+    return conn.execute(select(merged).order_by(merged.c.due_date, merged.c.id).limit(limit)).all()
+
+
+def _names(conn, model, ids, *cols) -> dict:
+    if not ids:
+        return {}
+    return {r[0]: r[1:] for r in conn.execute(select(model.id, *cols).where(model.id.in_(ids)))}
+
+
+def _page_size() -> int:
+    return max(1, min(request.args.get("limit", type=int) or DEFAULT_PAGE, MAX_PAGE))
+
+
+def _cursor(*parts) -> str:
+    return base64.urlsafe_b64encode("|".join(str(p) for p in parts).encode()).decode()
+
+
+def _uncursor(cursor: str) -> list[str]:
+    return base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+
+
+def _parse_date(s: str | None) -> dt_date | None:
+    if not s:
+        return None
+    return dt_date.fromisoformat(s)
+
+
+# --- routes ---
+@bp.get("/portfolio")
+@require_auth
+def portfolio_report():
+    opened = _connect()
+    if opened is None:
+        return _no_snapshot()
+    conn, as_of = opened
+    with conn:
+        out = _portfolio(conn)
+    resp = jsonify({**_watermark(as_of), **out})
+    resp.headers["X-Report-As-Of"] = as_of.isoformat()
+    return resp
+
+
+@bp.get("/expenses.csv")
+@require_auth
+def export_expenses():
+    try:
+        date_from = _parse_date(request.args.get("from"))
+        date_to = _parse_date(request.args.get("to"))
+    except ValueError:
+        return jsonify(error="from/to must be YYYY-MM-DD"), 400
+    opened = _connect()
+    if opened is None:
+        return _no_snapshot()
+    conn, as_of = opened
+
+    def rows():
+        buf = io.StringIO()
+        out = csv.writer(buf)
+        out.writerow(CSV_COLUMNS)
+        try:
+            for n, r in enumerate(conn.execute(_expense_lines_stmt(date_from, date_to)), 1):
+                out.writerow((*r[:4], r[4].isoformat(), r[5], r[6], float(r[7]), r[8], r[9]))
+                if n % CSV_FLUSH_ROWS == 0:
+                    yield buf.getvalue()
+                    buf.seek(0)
+                    buf.truncate()
+            yield buf.getvalue()
+        finally:
+            conn.close()
+
+    return Response(
+        rows(),
+        mimetype="text/csv",
+        headers={
+            "Content-Disposition": "attachment; filename=expenses.csv",
+            "X-Report-As-Of": as_of.isoformat(),
+        },
+    )
+
+
+@bp.get("/workload")
+@require_auth
+def workload_report():
+    """Open tasks per assignee across live projects.
+    Query params:
+      - limit: assignees per page (max 200)
+      - cursor: next_cursor from the previous page
+    The first page also carries the `unassigned` counts."""
+    limit = _page_size()
+    cursor = request.args.get("cursor")
+    try:
+        after = int(_uncursor(cursor)[0]) if cursor else 0
+    except Exception:
+        return jsonify(error="invalid cursor"), 400
+    opened = _connect()
+    if opened is None:
+        return _no_snapshot()
+    conn, as_of = opened
+    today = dt_date.today()
+    with conn:
+        rows = _workload(conn, today, after, limit + 1)
+        unassigned = None if cursor else next(iter(_workload(conn, today, None, 1)), None)
+        page = rows[:limit]
+        users = _names(conn, User, [r.assignee_user_id for r in page], User.name, User.email)
+
+    def counts(r) -> dict:
+        return {
+            "open": r.open,
+            "todo": r.open - r.doing,
+            "doing": r.doing,
+            "overdue": r.overdue,
+            "oldest_overdue": r.oldest_overdue.isoformat() if r.oldest_overdue else None,
+            "next_due": r.next_due.isoformat() if r.next_due else None,
+        }
+
+    items = []
+    for r in page:
+        name, email = users.get(r.assignee_user_id, (None, None))
+        items.append({"user_id": r.assignee_user_id, "name": name, "email": email, **counts(r)})
+    body = {
+        **_watermark(as_of),
+        "today": today.isoformat(),
+        "assignees": items,
+        "next_cursor": _cursor(page[-1].assignee_user_id) if len(rows) > limit else None,
+    }
+    if not cursor:
+        body["unassigned"] = counts(unassigned) if unassigned else None
+    resp = jsonify(body)
+    resp.headers["X-Report-As-Of"] = as_of.isoformat()
+    return resp
+
+
+@bp.get("/overdue")
+@require_auth
+def overdue_report():
+    """Open tasks past their due date across live projects, oldest first.
+    Query params:
+      - assignee_user_id: only this assignee's tasks
+      - limit: page size (max 200)
+      - cursor: next_cursor from the previous page
+    """
+    limit = _page_size()
+    assignee = request.args.get("assignee_user_id", type=int)
+    cursor = request.args.get("cursor")
+    after = None
+    if cursor:
+        try:
+            due, tid = _uncursor(cursor)
+            after = (dt_date.fromisoformat(due), int(tid))
+        except Exception:
+            return jsonify(error="invalid cursor"), 400
+    opened = _connect()
+    if opened is None:
+        return _no_snapshot()
+    conn, as_of = opened
+    today = dt_date.today()
+    with conn:
+        rows = _overdue(conn, today, after, limit + 1, assignee)
+        page = rows[:limit]
+        projects = _names(conn, Project, {r.project_id for r in page}, Project.code, Project.name)
+    items = []
+    for r in page:
+        code, name = projects[r.project_id]
+        items.append({
+            "id": r.id,
+            "title": r.title,
+            "status": _norm_status(r.status),
+            "due_date": r.due_date.isoformat(),
+            "days_overdue": (today - r.due_date).days,
+            "assignee_user_id": r.assignee_user_id,
+            "project_id": r.project_id,
+            "project_code": code,
+            "project_name": name,
+        })
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = _cursor(page[-1].due_date.isoformat(), page[-1].id)
+    resp = jsonify({**_watermark(as_of), "today": today.isoformat(), "tasks": items, "next_cursor": next_cursor})
+    resp.headers["X-Report-As-Of"] = as_of.isoformat()
+    return resp
+
+
+# --- CLI ---
+@bp.cli.command("snapshot")
+@click.option("--every", type=float, default=0, help="Keep refreshing every N seconds.")
+def snapshot(every):
+    """Refresh the report replica from the live database."""
+    engine, replica = _source()
+    if engine.dialect.name != "sqlite":
+        raise click.ClickException("report snapshots need a SQLite database")
+
+    def step():
+        t0 = time.perf_counter()
+        taken_at = take_snapshot(engine, replica)
+        size = os.path.getsize(replica) / 1e6
+        click.echo(f"{taken_at.isoformat()} {replica}: {size:.1f} MB in {time.perf_counter() - t0:.2f}s")
+
+    run_every(every, step, "snapshot")
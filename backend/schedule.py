@@ -0,0 +1,497 @@
+# backend/schedule.py
+"""Finish-to-start task dependencies and the critical path.
+
+Every task has a duration; a dependency (predecessor -> successor, plus
+lag) says the successor starts once the predecessor has finished. Two
+numbers per task are stored and kept current on every write:
+
+  early_start_days  longest chain of work ending where the task starts
+                    (forward pass: max over predecessors of ES + duration + lag)
+  tail_days         longest chain of work from the task's start to the end
+                    of the project (backward pass: duration + max over
+                    successors of lag + tail)
+
+Everything else falls out of those at read time: the project takes
+T = max(ES + tail) days, late start is T - tail, slack is T - ES - tail,
+and the critical tasks are the ones without slack.
+
+ES depends only on what is upstream of a task and tail only on what is
+downstream, so a write never recomputes the whole schedule: a new duration,
+lag or edge re-derives ES from the tasks after it and tail from the tasks
+before it, wave by wave, and a wave stops at every task whose value comes
+out unchanged. Each wave costs a few queries, so a change that is still
+moving after MAX_WAVES waves (a long chain) loads the project's graph once
+and finishes in memory, in topological order, with the same early stop.
+A dependency that would close a cycle is rejected before it is written
+(the predecessor is then reachable from the successor). The full O(V+E)
+recompute (Kahn order, both passes) is `rebuild_project`.
+
+  GET    /api/projects/<pid>/schedule
+  POST   /api/projects/<pid>/schedule/rebuild  full recompute as a background job (202)
+  GET    /api/projects/<pid>/dependencies
+  POST   /api/projects/<pid>/dependencies     {predecessor_id, successor_id, lag_days}
+  PATCH  /api/projects/<pid>/dependencies/<id> {lag_days}
+  DELETE /api/projects/<pid>/dependencies/<id>
+
+  flask schedule rebuild [--project 12]    full recompute (and cycle check)
+"""
+from __future__ import annotations
+from collections import deque
+from datetime import timedelta
+import click
+from flask import Blueprint, jsonify, request
+from sqlalchemy import bindparam, select, update
+from .auth import require_auth
+from .events import broker
+from .extensions import db
+from .jobs import JobFailed, accepted, enqueue, job
+from .models import Project, Task, TaskDependency
+
+bp = Blueprint("schedule", __name__, url_prefix="/api")
+
+MAX_DURATION_DAYS = 3650
+MAX_LAG_DAYS = 3650
+# waves of id lookups before a propagation loads the whole graph instead
+MAX_WAVES = 16
+
+
+class CycleError(ValueError):
+    """Dependencies would form a cycle; `ids` are tasks on it."""
+
+    def __init__(self, ids):
+        super().__init__("dependencies form a cycle")
+        self.ids = list(ids)
+
+
+# --- graph helpers (pure) ---
+def topological_order(nodes, edges) -> list[int]:
+    """Kahn order of `nodes` over the (pred, succ) `edges` among them.
+    Raises CycleError with the tasks that could not be ordered."""
+    indeg = {n: 0 for n in nodes}
+    out: dict[int, list] = {}
+    for p, s in edges:
+        if p in indeg and s in indeg:
+            indeg[s] += 1
+            out.setdefault(p, []).append(s)
+    ready = deque(n for n, d in indeg.items() if d == 0)
+    order = []
+    while ready:
+        n = ready.popleft()
+        order.append(n)
+        for s in out.get(n, ()):
+            indeg[s] -= 1
+            if indeg[s] == 0:
+                ready.append(s)
+    if len(order) < len(indeg):
+        raise CycleError(sorted(n for n, d in indeg.items() if d > 0))
+    return order
+
+
+def forward_pass(order, duration: dict, preds: dict) -> dict:
+    """ES per task, `order` topological; preds[n] = [(p, lag)]."""
+    es = {}
+    for n in order:
+        es[n] = max((es[p] + duration[p] + lag for p, lag in preds.get(n, ())), default=0)
+    return es
+
+
+def backward_pass(order, duration: dict, succs: dict) -> dict:
+    """tail per task, `order` topological; succs[n] = [(s, lag)]."""
+    tail = {}
+    for n in reversed(order):
+        tail[n] = duration[n] + max((lag + tail[s] for s, lag in succs.get(n, ())), default=0)
+    return tail
+
+
+# --- incremental recompute ---
+def _propagate(seeds, forward: bool) -> int:
+    """Recompute ES (forward) or tail (backward) of `seeds`, then of the
+    neighbours of whatever changed, wave by wave until nothing changes.
+    Tasks whose value comes out the same stop the wave, so an edit only
+    costs as much as the part of the schedule it actually moves. Each
+    wave is written before the next reads it; past MAX_WAVES the rest is
+    settled in memory (`_settle`). Returns rows changed."""
+    t, td = Task.__table__, TaskDependency.__table__
+    if forward:
+        col, near, far = t.c.early_start_days, td.c.successor_id, td.c.predecessor_id
+        contrib = lambda v, dur, lag: v + dur + lag  # noqa: E731
+    else:
+        col, near, far = t.c.tail_days, td.c.predecessor_id, td.c.successor_id
+        contrib = lambda v, dur, lag: lag + v  # noqa: E731
+    other = t.alias("other")
+    save = update(t).where(t.c.id == bindparam("tid")).values({col.name: bindparam("v")})
+    frontier, seen, waves, changed_total = set(seeds), set(), 0, 0
+    while frontier:
+        if waves == MAX_WAVES:
+            return changed_total + _settle(frontier, forward)
+        # a DAG settles within as many waves as tasks it touched
+        waves += 1
+        seen |= frontier
+        if waves > len(seen) + 1:
+            raise CycleError(sorted(frontier))
+        ids = list(frontier)
+        best = {n: 0 for n in ids}
+        for n, v, dur, lag in db.session.execute(
+            select(near, other.c[col.name], other.c.duration_days, td.c.lag_days)
+            .join(other, other.c.id == far)
+            .where(near.in_(ids))
+        ):
+            best[n] = max(best[n], contrib(v, dur, lag))
+        changed = []
+        for n, cur, dur in db.session.execute(select(t.c.id, col, t.c.duration_days).where(t.c.id.in_(ids))):
+            v = best[n] if forward else dur + best[n]
+            if v != cur:
+                changed.append({"tid": n, "v": v})
+        if not changed:
+            break
+        db.session.execute(save, changed)
+        changed_total += len(changed)
+        moved = [c["tid"] for c in changed]
+        frontier = set(db.session.scalars(select(near).where(far.in_(moved))))
+    return changed_total
+
+
+def _settle(seeds, forward: bool) -> int:
+    """`_propagate` for long chains: one read of the projects' tasks and
+    dependencies, then the tasks reachable from `seeds` in topological
+    order, each recomputed only if an input moved. Returns rows changed."""
+    t, td = Task.__table__, TaskDependency.__table__
+    col = t.c.early_start_days if forward else t.c.tail_days
+    pids = db.session.scalars(select(t.c.project_id).where(t.c.id.in_(list(seeds))).distinct()).all()
+    duration, value = {}, {}
+    for n, dur, v in db.session.execute(select(t.c.id, t.c.duration_days, col).where(t.c.project_id.in_(pids))):
+        duration[n], value[n] = dur, v
+    # feeds[a] = tasks whose value depends on a's; inputs[b] = (a, lag) it depends on
+    feeds: dict[int, list] = {}
+    inputs: dict[int, list] = {}
+    for p, s, lag in db.session.execute(
+        select(td.c.predecessor_id, td.c.successor_id, td.c.lag_days).where(td.c.project_id.in_(pids))
+    ):
+        a, b = (p, s) if forward else (s, p)
+        feeds.setdefault(a, []).append(b)
+        inputs.setdefault(b, []).append((a, lag))
+    region, todo = set(seeds), list(seeds)
+    while todo:
+        for m in feeds.get(todo.pop(), ()):
+            if m not in region:
+                region.add(m)
+                todo.append(m)
+    order = topological_order(region, ((a, b) for a in region for b in feeds.get(a, ())))
+    current = {n: value[n] for n in region}
+    dirty = set(seeds)
+    for n in order:
+        if n not in dirty:
+            continue
+        if forward:
+            v = max((value[p] + duration[p] + lag for p, lag in inputs.get(n, ())), default=0)
+        else:
+            v = duration[n] + max((lag + value[s] for s, lag in inputs.get(n, ())), default=0)
+        if v != value[n]:
+            value[n] = v
+            dirty.update(feeds.get(n, ()))
+    return _save(col.name, {n: value[n] for n in region}, current)
+
+
+def reschedule(forward=(), backward=()) -> int:
+    """After a write, before commit. `forward`: tasks whose predecessors
+    (or their lags) changed; `backward`: tasks whose successors or own
+    duration changed. Returns rows changed."""
+    db.session.flush()
+    return _propagate(forward, True) + _propagate(backward, False)
+
+
+def _successors(tid: int) -> list[int]:
+    return db.session.scalars(
+        select(TaskDependency.successor_id).where(TaskDependency.predecessor_id == tid)
+    ).all()
+
+
+def duration_changed(t: Task) -> int:
+    """t's own ES is unaffected; its successors' ES and its own tail are not."""
+    return reschedule(forward=_successors(t.id), backward=[t.id])
+
+
+def detach_tasks(ids: list[int]) -> None:
+    """Drop the dependencies of tasks about to be deleted and fix the
+    schedule of the tasks they connected to."""
+    if not ids:
+        return
+    td = TaskDependency.__table__
+    touching = td.c.predecessor_id.in_(ids) | td.c.successor_id.in_(ids)
+    pairs = db.session.execute(select(td.c.predecessor_id, td.c.successor_id).where(touching)).all()
+    if not pairs:
+        return
+    gone = set(ids)
+    db.session.execute(td.delete().where(touching))
+    reschedule(
+        forward={s for p, s in pairs if s not in gone},
+        backward={p for p, s in pairs if p not in gone},
+    )
+
+
+def _path_between(start: int, goal: int) -> list[int] | None:
+    """Dependency chain start -> ... -> goal, or None if there is none.
+
+    Along any chain ES never decreases, so only tasks starting no later
+    than `goal` can lie on one: the search never leaves that window, and
+    a dependency pointing forward in time costs a single lookup."""
+    td = TaskDependency.__table__
+    limit = db.session.scalar(select(Task.early_start_days).where(Task.id == goal))
+    parent, frontier = {start: None}, [start]
+    while frontier and goal not in parent:
+        rows = db.session.execute(
+            select(td.c.predecessor_id, td.c.successor_id)
+            .join(Task, Task.id == td.c.successor_id)
+            .where(td.c.predecessor_id.in_(frontier), Task.early_start_days <= limit)
+        ).all()
+        frontier = []
+        for p, s in rows:
+            if s not in parent:
+                parent[s] = p
+                frontier.append(s)
+    if goal not in parent:
+        return None
+    path, n = [], goal
+    while n is not None:
+        path.append(n)
+        n = parent[n]
+    return path[::-1]
+
+
+def add_dependency(pid: int, pred: int, succ: int, lag: int) -> TaskDependency:
+    """Insert pred -> succ and reschedule. CycleError if succ already leads to pred."""
+    if pred == succ:
+        raise CycleError([pred])
+    path = _path_between(succ, pred)
+    if path:
+        raise CycleError(path)
+    dep = TaskDependency(project_id=pid, predecessor_id=pred, successor_id=succ, lag_days=lag)
+    db.session.add(dep)
+    reschedule(forward=[succ], backward=[pred])
+    return dep
+
+
+# --- full recompute ---
+def _save(column: str, values: dict, current: dict) -> int:
+    changed = [(v, n) for n, v in values.items() if current[n] != v]
+    if changed:
+        # straight to the driver: a long chain rewrites tens of thousands of
+        # rows, and per-row parameter processing would dominate
+        db.session.connection().exec_driver_sql(f"UPDATE tasks SET {column} = ? WHERE id = ?", changed)
+    return len(changed)
+
+
+def compute_schedule(tasks, deps) -> tuple[dict, dict]:
+    """(ES, tail) for a whole project from (id, duration_days) tasks and
+    (predecessor_id, successor_id, lag_days) deps. CycleError on a cycle."""
+    duration = {t[0]: t[1] for t in tasks}
+    edges, preds, succs = [], {}, {}
+    for p, s, lag in deps:
+        edges.append((p, s))
+        preds.setdefault(s, []).append((p, lag))
+        succs.setdefault(p, []).append((s, lag))
+    order = topological_order(duration, edges)
+    return forward_pass(order, duration, preds), backward_pass(order, duration, succs)
+
+
+def rebuild_project(pid: int) -> int:
+    """Recompute the stored schedule of one project; returns rows changed."""
+    rows = db.session.execute(
+        select(Task.id, Task.duration_days, Task.early_start_days, Task.tail_days).where(Task.project_id == pid)
+    ).all()
+    deps = db.session.execute(
+        select(TaskDependency.predecessor_id, TaskDependency.successor_id, TaskDependency.lag_days)
+        .where(TaskDependency.project_id == pid)
+    ).all()
+    es, tail = compute_schedule([(r.id, r.duration_days) for r in rows], deps)
+    return (
+        _save("early_start_days", es, {r.id: r.early_start_days for r in rows})
+        + _save("tail_days", tail, {r.id: r.tail_days for r in rows})
+    )
+
+
+# --- read side ---
+def critical_chain(tasks: dict, deps) -> list[int]:
+    """One critical path, first task to last. tasks: id -> (es, dur, slack)."""
+    out: dict[int, list] = {}
+    for p, s, lag in deps:
+        if tasks[p][2] == 0 and tasks[s][2] == 0 and tasks[s][0] == tasks[p][0] + tasks[p][1] + lag:
+            out.setdefault(p, []).append(s)
+    starts = [n for n, (es, _, slack) in tasks.items() if slack == 0 and es == 0]
+    if not starts:
+        return []
+    chain = [min(starts)]
+    while out.get(chain[-1]):
+        chain.append(min(out[chain[-1]], key=lambda n: (tasks[n][0], n)))
+    return chain
+
+
+def _project_or_none(pid: int) -> Project | None:
+    p = db.session.get(Project, pid)
+    return p if p and p.deleted_at is None else None
+
+
+def _int_arg(data: dict, name: str, default: int, limit: int):
+    v = data.get(name, default)
+    if isinstance(v, bool) or not isinstance(v, int) or not 0 <= v <= limit:
+        return None
+    return v
+
+
+# --- routes ---
+@bp.get("/projects/<int:pid>/schedule")
+@require_auth
+def project_schedule(pid: int):
+    p = _project_or_none(pid)
+    if not p:
+        return jsonify(error="not found"), 404
+    rows = db.session.execute(
+        select(Task.id, Task.title, Task.duration_days, Task.early_start_days, Task.tail_days)
+        .where(Task.project_id == pid)
+        .order_by(Task.early_start_days, Task.id)
+    ).all()
+    deps = db.session.execute(
+        select(TaskDependency.predecessor_id, TaskDependency.successor_id, TaskDependency.lag_days)
+        .where(TaskDependency.project_id == pid)
+    ).all()
+    finish = max((r.early_start_days + r.tail_days for r in rows), default=0)
+    start = p.start_date
+
+    def day(n):
+        return (start + timedelta(days=n)).isoformat() if start else None
+
+    items, slack_of = [], {}
+    for r in rows:
+        es, dur = r.early_start_days, r.duration_days
+        ls = finish - r.tail_days
+        slack = ls - es
+        slack_of[r.id] = (es, dur, slack)
+        items.append({
+            "id": r.id,
+            "title": r.title,
+            "duration_days": dur,
+            "early_start": es,
+            "early_finish": es + dur,
+            "late_start": ls,
+            "late_finish": ls + dur,
+            "slack": slack,
+            "critical": slack == 0,
+            "start_date": day(es),
+            # inclusive: a one-day task starts and finishes on the same date
+            "finish_date": day(es + max(dur, 1) - 1),
+        })
+    return jsonify({
+        "project_id": pid,
+        "start_date": start.isoformat() if start else None,
+        "duration_days": finish,
+        "finish_date": day(max(finish, 1) - 1),
+        "critical_path": critical_chain(slack_of, deps),
+        "tasks": items,
+    })
+
+
+@bp.get("/projects/<int:pid>/dependencies")
+@require_auth
+def list_dependencies(pid: int):
+    if not _project_or_none(pid):
+        return jsonify(error="not found"), 404
+    deps = TaskDependency.query.filter_by(project_id=pid).order_by(TaskDependency.id)
+    return jsonify(dependencies=[d.to_dict() for d in deps])
+
+
+@bp.post("/projects/<int:pid>/dependencies")
+@require_auth
+def create_dependency(pid: int):
+    if not _project_or_none(pid):
+        return jsonify(error="not found"), 404
+    data = request.get_json(silent=True) or {}
+    pred, succ = data.get("predecessor_id"), data.get("successor_id")
+    in_project = db.session.scalars(
+        select(Task.id).where(Task.project_id == pid, Task.id.in_([pred, succ]))
+    ).all() if isinstance(pred, int) and isinstance(succ, int) else []
+    if pred not in in_project or succ not in in_project:
+        return jsonify(error="predecessor_id and successor_id must be tasks of this project"), 400
+    lag = _int_arg(data, "lag_days", 0, MAX_LAG_DAYS)
+    if lag is None:
+        return jsonify(error=f"lag_days must be an integer 0-{MAX_LAG_DAYS}"), 400
+    if TaskDependency.query.filter_by(predecessor_id=pred, successor_id=succ).first():
+        return jsonify(error="dependency already exists"), 409
+    try:
+        dep = add_dependency(pid, pred, succ, lag)
+    except CycleError as e:
+        db.session.rollback()
+        return jsonify(error="dependency would create a cycle", cycle=e.ids + [e.ids[0]]), 409
+    db.session.commit()
+    body = dep.to_dict()
+    broker.publish(pid, "dependency.created", body)
+    return jsonify(body), 201
+
+
+@bp.patch("/projects/<int:pid>/dependencies/<int:did>")
+@require_auth
+def update_dependency(pid: int, did: int):
+    dep = TaskDependency.query.filter_by(project_id=pid, id=did).first()
+    if not dep:
+        return jsonify(error="not found"), 404
+    data = request.get_json(silent=True) or {}
+    if "lag_days" in data:
+        lag = _int_arg(data, "lag_days", 0, MAX_LAG_DAYS)
+        if lag is None:
+            return jsonify(error=f"lag_days must be an integer 0-{MAX_LAG_DAYS}"), 400
+        if lag != dep.lag_days:
+            dep.lag_days = lag
+            reschedule(forward=[dep.successor_id], backward=[dep.predecessor_id])
+    db.session.commit()
+    body = dep.to_dict()
+    broker.publish(pid, "dependency.updated", body)
+    return jsonify(body)
+
+
+@bp.delete("/projects/<int:pid>/dependencies/<int:did>")
+@require_auth
+def delete_dependency(pid: int, did: int):
+    dep = TaskDependency.query.filter_by(project_id=pid, id=did).first()
+    if not dep:
+        return jsonify(error="not found"), 404
+    pred, succ = dep.predecessor_id, dep.successor_id
+    db.session.delete(dep)
+    reschedule(forward=[succ], backward=[pred])
+    db.session.commit()
+    broker.publish(pid, "dependency.deleted", {"id": did})
+    return ("", 204)
+
+
+@bp.post("/projects/<int:pid>/schedule/rebuild")
+@require_auth
+def rebuild_schedule(pid: int):
+    if not _project_or_none(pid):
+        return jsonify(error="not found"), 404
+    j, _created = enqueue("schedule.rebuild", {"project_id": pid}, key=request.headers.get("Idempotency-Key"))
+    return accepted(j)
+
+
+@job("schedule.rebuild")
+def _rebuild_job(payload: dict) -> dict:
+    try:
+        return {"updated": rebuild_project(payload["project_id"])}
+    except CycleError as e:
+        raise JobFailed(f"dependency cycle through tasks {e.ids}")
+
+
+# --- CLI ---
+@bp.cli.command("rebuild")
+@click.option("--project", "project_id", type=int, default=None, help="Only this project.")
+def rebuild(project_id):
+    """Recompute stored early starts and tails from scratch; reports cycles."""
+    pids = [project_id] if project_id else db.session.scalars(select(Project.id).order_by(Project.id)).all()
+    changed = bad = 0
+    for pid in pids:
+        try:
+            changed += rebuild_project(pid)
+        except CycleError as e:
+            bad += 1
+            click.echo(f"project {pid}: dependency cycle through tasks {e.ids}", err=True)
+    db.session.commit()
+    click.echo(f"{len(pids)} project(s), {changed} value(s) updated, {bad} with cycles")
+    if bad:
+        raise click.exceptions.Exit(1)
@@ -1,8 +1,10 @@
-from backend.app import app
+from backend.app import create_app
 from backend.extensions import db
 from backend.models import User
 from werkzeug.security import generate_password_hash as g
 
+app = create_app()
+
 with app.app_context():
     db.create_all()
     if not User.query.filter_by(email="admin@example.com").first():
@@ -0,0 +1,129 @@
+# backend/serializers.py
+"""Column-projected read path for list endpoints.
+
+Each serializer owns a fixed Core column list and a row -> dict function
+compiled once at import. Rows come straight from the connection as tuples,
+so list endpoints skip ORM instance construction, identity-map bookkeeping
+and attribute instrumentation entirely. Output matches the ORM serializers
+(project_json, client_json, component_json, bom_json, Task.to_dict) key for
+key.
+"""
+from __future__ import annotations
+from functools import lru_cache
+from sqlalchemy import select
+from .extensions import db
+from .models import Client, Component, Project, ProjectComponent, Task
+
+
+def _iso(v):
+    return v.isoformat() if v is not None else None
+
+
+class RowSerializer:
+    SUBSET_CACHE = 64  # field subsets kept compiled per serializer
+
+    def __init__(self, fields: dict):
+        """fields: name -> column, or name -> (column, formatter)."""
+        self.fields = fields
+        self.names = tuple(fields)
+        self.columns = tuple(f[0] if isinstance(f, tuple) else f for f in fields.values())
+        ns, parts = {}, []
+        for i, (name, f) in enumerate(fields.items()):
+            if isinstance(f, tuple):
+                ns[f"_f{i}"] = f[1]
+                parts.append(f"{name!r}: _f{i}(r[{i}])")
+            else:
+                parts.append(f"{name!r}: r[{i}]")
+        # one flat dict literal per row; no per-field loop at call time
+        self.to_dict = eval("lambda r: {" + ", ".join(parts) + "}", ns)
+        self._subset = lru_cache(maxsize=self.SUBSET_CACHE)(self._compile_subset)
+
+    def select(self):
+        return select(*self.columns)
+
+    def subset(self, names) -> "RowSerializer":
+        """Serializer for some of the fields, in this serializer's order:
+        one cache entry per column set, however the caller ordered or
+        repeated the names."""
+        wanted = set(names)
+        unknown = wanted - self.fields.keys()
+        if unknown:
+            raise KeyError(", ".join(sorted(unknown)))
+        return self._subset(tuple(n for n in self.names if n in wanted))
+
+    def _compile_subset(self, names: tuple) -> "RowSerializer":
+        return RowSerializer({n: self.fields[n] for n in names})
+
+    def all(self, stmt) -> list[dict]:
+        f = self.to_dict
+        return [f(r) for r in db.session.connection().execute(stmt)]
+
+
+_p = Project.__table__.c
+PROJECT = RowSerializer({
+    "id": _p.id,
+    "code": _p.code,
+    "client_id": _p.client_id,
+    "name": _p.name,
+    "description": _p.description,
+    "project_type": _p.project_type,
+    "status": _p.status,
+    "start_date": (_p.start_date, _iso),
+    "end_date": (_p.end_date, _iso),
+    "budget_amount_usd": _p.budget_cents,
+    "tax_rate": _p.tax_rate,
+    "currency": _p.currency,
+    "created_at": (_p.created_at, _iso),
+    "updated_at": (_p.updated_at, _iso),
+    "deleted_at": (_p.deleted_at, _iso),
+})
+
+_c = Client.__table__.c
+CLIENT = RowSerializer({
+    "id": _c.id,
+    "name": _c.name,
+    "contact_name": _c.contact_name,
+    "email": _c.email,
+    "phone": _c.phone,
+    "address": _c.address,
+    "notes": _c.notes,
+    "created_at": (_c.created_at, _iso),
+    "updated_at": (_c.updated_at, _iso),
+    "deleted_at": (_c.deleted_at, _iso),
+})
+
+_comp = Component.__table__.c
+COMPONENT = RowSerializer({
+    "id": _comp.id,
+    "category_id": _comp.category_id,
+    "name": _comp.name,
+    "default_unit_price_usd": _comp.default_unit_price_cents,
+    "uom": _comp.uom,
+})
+
+_b = ProjectComponent.__table__.c
+BOM = RowSerializer({
+    "id": _b.id,
+    "project_id": _b.project_id,
+    "category_id": _b.category_id,
+    "component_id": _b.component_id,
+    "quantity": _b.quantity,
+    "unit_price_usd": _b.unit_price_cents,
+    "note": _b.note,
+})
+
+_t = Task.__table__.c
+TASK = RowSerializer({
+    "id": _t.id,
+    "project_id": _t.project_id,
+    "parent_task_id": _t.parent_task_id,
+    "title": _t.title,
+    "description": _t.description,
+    "status": _t.status,
+    "assignee_user_id": _t.assignee_user_id,
+    "due_date": (_t.due_date, _iso),
+    "order_index": _t.order_index,
+    "duration_days": _t.duration_days,
+    "created_at": (_t.created_at, _iso),
+    "updated_at": (_t.updated_at, _iso),
+})
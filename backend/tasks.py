@@ -1,44 +1,21 @@
 # backend/tasks.py
-from datetime import date
+import base64
+from datetime import date, datetime, timezone
+import click
 from flask import Blueprint, request, jsonify, abort, g
 from functools import wraps
-from sqlalchemy import func
+from sqlalchemy import func, and_, or_, delete, insert, literal, select, update
 from .extensions import db
-from .models import Project, Task, TaskComment
+from .models import Project, Task, TaskComment, Tombstone, utcnow
 from .auth import _get_token_from_request, _verify_token
+from .events import broker
+from .serializers import TASK
+from .schedule import MAX_DURATION_DAYS, detach_tasks, duration_changed
 
 bp = Blueprint("tasks", __name__, url_prefix="/api")
 MAX_COMMENT_LEN = 4000
-
-def _extract_user_id(user):
-    # Accepts many shapes: ORM user, dict, tuple like (ok, id), plain int/str
-    if user is None:
-        return None
-    # ORM-like
-    uid = getattr(user, "id", None)
-    if isinstance(uid, int):
-        return uid
-    # dict-like
-    if isinstance(user, dict):
-        for k in ("id", "user_id", "uid"):
-            v = user.get(k)
-            if isinstance(v, int):
-                return v
-            if isinstance(v, str) and v.isdigit():
-                return int(v)
-    # tuple/list-like: pick the first int inside (handles (True, 2))
-    if isinstance(user, (list, tuple)):
-        for v in user:
-            if isinstance(v, int):
-                return v
-            if isinstance(v, str) and v.isdigit():
-                return int(v)
-    # plain str/int
-    if isinstance(user, int):
-        return user
-    if isinstance(user, str) and user.isdigit():
-        return int(user)
-    return None
+DEFAULT_COMMENT_PAGE = 50
+MAX_COMMENT_PAGE = 200
 
 def auth_required(fn):
     @wraps(fn)
@@ -47,12 +24,10 @@ def auth_required(fn):
             token = _get_token_from_request()
             if not token:
                 return jsonify({"error": "UNAUTHORIZED", "detail": "missing token"}), 401
-            user = _verify_token(token)
-            uid = _extract_user_id(user)
-            if uid is None:
+            ok, uid = _verify_token(token)
+            if not ok or not uid:
                 return jsonify({"error": "UNAUTHORIZED", "detail": "invalid token"}), 401
-            g.current_user = user
-            g.user_id = uid  # <- always an int now
+            g.user_id = uid
         except Exception as e:
             return jsonify({"error": "UNAUTHORIZED", "detail": str(e)}), 401
         return fn(*args, **kwargs)
@@ -65,23 +40,129 @@ def _project_or_404(pid: int) -> Project:
         abort(404, description="Project not found")
     return p
 
+def _duration_or_none(v):
+    if isinstance(v, bool) or not isinstance(v, int) or not 0 <= v <= MAX_DURATION_DAYS:
+        return None
+    return v
+
 def _task_in_project_or_404(pid: int, tid: int) -> Task:
     t = Task.query.filter_by(project_id=pid, id=tid).first()
     if not t:
         abort(404, description="Task not found")
     return t
 
+# --- materialized paths ---
+def _subtree_clause(path: str):
+    # "/" sorts right before "0", so this range is exactly `path` and its descendants
+    return and_(Task.path >= path, Task.path < path[:-1] + "0")
+
+def _child_path(parent: Task | None, tid: int) -> str:
+    return (parent.path if parent is not None else "/") + f"{tid}/"
+
+def _move_subtree(t: Task, new_parent_id) -> str | None:
+    """Re-parent t and rewrite its subtree's paths in one UPDATE.
+    Returns an error message if the move is invalid."""
+    new_parent = None
+    if new_parent_id is not None:
+        new_parent = Task.query.filter_by(project_id=t.project_id, id=new_parent_id).first()
+        if not new_parent:
+            return "invalid parent_task_id"
+        if new_parent.path.startswith(t.path):
+            return "cannot move a task under itself or one of its subtasks"
+    old_path = t.path
+    new_path = _child_path(new_parent, t.id)
+    db.session.execute(
+        update(Task)
+        .where(_subtree_clause(old_path))
+        .values(path=literal(new_path) + func.substr(Task.path, len(old_path) + 1))
+        .execution_options(synchronize_session=False)
+    )
+    t.parent_task_id = new_parent_id
+    t.path = new_path
+    return None
+
+def compute_task_paths(rows) -> tuple[dict, list]:
+    """Expected path per task from (id, parent_task_id) rows of one project.
+    Returns (paths, cycle_ids); tasks on a parent cycle are treated as roots."""
+    parent_of = {r.id: r.parent_task_id for r in rows}
+    children = {}
+    for tid, parent in parent_of.items():
+        children.setdefault(parent if parent in parent_of else None, []).append(tid)
+    paths, cycles = {}, []
+
+    def walk(root, prefix):
+        stack = [(root, prefix)]
+        while stack:
+            tid, pre = stack.pop()
+            paths[tid] = pre + f"{tid}/"
+            stack.extend((k, paths[tid]) for k in children.get(tid, ()) if k not in paths)
+
+    for tid in children.get(None, ()):
+        walk(tid, "/")
+    for tid in parent_of:
+        if tid in paths:
+            continue
+        # climb until we stand on the cycle itself, not on a task hanging off it
+        seen, cur = set(), tid
+        while cur not in seen:
+            seen.add(cur)
+            cur = parent_of[cur]
+        cycles.append(cur)
+        walk(cur, "/")
+    return paths, cycles
+
+# Raw spellings read as doing / still open; queries list them explicitly
+# so they can seek the status indexes
+DOING_STATUSES = ("doing", "in_progress", "in-progress", "in progress")
+OPEN_STATUSES = ("todo",) + DOING_STATUSES
+
+# Normalize status
+def _norm_status(s: str) -> str:
+    s = (s or "todo").strip().lower()
+    if s in DOING_STATUSES:
+        return "doing"
+    if s == "done":
+        return "done"
+    return "todo"
+
+def _leaf_progress(status: str) -> float:
+    s = _norm_status(status)
+    if s == "done":
+        return 1.0
+    if s == "doing":
+        return 0.5
+    return 0.0  # todo/unknown
+
 # GET
 @bp.route("/projects/<int:pid>/tasks", methods=["GET"])
 @auth_required
 def list_tasks(pid):
     _project_or_404(pid)
-    rows = (
-        Task.query.filter_by(project_id=pid)
+    items = TASK.all(
+        TASK.select()
+        .where(Task.project_id == pid)
         .order_by(Task.parent_task_id.is_(None).desc(), Task.parent_task_id, Task.order_index, Task.id)
-        .all()
     )
-    return jsonify({"tasks": [t.to_dict() for t in rows]})
+
+    include = {x.strip() for x in (request.args.get("include") or "").split(",") if x.strip()}
+    if "comment_stats" in include:
+        # one grouped query for every card on the board
+        stats = {
+            r.task_id: r
+            for r in db.session.query(
+                TaskComment.task_id,
+                func.count(TaskComment.id).label("n"),
+                func.max(TaskComment.created_at).label("last_at"),
+            )
+            .join(Task, Task.id == TaskComment.task_id)
+            .filter(Task.project_id == pid)
+            .group_by(TaskComment.task_id)
+        }
+        for item in items:
+            s = stats.get(item["id"])
+            item["comment_count"] = s.n if s else 0
+            item["last_comment_at"] = s.last_at.isoformat() + "Z" if s else None
+    return jsonify({"tasks": items})
 
 # POST
 @bp.route("/projects/<int:pid>/tasks", methods=["POST"])
@@ -99,19 +180,35 @@ def create_task(pid):
             return date.fromisoformat(v)
         except Exception:
             abort(400, description="Invalid due_date")
+    parent = None
+    if data.get("parent_task_id"):
+        parent = Task.query.filter_by(project_id=pid, id=data["parent_task_id"]).first()
+        if not parent:
+            abort(400, description="invalid parent_task_id")
+    duration = _duration_or_none(data.get("duration_days", 1))
+    if duration is None:
+        abort(400, description=f"duration_days must be an integer 0-{MAX_DURATION_DAYS}")
     t = Task(
         project_id=pid,
-        parent_task_id=data.get("parent_task_id"),
+        parent_task_id=parent.id if parent else None,
         title=title,
         description=(data.get("description") or None),
         status=(data.get("status") or "todo"),
         assignee_user_id=data.get("assignee_user_id"),
         due_date=_parse_date(data.get("due_date")),
         order_index=int(data.get("order_index") or 0),
+        duration_days=duration,
+        # no dependencies yet: starts on day 0 and is its own tail
+        early_start_days=0,
+        tail_days=duration,
     )
     db.session.add(t)
+    db.session.flush()  # get t.id for the path
+    t.path = _child_path(parent, t.id)
     db.session.commit()
-    return jsonify(t.to_dict()), 201
+    body = t.to_dict()
+    broker.publish(pid, "task.created", body)
+    return jsonify(body), 201
 
 # PATCH
 @bp.route("/projects/<int:pid>/tasks/<int:tid>", methods=["PATCH"])
@@ -133,7 +230,11 @@ def update_task(pid, tid):
     if "assignee_user_id" in data:
         t.assignee_user_id = data["assignee_user_id"]
     if "parent_task_id" in data:
-        t.parent_task_id = data["parent_task_id"]
+        new_parent_id = data["parent_task_id"] or None
+        if new_parent_id != t.parent_task_id:
+            err = _move_subtree(t, new_parent_id)
+            if err:
+                return jsonify({"error": err}), 400
     if "order_index" in data:
         t.order_index = int(data["order_index"] or 0)
     if "due_date" in data:
@@ -145,8 +246,17 @@ def update_task(pid, tid):
                 t.due_date = date.fromisoformat(v)
             except Exception:
                 return jsonify({"error": "Invalid due_date, expected YYYY-MM-DD"}), 400
+    if "duration_days" in data:
+        duration = _duration_or_none(data["duration_days"])
+        if duration is None:
+            return jsonify({"error": f"duration_days must be an integer 0-{MAX_DURATION_DAYS}"}), 400
+        if duration != t.duration_days:
+            t.duration_days = duration
+            duration_changed(t)
     db.session.commit()
-    return jsonify(t.to_dict())
+    body = t.to_dict()
+    broker.publish(pid, "task.updated", body)
+    return jsonify(body)
 
 # DELETE
 @bp.route("/projects/<int:pid>/tasks/<int:tid>", methods=["DELETE"])
@@ -155,26 +265,67 @@ def delete_task(pid, tid):
     t = Task.query.filter_by(project_id=pid, id=tid).first()
     if not t:
         return jsonify({"error": "Task not found"}), 404
-    db.session.delete(t)
+    # whole subtree (and its comments) in one indexed range delete each
+    subtree = _subtree_clause(t.path)
+    subtree_ids = select(Task.id).where(subtree)
+    deleted_ids = db.session.scalars(subtree_ids).all()
+    detach_tasks(deleted_ids)
+    # bulk deletes skip the ORM after_delete hooks, so tombstone explicitly
+    now = utcnow()
+    cols = ["table_name", "row_id", "project_id", "deleted_at"]
+    db.session.execute(
+        insert(Tombstone).from_select(
+            cols,
+            select(literal("task_comments"), TaskComment.id, literal(pid), literal(now))
+            .where(TaskComment.task_id.in_(subtree_ids)),
+        )
+    )
+    db.session.execute(
+        insert(Tombstone).from_select(
+            cols, select(literal("tasks"), Task.id, Task.project_id, literal(now)).where(subtree)
+        )
+    )
+    db.session.execute(
+        delete(TaskComment)
+        .where(TaskComment.task_id.in_(subtree_ids))
+        .execution_options(synchronize_session=False)
+    )
+    db.session.execute(
+        delete(Task).where(subtree).execution_options(synchronize_session=False)
+    )
     db.session.commit()
+    broker.publish(pid, "task.deleted", {"id": tid, "ids": deleted_ids})
     return jsonify({"ok": True})
 
+@bp.get("/projects/<int:pid>/tasks/<int:tid>/subtree")
+@auth_required
+def list_subtree(pid, tid):
+    """Task and all descendants, pre-order (each task followed by its subtasks)."""
+    t = _task_in_project_or_404(pid, tid)
+    rows = Task.query.filter(_subtree_clause(t.path)).order_by(Task.path).all()
+    return jsonify({"tasks": [x.to_dict() for x in rows]})
+
 @bp.get("/projects/<int:pid>/tasks/progress")
 @auth_required
 def task_progress(pid):
-    from datetime import datetime, timezone
-
     _project_or_404(pid)
+    # 1) Load once (only what the rollup reads)
+    tasks = db.session.execute(progress_stmt(pid)).all()
+    return jsonify(compute_progress(tasks))
+
+def progress_stmt(pid: int):
+    """Rows compute_progress() needs for one project (also used by backend/asgi.py)."""
+    return select(Task.id, Task.parent_task_id, Task.status).where(Task.project_id == pid)
 
-    # 1) Load once
-    tasks = Task.query.filter_by(project_id=pid).all()
+def compute_progress(tasks) -> dict:
+    """Project progress from rows exposing id, parent_task_id and status."""
     if not tasks:
-        return jsonify({
+        return {
             "percent": 0.0,
             "totals": {"done": 0, "total": 0, "leaves_done": 0, "leaves_total": 0},
             "by_status": {"todo": 0, "doing": 0, "done": 0},
             "computed_at": datetime.now(timezone.utc).isoformat()
-        })
+        }
 
     # 2) Indexing
     by_id = {t.id: t for t in tasks}
@@ -185,43 +336,26 @@ def task_progress(pid):
     # Roots = tasks whose parent is None OR parent missing (defensive)
     roots = [t for t in tasks if t.parent_task_id is None or t.parent_task_id not in by_id]
 
-    # Normalize status
-    def norm_status(s: str) -> str:
-        s = (s or "todo").strip().lower()
-        if s in ("doing", "in_progress", "in-progress", "in progress"):
-            return "doing"
-        if s == "done":
-            return "done"
-        return "todo"
-
     by_status = {"todo": 0, "doing": 0, "done": 0}
     for t in tasks:
-        by_status[norm_status(t.status)] += 1
+        by_status[_norm_status(t.status)] += 1
 
     # 3) DFS with memo + cycle guard
     memo = {}
     visiting = set()
 
-    def leaf_progress(status: str) -> float:
-        s = norm_status(status)
-        if s == "done":
-            return 1.0
-        if s == "doing":
-            return 0.5
-        return 0.0  # todo/unknown
-
-    def dfs(t: Task) -> float:
+    def dfs(t) -> float:
         if t.id in memo:
             return memo[t.id]
         if t.id in visiting:  # cycle guard → treat as leaf
-            p = leaf_progress(t.status)
+            p = _leaf_progress(t.status)
             memo[t.id] = p
             return p
 
         visiting.add(t.id)
         kids = children.get(t.id, [])
         if not kids:  # leaf
-            p = leaf_progress(t.status)
+            p = _leaf_progress(t.status)
             memo[t.id] = p
             visiting.remove(t.id)
             return p
@@ -236,17 +370,17 @@ def task_progress(pid):
     # 4) Leaves and totals
     leaves = [t for t in tasks if not children.get(t.id)]
     leaves_total = len(leaves)
-    leaves_done = sum(1 for t in leaves if norm_status(t.status) == "done")
+    leaves_done = sum(1 for t in leaves if _norm_status(t.status) == "done")
 
     # 5) Overall progress
     if roots:
         vals = [dfs(r) for r in roots]
     else:
-        vals = [leaf_progress(t.status) for t in leaves] or [0.0]
+        vals = [_leaf_progress(t.status) for t in leaves] or [0.0]
 
     overall = round((sum(vals) / len(vals)) * 100.0, 2)
 
-    return jsonify({
+    return {
         "percent": overall,
         "totals": {
             "done": by_status["done"],
@@ -256,15 +390,170 @@ def task_progress(pid):
         },
         "by_status": by_status,
         "computed_at": datetime.now(timezone.utc).isoformat()
-    })    
+    }    
+
+# Only the columns the tree needs; skips ORM hydration entirely
+_TREE_COLUMNS = (
+    Task.id,
+    Task.parent_task_id,
+    Task.title,
+    Task.status,
+    Task.assignee_user_id,
+    Task.due_date,
+    Task.order_index,
+)
+
+def _build_task_tree(rows):
+    """Nest flat task rows and roll up progress per node in O(n).
+
+    Rows must already be ordered by (order_index, id) so children keep
+    board order. Returns (roots, nodes_by_id). Tasks caught in a parent
+    cycle are detached and promoted to roots so the output stays a tree.
+    """
+    nodes = {}
+    for r in rows:
+        nodes[r.id] = {
+            "id": r.id,
+            "parent_task_id": r.parent_task_id,
+            "title": r.title,
+            "status": r.status,
+            "assignee_user_id": r.assignee_user_id,
+            "due_date": r.due_date.isoformat() if r.due_date else None,
+            "order_index": r.order_index,
+            "children": [],
+        }
+
+    roots = []
+    for n in nodes.values():
+        parent = nodes.get(n["parent_task_id"])
+        if parent is None:
+            roots.append(n)
+        else:
+            parent["children"].append(n)
+
+    # Top-down visit order; anything unreached sits on a cycle
+    order, seen = [], set()
+
+    def walk(start):
+        seen.add(start["id"])
+        stack = [start]
+        while stack:
+            n = stack.pop()
+            order.append(n)
+            for k in n["children"]:
+                if k["id"] not in seen:
+                    seen.add(k["id"])
+                    stack.append(k)
+
+    for r in roots:
+        walk(r)
+    for n in nodes.values():
+        if n["id"] in seen:
+            continue
+        # cycle guard → climb onto the cycle, then cut the edge to its parent
+        climbed = set()
+        while n["id"] not in climbed:
+            climbed.add(n["id"])
+            n = nodes[n["parent_task_id"]]
+        parent = nodes[n["parent_task_id"]]
+        parent["children"] = [k for k in parent["children"] if k is not n]
+        roots.append(n)
+        walk(n)
+
+    # Bottom-up rollups: parent progress = average of immediate children
+    progress = {}
+    for n in reversed(order):
+        s = _norm_status(n["status"])
+        by_status = {"todo": 0, "doing": 0, "done": 0}
+        by_status[s] += 1
+        kids = n["children"]
+        if not kids:
+            p = _leaf_progress(n["status"])
+            total, leaves_total, leaves_done = 1, 1, int(s == "done")
+        else:
+            p = sum(progress[k["id"]] for k in kids) / len(kids)
+            total, leaves_total, leaves_done = 1, 0, 0
+            for k in kids:
+                ru = k["rollup"]
+                total += ru["total"]
+                leaves_total += ru["leaves_total"]
+                leaves_done += ru["leaves_done"]
+                for key, v in ru["by_status"].items():
+                    by_status[key] += v
+        progress[n["id"]] = p
+        n["rollup"] = {
+            "percent": round(p * 100.0, 2),
+            "total": total,
+            "leaves_total": leaves_total,
+            "leaves_done": leaves_done,
+            "by_status": by_status,
+        }
+    return roots, nodes
+
+@bp.get("/projects/<int:pid>/tasks/tree")
+@auth_required
+def task_tree(pid):
+    """Nested task tree with per-node subtree rollups.
+    Query params:
+      - root_id: return only the subtree rooted at this task
+    """
+    _project_or_404(pid)
+    q = db.session.query(*_TREE_COLUMNS).filter(Task.project_id == pid)
+    root_id = request.args.get("root_id", type=int)
+    if root_id is not None:
+        root = Task.query.filter_by(project_id=pid, id=root_id).first()
+        if root is None:
+            return jsonify({"error": "Task not found"}), 404
+        q = q.filter(_subtree_clause(root.path))
+    rows = q.order_by(Task.order_index, Task.id).all()
+    roots, nodes = _build_task_tree(rows)
+    if root_id is not None:
+        roots = [nodes[root_id]]
+
+    return jsonify({
+        "tree": roots,
+        "computed_at": datetime.now(timezone.utc).isoformat()
+    })
 
 @bp.route("/projects/<int:pid>/tasks/<int:tid>/comments", methods=["GET"])
 @auth_required
 def list_task_comments(pid, tid):
+    """Comments oldest first.
+    Query params:
+      - limit: page size (default 50, max 200)
+      - cursor: next_cursor from the previous page
+    """
     _project_or_404(pid)
-    t = _task_in_project_or_404(pid, tid)
-    # Use relationship ordering by created_at
-    return jsonify({"comments": [c.to_dict() for c in t.comments]})
+    _task_in_project_or_404(pid, tid)
+
+    q = TaskComment.query.filter(TaskComment.task_id == tid)
+    cursor = request.args.get("cursor")
+    if cursor:
+        try:
+            ts, cid = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+            ts, cid = datetime.fromisoformat(ts), int(cid)
+        except Exception:
+            return jsonify({"error": "invalid cursor"}), 400
+        # keyset on (created_at, id): rides ix_task_comments_created_at, no OFFSET scan
+        q = q.filter(
+            or_(
+                TaskComment.created_at > ts,
+                and_(TaskComment.created_at == ts, TaskComment.id > cid),
+            )
+        )
+    q = q.order_by(TaskComment.created_at, TaskComment.id)
+
+    limit = max(1, min(request.args.get("limit", type=int) or DEFAULT_COMMENT_PAGE, MAX_COMMENT_PAGE))
+
+    rows = q.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = base64.urlsafe_b64encode(
+            f"{last.created_at.isoformat()}|{last.id}".encode()
+        ).decode()
+    return jsonify({"comments": [c.to_dict() for c in rows], "next_cursor": next_cursor})
 
 @bp.route("/projects/<int:pid>/tasks/<int:tid>/comments", methods=["POST"])
 @auth_required
@@ -282,7 +571,9 @@ def create_task_comment(pid, tid):
     c = TaskComment(task_id=tid, user_id=g.user_id, body=body)
     db.session.add(c)
     db.session.commit()
-    return jsonify(c.to_dict()), 201
+    body = c.to_dict()
+    broker.publish(pid, "comment.created", body)
+    return jsonify(body), 201
 
 @bp.route("/projects/<int:pid>/tasks/<int:tid>/comments/<int:cid>", methods=["DELETE"])
 @auth_required
@@ -300,4 +591,33 @@ def delete_task_comment(pid, tid, cid):
 
     db.session.delete(c)
     db.session.commit()
+    broker.publish(pid, "comment.deleted", {"id": cid, "task_id": tid})
     return jsonify({"ok": True})
+
+
+# --- CLI: flask --app backend.app tasks check-paths [--fix] ---
+@bp.cli.command("check-paths")
+@click.option("--fix", is_flag=True, help="Rewrite stale paths in place.")
+def check_paths(fix):
+    """Verify tasks.path agrees with parent_task_id for every project."""
+    rows = db.session.query(Task.id, Task.project_id, Task.parent_task_id, Task.path).all()
+    by_project = {}
+    for r in rows:
+        by_project.setdefault(r.project_id, []).append(r)
+
+    stale = 0
+    for project_id, prows in by_project.items():
+        expected, cycles = compute_task_paths(prows)
+        for tid in cycles:
+            click.echo(f"project {project_id}: task {tid} is on a parent cycle")
+        for r in prows:
+            if r.path != expected[r.id]:
+                stale += 1
+                click.echo(f"project {project_id}: task {r.id} path {r.path!r} != {expected[r.id]!r}")
+                if fix:
+                    db.session.execute(
+                        update(Task).where(Task.id == r.id).values(path=expected[r.id])
+                    )
+    if fix and stale:
+        db.session.commit()
+    click.echo(f"{len(rows)} tasks checked, {stale} stale path(s){' fixed' if fix and stale else ''}")
@@ -0,0 +1,247 @@
+# backend/tenancy.py
+"""One SQLite database per organization.
+
+With TENANT_ROUTING=1 the main database (DATABASE_URL) only serves the
+tenant directory: `tenants` and `tenant_members` (login email -> tenant).
+Everything else lives in TENANTS_DIR/<slug>.db. Tokens carry the tenant
+slug in a `tid` claim, a before-request hook puts it on `g.tenant`, and
+extensions.RoutingSession sends the request's queries to that tenant's
+engine. Organizations no longer share a writer lock, so writes scale
+with the number of tenants.
+
+Engines are opened on demand and kept in an LRU of TENANT_ENGINE_CACHE;
+the least recently used one is disposed when the cache is full.
+
+  flask tenants create acme --name "Acme Builders" [--from-main]
+  flask tenants list
+  flask tenants migrate [--revision head] [--only acme]
+  flask tenants each archive run --days 30
+"""
+from __future__ import annotations
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+import click
+from flask import Blueprint, current_app, g, jsonify, request
+from sqlalchemy import create_engine, select
+from .auth import _get_token_from_request, _token_claims
+from .extensions import db, init_migrate, init_sqlite
+from .models import Tenant, TenantMember, User
+
+bp = Blueprint("tenants", __name__)
+
+SLUG_RE = re.compile(r"[a-z0-9][a-z0-9-]{0,39}")
+SIGN_IN_ENDPOINTS = {"auth.login", "auth.register", "auth.logout", "auth.refresh"}
+
+
+class TenantEngines:
+    """slug -> Engine on TENANTS_DIR/<slug>.db, least recently used evicted."""
+
+    def __init__(self, app):
+        self.app = app
+        self.directory = app.config["TENANTS_DIR"]
+        self.capacity = app.config["TENANT_ENGINE_CACHE"]
+        self._engines: "OrderedDict[str, object]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def path(self, slug: str) -> str:
+        if not SLUG_RE.fullmatch(slug or ""):
+            raise LookupError(f"invalid tenant slug {slug!r}")
+        return os.path.join(self.directory, f"{slug}.db")
+
+    def get(self, slug: str, create: bool = False):
+        with self._lock:
+            engine = self._engines.get(slug)
+            if engine is not None:
+                self._engines.move_to_end(slug)
+                return engine
+            path = self.path(slug)
+            if not create and not os.path.exists(path):
+                raise LookupError(f"unknown tenant {slug!r}")
+            os.makedirs(self.directory, exist_ok=True)
+            engine = create_engine(
+                f"sqlite:///{path}", **self.app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {})
+            )
+            init_sqlite(self.app, engine)
+            self._engines[slug] = engine
+            while len(self._engines) > self.capacity:
+                # connections a request still holds stay valid until returned
+                _, evicted = self._engines.popitem(last=False)
+                evicted.dispose()
+            return engine
+
+    def dispose(self, close: bool = True) -> None:
+        with self._lock:
+            for engine in self._engines.values():
+                engine.dispose(close=close)
+            self._engines.clear()
+
+
+def init_tenancy(app) -> None:
+    app.extensions["tenancy"] = TenantEngines(app)
+
+
+@bp.before_app_request
+def _route_to_tenant():
+    if not current_app.config["TENANT_ROUTING"]:
+        return None
+    if request.endpoint in SIGN_IN_ENDPOINTS:
+        # these pick the tenant themselves; a stale cookie must not block them
+        return None
+    token = _get_token_from_request()
+    claims = _token_claims(token) if token else None
+    if not claims:
+        # unauthenticated routes (health) use the directory; require_auth rejects the rest
+        return None
+    try:
+        current_app.extensions["tenancy"].get(claims["tid"])
+    except (KeyError, LookupError):
+        return jsonify(error="token is not bound to a known organization"), 401
+    g.tenant = claims["tid"]
+    return None
+
+
+# --- used by auth.register / auth.login when routing is on ---
+def signup_tenant(slug: str | None, email: str) -> Tenant:
+    """Enter the organization a new user signs up to and stage their
+    directory entry. LookupError: no such organization; ValueError: the
+    email already belongs to one."""
+    tenant = Tenant.query.filter_by(slug=(slug or "").strip().lower(), deleted_at=None).first()
+    if tenant is None:
+        raise LookupError("unknown organization")
+    if TenantMember.query.filter_by(email=email).first():
+        raise ValueError("email already registered")
+    db.session.add(TenantMember(email=email, tenant_id=tenant.id))
+    g.tenant = tenant.slug
+    return tenant
+
+
+def enter_tenant_of(email: str) -> bool:
+    """Route the rest of the request to the organization of a login email."""
+    slug = db.session.execute(
+        select(Tenant.slug)
+        .join(TenantMember, TenantMember.tenant_id == Tenant.id)
+        .where(TenantMember.email == email, Tenant.deleted_at.is_(None))
+    ).scalar()
+    if slug is None:
+        return False
+    g.tenant = slug
+    return True
+
+
+def current_tenant() -> str | None:
+    return g.get("tenant")
+
+
+# --- CLI ---
+def _tenant_slugs(only=()) -> list[str]:
+    q = select(Tenant.slug).where(Tenant.deleted_at.is_(None)).order_by(Tenant.slug)
+    if only:
+        q = q.where(Tenant.slug.in_(only))
+    return list(db.session.execute(q).scalars())
+
+
+def _alembic_config(slug: str):
+    init_migrate(current_app)
+    migrate = current_app.extensions["migrate"].migrate
+    return migrate.get_config(x_arg=[f"tenant={slug}"])
+
+
+@bp.cli.command("create")
+@click.argument("slug")
+@click.option("--name", default=None, help="Display name (default: the slug).")
+@click.option("--from-main", is_flag=True, help="Start from a copy of the main database and register its users.")
+def create_tenant(slug, name, from_main):
+    """Register an organization and create its database."""
+    from alembic import command
+
+    engines = current_app.extensions["tenancy"]
+    if not SLUG_RE.fullmatch(slug):
+        raise click.ClickException("slug must be 1-40 chars of a-z, 0-9 and '-'")
+    if Tenant.query.filter_by(slug=slug).first() or os.path.exists(engines.path(slug)):
+        raise click.ClickException(f"tenant {slug!r} already exists")
+
+    engine = engines.get(slug, create=True)
+    if from_main:
+        if db.engine.dialect.name != "sqlite":
+            raise click.ClickException("--from-main needs a SQLite main database")
+        emails = [e for (e,) in db.session.execute(select(User.email))]
+        src = sqlite3.connect(db.engine.url.database)
+        dst = sqlite3.connect(engines.path(slug))
+        src.backup(dst)
+        with dst:
+            # the copy must not carry the directory of other organizations
+            dst.execute("DELETE FROM tenant_members")
+            dst.execute("DELETE FROM tenants")
+        src.close()
+        dst.close()
+    else:
+        emails = []
+        db.metadata.create_all(engine)
+        try:
+            command.stamp(_alembic_config(slug), "head")
+        except Exception as e:  # the database is usable; only `tenants migrate` needs the stamp
+            click.echo(f"warning: schema created but not stamped: {e!r}", err=True)
+
+    tenant = Tenant(slug=slug, name=name or slug)
+    db.session.add(tenant)
+    db.session.flush()
+    taken = {e for (e,) in db.session.execute(select(TenantMember.email).where(TenantMember.email.in_(emails)))}
+    db.session.add_all(TenantMember(email=e, tenant_id=tenant.id) for e in emails if e not in taken)
+    db.session.commit()
+    click.echo(f"created {slug}: {engines.path(slug)}" + (f", {len(emails) - len(taken)} members" if from_main else ""))
+    for e in sorted(taken):
+        click.echo(f"  skipped {e}: already a member of another organization", err=True)
+
+
+@bp.cli.command("list")
+def list_tenants():
+    """Organizations with member counts and database size."""
+    engines = current_app.extensions["tenancy"]
+    for t in Tenant.query.filter_by(deleted_at=None).order_by(Tenant.slug):
+        members = TenantMember.query.filter_by(tenant_id=t.id).count()
+        path = engines.path(t.slug)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        click.echo(f"{t.slug:20} {members:6d} members {size / 1e6:10.1f} MB  {t.name}")
+
+
+@bp.cli.command("migrate")
+@click.option("--revision", default="head", show_default=True)
+@click.option("--only", multiple=True, help="Limit to these tenant slugs (repeatable).")
+def migrate_tenants(revision, only):
+    """Run Alembic upgrade against every tenant database, one at a time.
+    A failing tenant is reported and skipped; the exit code is 1 if any failed."""
+    from alembic import command
+
+    failed = []
+    for slug in _tenant_slugs(only):
+        try:
+            command.upgrade(_alembic_config(slug), revision)
+            click.echo(f"{slug}: ok")
+        except Exception as e:  # keep going; one bad tenant must not block the rest
+            failed.append(slug)
+            click.echo(f"{slug}: FAILED {e}", err=True)
+    if failed:
+        raise click.ClickException(f"{len(failed)} tenant(s) failed: {', '.join(failed)}")
+
+
+@bp.cli.command("each", context_settings={"ignore_unknown_options": True, "allow_interspersed_args": False})
+@click.option("--only", multiple=True, help="Limit to these tenant slugs (repeatable).")
+@click.argument("args", nargs=-1, type=click.UNPROCESSED, required=True)
+@click.pass_context
+def each_tenant(ctx, only, args):
+    """Run another flask command once per tenant: flask tenants each archive run"""
+    root = ctx.find_root()
+    for slug in _tenant_slugs(only):
+        click.echo(f"== {slug}")
+        # the nested command reuses this app context, so it sees g.tenant;
+        # a fresh session per tenant keeps identity maps from mixing
+        db.session.remove()
+        g.tenant = slug
+        try:
+            root.command.main(list(args), prog_name=root.info_name, obj=root.obj, standalone_mode=False)
+        finally:
+            g.pop("tenant", None)
+            db.session.remove()
@@ -0,0 +1,226 @@
+# backend/tokens.py
+"""Refresh-token records and the access-token revocation set.
+
+Access tokens (auth._issue_token) live JWT_EXPIRES_MIN minutes and are
+checked without touching a database: signature, expiry, and a lookup in
+`revocations`, an in-memory {key: expires_at} dict. Refresh tokens live
+JWT_REFRESH_EXPIRES_DAYS and are recorded in AUTH_DB, a small SQLite file
+next to the event log and the job queue:
+
+  refresh_tokens  one row per refresh token: its family (the login session
+                  it descends from), user, tenant, expiry, when it was used
+  revocations     append-only log of revoked keys: an access token's jti or
+                  a whole family id (every access token minted from it)
+
+A refresh token can be used once; POST /api/auth/refresh marks it used and
+issues the next one in the same family. Presenting a used token again after
+JWT_REFRESH_REUSE_GRACE_SECONDS means it was copied, so the family is
+revoked: the thief and the user are both signed out.
+
+Each worker loads the live revocations once and then a poller thread picks
+up new rows every AUTH_REVOCATION_SYNC_SECONDS, so a logout reaches the other
+workers within that interval (the worker that handled it sees it at once).
+A revocation only has to outlive the access tokens it covers, so every entry
+expires at most JWT_EXPIRES_MIN after it was written: the set holds the last
+few minutes of logouts, however many users there are.
+"""
+from __future__ import annotations
+import os
+import sqlite3
+import threading
+import time
+
+
+class TokenStore:
+    """The refresh_tokens and revocations tables in AUTH_DB (WAL)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        # per thread and per process: a connection must not cross fork()
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(
+                "CREATE TABLE IF NOT EXISTS refresh_tokens ("
+                " jti TEXT PRIMARY KEY,"
+                " family TEXT NOT NULL,"
+                " tenant TEXT NOT NULL DEFAULT '',"
+                " user_id INTEGER NOT NULL,"
+                " issued_at REAL NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " used_at REAL,"
+                " revoked_at REAL);"
+                "CREATE INDEX IF NOT EXISTS ix_refresh_tokens_family ON refresh_tokens (family);"
+                "CREATE INDEX IF NOT EXISTS ix_refresh_tokens_user ON refresh_tokens (tenant, user_id);"
+                "CREATE INDEX IF NOT EXISTS ix_refresh_tokens_expires ON refresh_tokens (expires_at);"
+                "CREATE TABLE IF NOT EXISTS revocations ("
+                " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " key TEXT NOT NULL,"
+                " expires_at REAL NOT NULL);"
+                "CREATE INDEX IF NOT EXISTS ix_revocations_expires ON revocations (expires_at);"
+            )
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    # --- refresh tokens ---
+    def add_refresh(self, jti: str, family: str, tenant: str, user_id: int, expires_at: float) -> None:
+        self._conn().execute(
+            "INSERT INTO refresh_tokens (jti, family, tenant, user_id, issued_at, expires_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (jti, family, tenant, user_id, time.time(), expires_at),
+        )
+
+    def use_refresh(self, jti: str) -> tuple[str, dict | None]:
+        """Mark a refresh token used. (outcome, row): outcome is "ok",
+        "unknown", "revoked", "expired" or "reused" (row["used_at"] says when)."""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT * FROM refresh_tokens WHERE jti = ?", (jti,)).fetchone()
+            if row is None:
+                outcome = "unknown"
+            elif row["revoked_at"] is not None:
+                outcome = "revoked"
+            elif row["expires_at"] <= now:
+                outcome = "expired"
+            elif row["used_at"] is not None:
+                outcome = "reused"
+            else:
+                conn.execute("UPDATE refresh_tokens SET used_at = ? WHERE jti = ?", (now, jti))
+                outcome = "ok"
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return outcome, dict(row) if row else None
+
+    def families(self, tenant: str, user_id: int) -> list[str]:
+        """Live refresh families (signed-in sessions) of one user."""
+        return [r[0] for r in self._conn().execute(
+            "SELECT DISTINCT family FROM refresh_tokens"
+            " WHERE tenant = ? AND user_id = ? AND revoked_at IS NULL AND expires_at > ?",
+            (tenant, user_id, time.time()),
+        )]
+
+    # --- revocations ---
+    def revoke(self, keys: list[str], expires_at: float, families: list[str] = ()) -> None:
+        """Log `keys` as revoked until `expires_at`; `families` also stop
+        refreshing."""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for family in families:
+                conn.execute(
+                    "UPDATE refresh_tokens SET revoked_at = ? WHERE family = ? AND revoked_at IS NULL",
+                    (now, family),
+                )
+            conn.executemany(
+                "INSERT INTO revocations (key, expires_at) VALUES (?, ?)", [(k, expires_at) for k in keys]
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def revocations_after(self, seq: int) -> list[tuple[int, str, float]]:
+        return [tuple(r) for r in self._conn().execute(
+            "SELECT seq, key, expires_at FROM revocations WHERE seq > ? AND expires_at > ? ORDER BY seq",
+            (seq, time.time()),
+        )]
+
+    def last_seq(self) -> int:
+        return self._conn().execute("SELECT COALESCE(MAX(seq), 0) FROM revocations").fetchone()[0]
+
+    def prune(self, before: float) -> int:
+        """Drop revocations and refresh tokens that expired before `before`."""
+        conn = self._conn()
+        n = conn.execute("DELETE FROM revocations WHERE expires_at < ?", (before,)).rowcount
+        return n + conn.execute("DELETE FROM refresh_tokens WHERE expires_at < ?", (before,)).rowcount
+
+
+class RevocationSet:
+    """Revoked jti / family keys of this worker, kept in sync with AUTH_DB."""
+
+    PRUNE_EVERY = 60  # polls between pruning the log
+
+    def __init__(self):
+        self._keys: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._store: TokenStore | None = None
+        self._interval = 1.0
+        self._started_pid: int | None = None
+        self._generation = 0
+
+    def init_app(self, app, store: TokenStore) -> None:
+        with self._lock:
+            self._store = store
+            self._interval = app.config.get("AUTH_REVOCATION_SYNC_SECONDS", 1.0)
+            self._keys = {}
+            self._started_pid = None
+            self._generation += 1  # a previous app's poller stops
+
+    def _ensure_started(self) -> None:
+        # lazily, and again after a fork: threads do not survive into workers
+        pid = os.getpid()
+        if self._started_pid == pid or self._store is None:
+            return
+        with self._lock:
+            if self._started_pid == pid:
+                return
+            rows = self._store.revocations_after(0)
+            self._keys = {key: exp for _seq, key, exp in rows}
+            last = rows[-1][0] if rows else self._store.last_seq()
+            t = threading.Thread(
+                target=self._poll, args=(self._store, last, self._generation), daemon=True, name="revocations-poller",
+            )
+            t.start()
+            self._started_pid = pid
+
+    def is_revoked(self, claims: dict) -> bool:
+        self._ensure_started()
+        keys = self._keys
+        return claims.get("jti") in keys or claims.get("fam") in keys
+
+    def add(self, keys: list[str], expires_at: float) -> None:
+        """Local copy of a revocation this worker just logged."""
+        self._ensure_started()
+        for key in keys:
+            self._keys[key] = expires_at
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _poll(self, store: TokenStore, last: int, generation: int) -> None:
+        loops = 0
+        while generation == self._generation:
+            time.sleep(self._interval)
+            try:
+                for seq, key, exp in store.revocations_after(last):
+                    self._keys[key] = exp
+                    last = seq
+                now = time.time()
+                # a new dict instead of deleting in place: readers never lock
+                if any(exp <= now for exp in self._keys.values()):
+                    self._keys = {k: exp for k, exp in self._keys.items() if exp > now}
+                loops += 1
+                if loops % self.PRUNE_EVERY == 0:
+                    store.prune(now)
+            except sqlite3.Error:
+                pass  # locked or briefly unavailable; try again next tick
+
+
+revocations = RevocationSet()
+
+
+def init_tokens(app) -> None:
+    store = TokenStore(app.config["AUTH_DB"])
+    app.extensions["tokens"] = store
+    revocations.init_app(app, store)
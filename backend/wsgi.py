@@ -0,0 +1,26 @@
+# backend/wsgi.py
+"""Production entry point.
+
+    gunicorn -c backend/gunicorn.conf.py backend.wsgi:app
+
+With preload_app the master imports this module once and forks workers
+from it, so everything warmed here is shared copy-on-write instead of being
+rebuilt by every worker. Database connections are *not* shared: the
+post_fork hook in gunicorn.conf.py drops any that the master opened.
+"""
+from sqlalchemy.orm import configure_mappers
+from .app import create_app
+from .config import ProductionConfig
+
+
+def warm(app) -> None:
+    """Do the one-off work a first request would otherwise pay per worker."""
+    configure_mappers()
+    app.url_map.update()
+    # forecast imports NumPy lazily; in a preloaded master it is cheaper
+    # to take it once here than once per worker
+    import numpy  # noqa: F401
+
+
+app = create_app(ProductionConfig)
+warm(app)
@@ -14,7 +14,21 @@ async function getAuthToken() {
   }
 }
 
-async function request(method, path, data) {
+// Access cookies are short-lived; the refresh cookie renews them. One
+// refresh at a time: concurrent 401s wait for the same call.
+let refreshing = null
+export function refreshSession() {
+  if (!refreshing) {
+    refreshing = fetch(`${API_PREFIX}/auth/refresh`, { method: 'POST', credentials: 'include' })
+      // 409: another tab refreshed first and the new cookies are already set
+      .then((res) => res.ok || res.status === 409)
+      .catch(() => false)
+      .finally(() => { refreshing = null })
+  }
+  return refreshing
+}
+
+async function request(method, path, data, retried = false) {
   const token = await getAuthToken()
   const headers = {}
   if (data) headers['Content-Type'] = 'application/json'
@@ -27,6 +41,9 @@ async function request(method, path, data) {
   })
 
   // Handle auth failures early
+  if (res.status === 401 && !retried && !path.startsWith('/auth/') && await refreshSession()) {
+    return request(method, path, data, true)
+  }
   if (res.status === 401) {
     // Optional: clear stored token so UI updates
     try {
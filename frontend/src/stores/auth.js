@@ -1,6 +1,6 @@
 // src/stores/auth.js
 import { defineStore } from 'pinia';
-import api from '@/lib/api';
+import api, { refreshSession } from '@/lib/api';
 
 export const useAuth = defineStore('auth', {
   state: () => ({
@@ -12,7 +12,9 @@ export const useAuth = defineStore('auth', {
     async fetchMe() {
       this.loading = true; this.error = null;
       try {
-        const me = await api.get('/auth/me');
+        let me = await api.get('/auth/me');
+        // access cookie expired: renew it from the refresh cookie once
+        if (!me?.user && await refreshSession()) me = await api.get('/auth/me');
         this.user = me || null;
       } catch (e) {
         this.user = null;
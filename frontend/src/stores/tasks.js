@@ -154,8 +154,15 @@ export const useTasksStore = defineStore('tasks', {
       this.loading.comments[tid] = true
       this.errors.comments[tid] = null
       try {
-        const res = await api.get(`/projects/${pid}/tasks/${tid}/comments`)
-        const list = asArray(res, 'comments')
+        // the endpoint pages (50 by default); follow next_cursor to the end
+        let list = []
+        let cursor = null
+        do {
+          const qs = cursor ? `?cursor=${encodeURIComponent(cursor)}` : ''
+          const res = await api.get(`/projects/${pid}/tasks/${tid}/comments${qs}`)
+          list = list.concat(asArray(res, 'comments'))
+          cursor = res?.next_cursor || null
+        } while (cursor)
         this.commentsByTask[tid] = list
         return list
       } catch (e) {